@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+# per-line cost of the instantiation detection of
+# HdlModuleInterface.update_instantiation: the detection patterns compiled per
+# call (as before, reproduced in detect_module_inst_begin_per_call) against the
+# patterns compiled once per module name (__detect_module_inst_begin), plus
+# update_instantiation as a whole on a file without a matching instantiation
+#
+# usage: python bench_inst_detect.py [--lines 10000]
+
+import os
+import re
+import argparse
+import tempfile
+
+from bench_util import import_hdl_module, time_best_of
+
+
+def detect_module_inst_begin_per_call(module_interface, line):
+    """the detection as it was before the patterns were cached: three patterns
+    built from the module name on every call
+    """
+    name = module_interface.name
+    prefix = module_interface.INST_PREFIX
+    re_param = re.compile(r'\s*' + name + r'\s*#\(\s*')
+    re_no_param = re.compile(r'\s*' + name + r'\s*' + prefix + name + r'\s*\(\s*')
+    re_param_end = re.compile(r'\s*\)\s*' + prefix + name + r'\s*\(\s*')
+    if re_param.match(line):
+        return "param"
+    if re_no_param.match(line):
+        return "no_param"
+    if re_param_end.match(line):
+        return "no_param"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=10000,
+                        help="lines of the destination file (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    hdl_module_interface = import_hdl_module("hdl_module_interface")
+    HdlModuleInterface = hdl_module_interface.HdlModuleInterface
+    HdlPort = hdl_module_interface.HdlPort
+
+    module_interface = HdlModuleInterface(
+            "sub", [HdlPort("clk", direction=HdlPort.PORT_IN),
+                    HdlPort("dout", width=8)])
+    detect_cached = module_interface._HdlModuleInterface__detect_module_inst_begin
+
+    l_lines = ["module top (input logic clk);\n"] + [
+            f"    logic [7:0] r{i}; assign r{i} = 8'd{i%256};\n"
+            for i in range(args.lines - 2)] + ["endmodule\n"]
+
+    def run_per_call():
+        for line in l_lines:
+            detect_module_inst_begin_per_call(module_interface, line)
+
+    def run_cached():
+        for line in l_lines:
+            detect_cached(line)
+
+    t_per_call = time_best_of(run_per_call, args.repeat) / len(l_lines)
+    t_cached = time_best_of(run_cached, args.repeat) / len(l_lines)
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        s_file_name = os.path.join(dir_tmp, "top.sv")
+
+        def run_update():
+            # (same file contents for every run, without instantiation)
+            with open(s_file_name, 'w') as f_out:
+                f_out.writelines(l_lines)
+            module_interface.update_instantiation(
+                    s_file_name, overwrite=True, no_create=True)
+
+        t_update = time_best_of(run_update, args.repeat) / len(l_lines)
+
+    print(f"{len(l_lines)} lines")
+    print(f"detection per line, compiled per call: {t_per_call*1e6:6.2f} us")
+    print(f"detection per line, cached patterns:   {t_cached*1e6:6.2f} us")
+    print(f"update_instantiation per line:         {t_update*1e6:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# XilinxDebugCoreManager.scan_module on a huge netlist (see gen_netlist): the
+# memory-mapped scan (_scan_module_mmap) against the scan line by line
+#
+# usage: python bench_scan_netlist.py [--size-mb 500] [--file netlist.v]
+
+import os
+import argparse
+import tempfile
+
+from bench_util import import_hdl_module, time_best_of
+from gen_netlist import generate_netlist
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=500,
+                        help="size of the generated netlist in MB (default: %(default)s)")
+    parser.add_argument("--file", default=None,
+                        help="netlist to scan (generated if it doesn't exist, "
+                        "default: a temporary file)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    XilinxDebugCoreManager = import_hdl_module(
+            "hdl_xilinx_debug_core_manager").XilinxDebugCoreManager
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        s_file_name = args.file or os.path.join(dir_tmp, "netlist_top.v")
+        if not os.path.exists(s_file_name):
+            generate_netlist(s_file_name, int(args.size_mb * 1024*1024))
+        size_mb = os.path.getsize(s_file_name) / (1024*1024)
+
+        def scan_mmap():
+            return XilinxDebugCoreManager.scan_module(s_file_name, keep_lines=False)
+
+        class LineScanManager(XilinxDebugCoreManager):
+            # (never the mmap path)
+            MMAP_SCAN_MIN_SIZE = float("inf")
+
+        def scan_lines():
+            return LineScanManager.scan_module(s_file_name, keep_lines=False)
+
+        assert scan_mmap().decl_digest == scan_lines().decl_digest, \
+                "mmap and line scan disagree"
+
+        t_lines = time_best_of(scan_lines, args.repeat)
+        t_mmap = time_best_of(scan_mmap, args.repeat)
+
+    print(f"netlist: {size_mb:.0f} MB")
+    print(f"line scan: {t_lines:8.3f} s ({size_mb/t_lines:7.1f} MB/s)")
+    print(f"mmap scan: {t_mmap:8.3f} s ({size_mb/t_mmap:7.1f} MB/s)")
+    print(f"speedup:   {t_lines/t_mmap:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
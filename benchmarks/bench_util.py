@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+# common helpers of the benchmark scripts
+#
+# The scripts are run directly ("python benchmarks/bench_scan_netlist.py"),
+# thus the package they measure is imported by the name of its directory,
+# from its parent directory (the package dependencies, like m_code_manager,
+# have to be importable as for any other use of the package).
+
+import os
+import sys
+import time
+import importlib
+
+DIR_PACKAGE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_hdl_module(name):
+    """:returns: the module name (e.g. "hdl_module_interface") of the package
+    that this benchmarks directory belongs to
+    """
+    dir_parent, package_name = os.path.split(DIR_PACKAGE)
+    if dir_parent not in sys.path:
+        sys.path.insert(0, dir_parent)
+    return importlib.import_module(package_name + "." + name)
+
+
+def time_best_of(func, repeat=3, number=1):
+    """:returns: the best time of repeat runs of number calls of func, in
+    seconds per call
+    """
+    t_best = None
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        for _ in range(number):
+            func()
+        t = (time.perf_counter() - t_start) / number
+        if t_best is None or t < t_best:
+            t_best = t
+    return t_best
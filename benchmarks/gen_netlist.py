@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+# generator of a synthetic flat Verilog netlist (as written by synthesis, for
+# XilinxDebugCoreManager.scan_module): one module with lots of wires and cell
+# instances and, somewhere in the middle, a handful of vio/ila debug signals
+
+import argparse
+
+# (one cell instance plus its output wire)
+S_CELL = """  wire n{i};
+  LUT6 #(
+    .INIT(64'h{init:016X}))
+    lut_{i}
+       (.I0(n{i0}),
+        .I1(n{i1}),
+        .I2(n{i2}),
+        .I3(clk),
+        .I4(1'b0),
+        .I5(1'b1),
+        .O(n{i}));
+"""
+
+L_DEBUG_SIGNALS = [
+    "  logic vio_ctrl_clk;\n",
+    "  logic [7:0] vio_ctrl_out_cfg; // radix=hex\n",
+    "  logic [31:0] vio_ctrl_in_status;\n",
+    "  logic ila_ctrl_bus_clk;\n",
+    "  logic [15:0] ila_ctrl_bus_data;\n",
+    "  logic ila_ctrl_bus_valid;\n",
+]
+
+
+def generate_netlist(s_file_name, size, module_name="netlist_top"):
+    """write a netlist of (roughly, at least) size bytes to s_file_name
+
+    :returns: the number of cell instances
+    """
+    with open(s_file_name, 'w') as f_out:
+        f_out.write(f"module {module_name} (\n  input clk\n);\n")
+        num_written = f_out.tell()
+        i = 0
+        debug_signals_done = False
+        while num_written < size:
+            s_cell = S_CELL.format(
+                    i=i, init=(i * 0x9E3779B97F4A7C15) & (2**64-1),
+                    i0=max(i-1, 0), i1=max(i-7, 0), i2=max(i-31, 0))
+            f_out.write(s_cell)
+            num_written += len(s_cell)
+            i += 1
+            if not debug_signals_done and num_written >= size // 2:
+                f_out.writelines(L_DEBUG_SIGNALS)
+                debug_signals_done = True
+        if not debug_signals_done:
+            f_out.writelines(L_DEBUG_SIGNALS)
+        f_out.write("endmodule\n")
+    return i
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("file", help="netlist file to write (*.v)")
+    parser.add_argument("--size-mb", type=float, default=500,
+                        help="netlist size in MB (default: %(default)s)")
+    args = parser.parse_args()
+    num_cells = generate_netlist(args.file, int(args.size_mb * 1024*1024))
+    print(f"{args.file}: {num_cells} cells")
+
+
+if __name__ == "__main__":
+    main()
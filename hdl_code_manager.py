@@ -8,11 +8,19 @@ import os
 import re
 import shutil
 import json
+import concurrent.futures
 from operator import itemgetter
 import inspect
+import xml.etree.ElementTree as ET
 
 import code_manager
-from .hdl_module_interface import HdlModuleInterface
+from .hdl_module_index import HdlModuleIndex
+from .hdl_sv_preprocessor import SvPreprocessorContext
+from .hdl_project_config import ProjectConfig
+from .hdl_xilinx_project import find_xpr_file, read_xpr_settings, xpr_setting_matches
+from .hdl_vivado_server import VivadoTclSession, VivadoTclServer, VivadoTclClient
+from .hdl_tool_runner import ToolRunner
+from .hdl_file_discovery import find_hdl_files, find_module_file, HDL_EXTENSIONS
 from .hdl_xilinx_debug_core_manager import XilinxDebugCoreManager
 from m_code_manager.util.mcm_config import McmConfig
 
@@ -28,6 +36,19 @@ class _BoardSpecs():
     # somewhere
     PATH_CONSTRAINT_FILES_DEFAULT = "/usr/local/share/m_code_manager/hdl/constraints"
 
+    # vendor naming conventions for master constraints files: vendor -> 
+    # function that derives the (lower case) constraints file name from the 
+    # (lower case) xilinx board specifier. To support another vendor, add it 
+    # here.
+    CONSTRAINTS_FILE_NAME_CONVENTIONS = {
+            # digilent naming convention: arty-a7-35 -> Arty-A7-35-Master.xdc
+            "digilent": lambda board_specifier: board_specifier + "-master.xdc",
+            }
+
+    # constraints directory -> (mtime of the directory, dict of lower case 
+    # file name -> path), see __get_constraints_file_index
+    _d_constraints_file_index = {}
+
     def __init__(self, xilinx_board_specifier, constraints_file):
         """
         :constraints_file: path(!) to the constraints file - for specifying 
@@ -111,21 +132,16 @@ f"""No matching constraints file could be found for board specifier
         if os.path.isfile(os.path.join(path_constraint_files, constraints_file_name)):
             return os.path.join(path_constraint_files, constraints_file_name)
 
-        l_constraint_files = os.listdir(path_constraint_files)
-
-        # DIGILENT
-        # digilent naming convention: arty-a7-35 -> Arty-A7-35-Master.xdc
-        # the simple solution: append "-master.xdc" and do a case-insensitive 
-        # match
-        xdc_file_name_lower_case = xilinx_board_specifier + "-master.xdc"
-        pattern = re.compile(xdc_file_name_lower_case, re.IGNORECASE)
-        # (might not be the prime usage of an iterator to straight-up compress 
-        # it into a list, but it does the trick here)
-        l_matches = list(filter(pattern.match, l_constraint_files))
-        if l_matches:
-            # classic, take the first list element, because if the list has more 
-            # than one element, you have already messed up anyways
-            return os.path.join(path_constraint_files, l_matches[0])
+        d_constraints_files = cls.__get_constraints_file_index(path_constraint_files)
+
+        # vendor naming conventions, case-insensitive (the first vendor whose 
+        # file exists wins)
+        board_specifier_lower_case = xilinx_board_specifier.lower()
+        for fun_file_name in cls.CONSTRAINTS_FILE_NAME_CONVENTIONS.values():
+            constraints_file = d_constraints_files.get(
+                    fun_file_name(board_specifier_lower_case))
+            if constraints_file:
+                return constraints_file
 
         # TODO: as a fallback, provide an option to custom implement tupels with 
         # prepared constraints files
@@ -133,6 +149,31 @@ f"""No matching constraints file could be found for board specifier
         # not found?
         return None
 
+    @classmethod
+    def __get_constraints_file_index(cls, path_constraint_files):
+        """:returns: dict lower case file name -> path of all files in 
+        path_constraint_files (empty if the directory doesn't exist). The dict 
+        is built once per directory, and only rebuilt if the directory's mtime 
+        changes (aka files were added, removed or renamed).
+        """
+        try:
+            mtime = os.stat(path_constraint_files).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        index = cls._d_constraints_file_index.get(path_constraint_files)
+        if index and index[0] == mtime:
+            return index[1]
+
+        d_constraints_files = {}
+        with os.scandir(path_constraint_files) as it_entries:
+            # (sorted, such that it's deterministic which file wins if two only 
+            # differ in case - if that happens, you have already messed up 
+            # anyways)
+            for entry in sorted(it_entries, key=lambda x: x.name, reverse=True):
+                d_constraints_files[entry.name.lower()] = entry.path
+        cls._d_constraints_file_index[path_constraint_files] = (mtime, d_constraints_files)
+        return d_constraints_files
+
 
 class HdlCodeManager(code_manager.CodeManager):
 
@@ -162,8 +203,11 @@ class HdlCodeManager(code_manager.CodeManager):
             'SCRIPT_MANAGE_BUILDS':         "manage_build_files.bash",
             'SCRIPT_XILINX_VIO_CONTROL':    "vio_ctrl.tcl",
             'FILE_PROJECT_CONFIG':          "project_config.json",
+            'FILE_MODULE_INDEX':            ".module_index.json",
             'FILE_MAKE_VARIABLES':          "var.mk",
             'FILE_XILINX_VIO_CONTROL_SIGNALS_CONFIG':   "vio_ctrl_signals.json",
+            'FILE_XIP_CTRL_CACHE':          ".xip_ctrl_cache.json",
+            'FILE_VIVADO_SERVER':           ".vivado_server.json",
             'FILE_XILINX_IP_DEF_USER':      "xips_user.tcl",
             'FILE_XILINX_IP_DEBUG_CORES':   "xips_debug_cores.tcl",
             'FILE_TB_SV_IFC_RST':           "ifc_rst.sv",
@@ -187,7 +231,11 @@ class HdlCodeManager(code_manager.CodeManager):
         # why passing the language to the base class init? See (way too 
         # extensive) comment in python_code_manager
         self.xilinx_debug_core_manager = XilinxDebugCoreManager()
-        self.project_config = self._load_project_config()
+        self._module_index = None
+        self._sv_preprocessor_context = None
+        # (shared by everything that reads or writes the project config, read 
+        # lazily, see ProjectConfig)
+        self.project_config = ProjectConfig(self.PLACEHOLDERS['FILE_PROJECT_CONFIG'])
 
         self.static_submodules = {
                 "scripts": {
@@ -233,16 +281,10 @@ get into that at some point. Sorry about that...
         you are in a project directory). Depending on the project type, add the 
         submodules belonging to that vendor to the static self.static_submodules
         """
-        if os.path.exists(self.PLACEHOLDERS['FILE_PROJECT_CONFIG']):
-            with open(self.PLACEHOLDERS['FILE_PROJECT_CONFIG'], 'r') as f_in:
-                project_config = json.load(f_in)
-            try:
-                project_type = project_config["project_type"]
-            except KeyError:
-                project_type = ""
-
-            if project_type:
-                dynamic_submodules = self._get_dynamic_submodules(project_type)
+        project_config = self._load_project_config()
+        if project_config.exists:
+            project_type = project_config.get("project_type", "")
+            dynamic_submodules = self._get_dynamic_submodules(project_type)
 
             return {**self.static_submodules, **dynamic_submodules}
         else:
@@ -262,6 +304,7 @@ get into that at some point. Sorry about that...
     def _command_project(self, subcommand=HDL_PROJECT_TYPES,
                          target=None, part=None, board_part=None, top=None,
                          hdl_lib=None, xil_tool=None,
+                         manifest=None, max_workers=None,
                          **kwargs):
         """Creates the skeleton for an hdl project as generic as possible. That 
         mainly is, create the hdl project directory structure and add common 
@@ -279,6 +322,12 @@ get into that at some point. Sorry about that...
         design guideline is to really only delete files when that is 
         unambiguously confirmed. In this case, if the user really wants an 
         entirely new project, they can easily delete an existing one manually.
+
+        :manifest: json file with a list of projects ({"target", "part", 
+        "board_part", "top"}), to create/update all of them at once (see 
+        _create_projects). target, part, board_part and top are ignored then.
+        :max_workers: number of parallel workers for manifest, default: see 
+        concurrent.futures.ThreadPoolExecutor
         """
 
         # TODO: temporary rtl directory structure. So far, everything gets 
@@ -286,6 +335,10 @@ get into that at some point. Sorry about that...
         # projects, not ideal for larger projects, but that's something to 
         # address later on.
 
+        if manifest is not None:
+            self._create_projects(subcommand, manifest, max_workers)
+            return
+
         ##############################
         # PROJECT DIRECTORY
         ##############################
@@ -301,6 +354,70 @@ get into that at some point. Sorry about that...
                     pass
                 os.chdir(prj_name)
 
+        # (self.project_config picks up the project config file written here on 
+        # its next access, see ProjectConfig)
+        l_actions, _ = self._plan_project(
+                subcommand, "", part=part, board_part=board_part, top=top)
+        self._execute_project_actions(l_actions)
+
+        if subcommand == "":
+            print("You must specify a project platform (xilinx or others)")
+        elif subcommand != "xilinx":
+            print(f"Project platform '{subcommand}' unknown")
+
+    def _create_projects(self, subcommand, manifest, max_workers=None):
+        """create/update all projects listed in the json file manifest, in 
+        parallel
+
+        Everything that needs to be resolved or asked for (board specs, 
+        templates, whether files may be edited) is done up front, in this 
+        process; each board spec and template is looked up only once for all 
+        projects. The workers then only create the directories and write the 
+        files of their project, by absolute paths (no chdir, which would affect 
+        all workers).
+
+        :manifest: json file, list of {"target", "part", "board_part", "top"} 
+        (only target is mandatory)
+        """
+        with open(manifest, 'r') as f_in:
+            l_projects = json.load(f_in)
+
+        d_board_specs = {}
+        d_templates = {}
+        l_project_actions = []
+        for d_project in l_projects:
+            prj_dir = os.path.abspath(d_project["target"])
+            if not self._check_target_edit_allowed(prj_dir):
+                continue
+            l_actions, _ = self._plan_project(
+                    subcommand, prj_dir,
+                    part=d_project.get("part"),
+                    board_part=d_project.get("board_part"),
+                    top=d_project.get("top"),
+                    d_board_specs=d_board_specs, d_templates=d_templates)
+            l_project_actions.append(l_actions)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # (list, to re-raise the exceptions of the workers, if any)
+            list(executor.map(self._execute_project_actions, l_project_actions))
+
+    def _plan_project(self, subcommand, prj_dir="", part=None, board_part=None,
+                      top=None, d_board_specs=None, d_templates=None):
+        """collect everything that _command_project creates or updates in the 
+        project directory prj_dir, without writing anything yet (only the edit 
+        checks of _check_target_edit_allowed happen here)
+
+        :d_board_specs: dict board_part -> _BoardSpecs of the board specs that 
+        have been resolved already (gets extended by this method)
+        :d_templates: dict template name -> template, same idea
+        :returns: (list of actions for _execute_project_actions, project 
+        config dict or None if there is none)
+        """
+        if d_board_specs is None:
+            d_board_specs = {}
+        if d_templates is None:
+            d_templates = {}
+
         ##############################
         # SUBDIRECTORIES
         ##############################
@@ -315,19 +432,10 @@ get into that at some point. Sorry about that...
                 'DIR_XILINX_HW_BUILD_LOG', 'DIR_HW_EXPORT',
                 'DIR_XILINX_IPS',
                 )(self.PLACEHOLDERS)
-        for directory in project_dirs:
-            # it's not necessary to run a 'file allowed to be edited' check here, 
-            # since os.mkdir never deletes anything. It only throws an exception 
-            # if the directory exists.
-            try:
-                os.mkdir(directory)
-            except FileExistsError:
-                # again, if a project directory already exists, that's fine 
-                # (assuming that it's a directory, theoretically could be 
-                # a file as well. but at some point users gotta act 
-                # reasonably, such as not to create files with meaningful 
-                # names and without file extensions)
-                pass
+        # it's not necessary to run a 'file allowed to be edited' check for 
+        # these, creating a directory never deletes anything
+        l_actions = [("mkdir", os.path.join(prj_dir, x)) for x in project_dirs]
+        project_config = None
 
         ############################################################
         # SCRIPTING
@@ -345,18 +453,23 @@ get into that at some point. Sorry about that...
             else:
                 part = ""
             if board_part is not None:
-                board_specs = _BoardSpecs.get_board_specs_obj(
-                        board_part, global_config=self.global_config)
+                if board_part not in d_board_specs:
+                    d_board_specs[board_part] = _BoardSpecs.get_board_specs_obj(
+                            board_part, global_config=self.global_config)
+                board_specs = d_board_specs[board_part]
             else:
                 board_specs = _BoardSpecs("", "")
 
             # xilinx IP definition file
             s_target_file = os.path.join(
+                    prj_dir,
                     self.PLACEHOLDERS['DIR_XILINX_IPS'],
                     self.PLACEHOLDERS['FILE_XILINX_IP_DEF_USER'])
             if self._check_target_edit_allowed(s_target_file):
-                template_out = self._load_template("xips_def_user")
-                self._write_template(template_out, s_target_file)
+                if "xips_def_user" not in d_templates:
+                    d_templates["xips_def_user"] = self._load_template("xips_def_user")
+                l_actions.append(
+                        ("template", list(d_templates["xips_def_user"]), s_target_file))
 
             ##############################
             # CONSTRAINTS FILE
@@ -367,9 +480,11 @@ get into that at some point. Sorry about that...
             # people don't like splitting up makefiles
             if board_specs.constraints_file:
                 s_target_file = os.path.join(
-                        self.PLACEHOLDERS['DIR_CONSTRAINTS'], board_specs.constraints_file_name)
+                        prj_dir,
+                        self.PLACEHOLDERS['DIR_CONSTRAINTS'],
+                        board_specs.constraints_file_name)
                 if self._check_target_edit_allowed(s_target_file):
-                    shutil.copy2(board_specs.constraints_file, s_target_file)
+                    l_actions.append(("copy", board_specs.constraints_file, s_target_file))
 
             ##############################
             # PROJECT CONFIG FILE
@@ -394,11 +509,11 @@ get into that at some point. Sorry about that...
             # fact that it gives you a quick overview on every project variable 
             # that has somewhat of a dynamic character to it.
             if top is not None:
-                s_top_module = ""
-            else:
                 s_top_module = top
-            s_target_file = self.PLACEHOLDERS['FILE_PROJECT_CONFIG']
-            self.project_config = {
+            else:
+                s_top_module = ""
+            s_target_file = os.path.join(prj_dir, self.PLACEHOLDERS['FILE_PROJECT_CONFIG'])
+            project_config = {
                 "project_type": subcommand,
                 "part": part,
                 "board_part": board_specs.xilinx_board_specifier,
@@ -413,15 +528,32 @@ get into that at some point. Sorry about that...
                 "sim_verbosity": 2
                 }
             if self._check_target_edit_allowed(s_target_file):
-                self._write_project_config()
+                l_actions.append(("json", project_config, s_target_file))
 
-        elif subcommand == "":
-            print("You must specify a project platform (xilinx or others)")
-        else:
-            print(f"Project platform '{subcommand}' unknown")
+        return l_actions, project_config
+
+    def _execute_project_actions(self, l_actions):
+        """carry out the actions from _plan_project, in order. Must not depend 
+        on the current working directory or any other state of self (it runs in 
+        parallel for multiple projects, see _create_projects)
+        """
+        for action, *args in l_actions:
+            if action == "mkdir":
+                os.makedirs(args[0], exist_ok=True)
+            elif action == "template":
+                self._write_template(args[0], args[1])
+            elif action == "copy":
+                shutil.copy2(args[0], args[1])
+            elif action == "json":
+                project_config = ProjectConfig(args[1])
+                project_config.replace(args[0])
+                project_config.write()
+            else:
+                raise ValueError(f"Unknown project action '{action}'")
 
     def _load_project_config(self):
-        """return the contents of the project config json file as a dict
+        """return the project config (ProjectConfig, the shared object 
+        self.project_config), re-read if the file has changed on disk
         """
         # (quickly, why do we use json instead of yaml? Answer: it works with 
         # the tcl packages in older vivado versions (namely 2019.1 in the test 
@@ -429,15 +561,15 @@ get into that at some point. Sorry about that...
         # where in older versions importing a yaml script as a tcl dict didn't 
         # work straightforward when tested. json however, being the older format, 
         # did, so we go with that)
-        if os.path.isfile(self.PLACEHOLDERS['FILE_PROJECT_CONFIG']):
-            with open(self.PLACEHOLDERS['FILE_PROJECT_CONFIG'], 'r') as f_in:
-                self.project_config = json.load(f_in)
-        else:
-            self.project_config = {}
+        self.project_config.refresh()
+        return self.project_config
 
     def _write_project_config(self):
-        with open(self.PLACEHOLDERS['FILE_PROJECT_CONFIG'], 'w') as f_out:
-            json.dump(self.project_config, f_out, indent=4)
+        """write self.project_config, if anything has changed
+
+        :returns: True if the file was written
+        """
+        return self.project_config.write()
 
     def _ext_script_handler(self, submodule, script, symlink=False) -> bool:
         """special file handling:
@@ -476,9 +608,11 @@ get into that at some point. Sorry about that...
 
     def _command_config(self, top=None, sim_top=None, part=None, board_part=None,
                         hw_version=None, simulator=None, xil_tool=False,
-                        vio_top=None,no_xil_update=False, **kwargs):
+                        vio_top=None,no_xil_update=False, xil_timeout=None, **kwargs):
         """update the project config file (self.PLACEHOLDERS['FILE_PROJECT_CONFIG']) 
         with the specified parameters
+
+        :xil_timeout: timeout (in seconds) for the vivado project update
         """
 
         # the goal: automatically update the config for all non-None arguments
@@ -496,7 +630,7 @@ get into that at some point. Sorry about that...
         # - are not 'self'
         # - are not None
         # - are not in the list of non_config_arguments that we define
-        non_config_arguments = ['no_xil_update']
+        non_config_arguments = ['no_xil_update', 'xil_timeout']
 
         # meaning of xil_project_parameters: those are the ones that play a role 
         # in the xilinx project. So if one of those gets passed, we need to call 
@@ -538,6 +672,17 @@ get into that at some point. Sorry about that...
 
         self._write_project_config()
 
+        # whether the vivado project needs an update is decided by the vivado 
+        # project itself, if it exists: it might not have been updated for 
+        # earlier config changes (no_xil_update, or vivado failed), or have been 
+        # changed in the GUI. Then all differences get applied in this one 
+        # batch run, and if there aren't any, vivado doesn't need to launch at 
+        # all.
+        if not no_xil_update:
+            l_xil_mismatches = self._get_xil_project_mismatches(xil_project_parameters)
+            if l_xil_mismatches is not None:
+                update_xil_project = bool(l_xil_mismatches)
+
         # update the vivado project if necessary
         # TODO: maybe there is a more elegant way to select the xilinx tool, but 
         # for now it's good enough to default to vivado
@@ -546,7 +691,91 @@ get into that at some point. Sorry about that...
                 xil_tool = "vivado"
             s_tcl_manage_prj = os.path.join(
                 self.PLACEHOLDERS['DIR_SCRIPTS_XIL'], self.PLACEHOLDERS['SCRIPT_MANAGE_XIL_PRJ'])
-            os.system(f"{xil_tool} -mode batch -source {s_tcl_manage_prj}")
+            if not self._run_xil_script_server(s_tcl_manage_prj):
+                self._run_tool(
+                        [xil_tool, "-mode", "batch", "-source", s_tcl_manage_prj],
+                        name="manage_project", timeout=xil_timeout)
+
+    def _run_tool(self, l_command, name=None, timeout=None):
+        """run an external tool, with its output going to the terminal and to 
+        a log file in DIR_XILINX_HW_BUILD_LOG, where the run also gets recorded 
+        in the run log (see ToolRunner)
+
+        :returns: ToolRunResult
+        """
+        result = ToolRunner(self.PLACEHOLDERS['DIR_XILINX_HW_BUILD_LOG']).run(
+                l_command, name=name, timeout=timeout)
+        if result.timed_out:
+            print(f"'{l_command[0]}' timed out after {timeout} s (log: {result.log_file})")
+        elif result.returncode != 0:
+            print(f"'{l_command[0]}' failed with exit code {result.returncode} "
+                  f"(log: {result.log_file})")
+        return result
+
+    def _run_xil_script_server(self, s_tcl_script, l_args=()):
+        """run a tcl script in the vivado session of the vivado server of this 
+        project (see _command_vivado_server), if there is one running
+
+        :returns: False if there is no vivado server, True otherwise
+        """
+        client = VivadoTclClient.connect(self.PLACEHOLDERS['FILE_VIVADO_SERVER'])
+        if not client:
+            return False
+        with client:
+            _, s_output = client.source(os.path.abspath(s_tcl_script), l_args)
+        print(s_output, end="")
+        return True
+
+    def _command_vivado_server(self, xil_tool=None, stop=False, stand_in=False,
+                               **kwargs):
+        """start a long-lived vivado tcl session for the project in the current 
+        directory, which commands that would otherwise launch 'vivado -mode 
+        batch' use instead (saving the tool startup every time). Runs until 
+        stopped with stop (or interrupted).
+
+        :stop: stop the vivado server of the project
+        :stand_in: run a pure-python stand-in instead of vivado (for testing, 
+        see hdl_vivado_server)
+        """
+        file_server = self.PLACEHOLDERS['FILE_VIVADO_SERVER']
+        if stop:
+            client = VivadoTclClient.connect(file_server)
+            if not client:
+                print("No vivado server running for this project")
+                return
+            with client:
+                client.stop()
+            return
+
+        client = VivadoTclClient.connect(file_server)
+        if client:
+            client.close()
+            print("A vivado server is already running for this project")
+            return
+        if not xil_tool:
+            xil_tool = "vivado"
+        session = VivadoTclSession(xil_tool, cwd=os.getcwd(), stand_in=stand_in)
+        VivadoTclServer(session, file_server).serve_forever()
+
+    def _get_xil_project_mismatches(self, l_parameters):
+        """compare the project config with the settings in the vivado project 
+        file
+
+        :l_parameters: project config keys to compare (see XPR_SETTINGS)
+        :returns: list of the keys that differ (keys that are empty in the 
+        project config don't count), None if there is no vivado project (file) 
+        to compare with
+        """
+        xpr_file = find_xpr_file()
+        if not xpr_file:
+            return None
+        try:
+            d_xpr_settings = read_xpr_settings(xpr_file)
+        except ET.ParseError:
+            return None
+        return [key for key in l_parameters
+                if self.project_config.get(key) and not xpr_setting_matches(
+                    key, self.project_config[key], d_xpr_settings.get(key))]
 
     def _command_testbench(self, module, simulator="generic", flow="sv_class", **kwargs):
         """generate a testbench with an optional parameter to use the template 
@@ -570,14 +799,18 @@ get into that at some point. Sorry about that...
             # MODULE-SPECIFIC
             ##############################
 
+            # (before creating anything: the testbench is generated from the 
+            # module's ports)
+            hdl_module_interface = self._get_module_index().get_interface(module)
+            if hdl_module_interface is None:
+                raise FileNotFoundError(
+                    f"No (parsable) declaration of module '{module}' found in "
+                    f"'{self.PLACEHOLDERS['DIR_RTL']}'")
+
             dir_tb_module = os.path.join(self.PLACEHOLDERS['DIR_TB'], module)
             if not os.path.isdir(dir_tb_module):
                 os.mkdir(dir_tb_module)
 
-            s_file_module = os.path.join(
-                    self.PLACEHOLDERS['DIR_RTL'], module + ".sv")
-            hdl_module_interface = HdlModuleInterface.from_sv(s_file_module)
-
             # TESTBENCH TOP
             # TODO: dynamic placeholder INST_MODULE
             s_target_file = os.path.join(dir_tb_module, "tb_" + module + ".sv")
@@ -627,8 +860,56 @@ get into that at some point. Sorry about that...
         else:
             print(f"Simulator/Testbench flow {simulator} is not implemented or supported yet")
 
+    def _find_rtl_files(self):
+        """return the paths of all HDL files in the project's RTL directory 
+        (recursively, see hdl_file_discovery)
+        """
+        return list(find_hdl_files([self.PLACEHOLDERS['DIR_RTL']], HDL_EXTENSIONS))
+
+    def _get_module_index(self):
+        """return the project's module index (see HdlModuleIndex), refreshed 
+        once per code manager run
+        """
+        if self._module_index is None:
+            self._module_index = HdlModuleIndex(
+                    self.PLACEHOLDERS['FILE_MODULE_INDEX'],
+                    [self.PLACEHOLDERS['DIR_RTL']],
+                    preprocessor_context=self._get_sv_preprocessor_context())
+            self._module_index.refresh()
+        return self._module_index
+
+    def _get_sv_preprocessor_context(self):
+        """return the context for preprocessing HDL sources (see 
+        SvPreprocessorContext): the "defines" and "include_dirs" of the project 
+        config. Created once per code manager run, such that everything that 
+        parses HDL files shares its include cache.
+        """
+        if self._sv_preprocessor_context is None:
+            self._sv_preprocessor_context = SvPreprocessorContext.from_project_config(
+                    self._load_project_config())
+        return self._sv_preprocessor_context
+
+    def _find_module_file(self, module):
+        """:returns: path of the RTL file that declares module. If the module 
+        index doesn't know the module (e.g. because its declaration can't be 
+        parsed), fall back to a file named <module>.<ext> anywhere in the RTL 
+        directory tree.
+
+        :raises: FileNotFoundError if no such file exists
+        """
+        s_file_module = self._get_module_index().get_file(module)
+        if not s_file_module:
+            s_file_module = find_module_file(
+                    [self.PLACEHOLDERS['DIR_RTL']], module, HDL_EXTENSIONS)
+        if not s_file_module:
+            raise FileNotFoundError(
+                f"No file declaring module '{module}' found in "
+                f"'{self.PLACEHOLDERS['DIR_RTL']}'")
+        return s_file_module
+
     def _command_xip_ctrl(self, target=None,
                           print_signal_formats=False, write_user_template=False,
+                          all_modules=False,
                           **kwargs):
         """invoke XilinxDebugCoreManager to generate vio ctrl IP core target files, 
         based on a set of vio-connection signals.
@@ -638,6 +919,9 @@ get into that at some point. Sorry about that...
         processing.
         :write_user_template: If specified, the command only tries to print the 
         user template to `xip_ctrl/<vio_top>_vio_ctrl.tcl`
+        :all_modules: (--all) If specified, every .sv/.v/.vhd file in the 
+        project's RTL directory is processed, in parallel and with one single update of 
+        the vio signals json file (target is ignored)
 
         If no target (-t <target>) is specified, the top level module is 
         retrieved from the project config json file, and that file is analysed 
@@ -673,6 +957,33 @@ get into that at some point. Sorry about that...
                 template_out = self._load_template("vio_ctrl_user")
                 self._write_template(template_out, s_target_file, create_path=True)
 
+        elif all_modules:
+
+            ##############################
+            # PROCESS ALL MODULES
+            ##############################
+
+            file_vio_ctrl_signals = os.path.join(
+                    self.PLACEHOLDERS['DIR_XIP_CTRL'],
+                    self.PLACEHOLDERS['FILE_XILINX_VIO_CONTROL_SIGNALS_CONFIG'])
+            file_xip_ctrl_cache = os.path.join(
+                    self.PLACEHOLDERS['DIR_XIP_CTRL'],
+                    self.PLACEHOLDERS['FILE_XIP_CTRL_CACHE'])
+
+            self.xilinx_debug_core_manager.preprocessor_context = \
+                    self._get_sv_preprocessor_context()
+            # (every module that a file declares, by the name it is declared 
+            # with)
+            module_index = self._get_module_index()
+            l_rtl_files = self._find_rtl_files()
+            self.xilinx_debug_core_manager.process_modules(
+                    l_rtl_files,
+                    s_xip_declaration_dir=self.PLACEHOLDERS['DIR_XILINX_IPS'],
+                    s_json_file_name_signals=file_vio_ctrl_signals,
+                    s_cache_file_name=file_xip_ctrl_cache,
+                    d_file_modules={x: module_index.get_module_names(x)
+                                    for x in l_rtl_files})
+
         else:
 
             ##############################
@@ -685,23 +996,22 @@ get into that at some point. Sorry about that...
             else:
                 target_module = target
 
-            l_rtl_files = os.listdir(self.PLACEHOLDERS['DIR_RTL'])
-            # look for the file in the list of rtl files that matches the 
-            # <target_module>.sv. Theoretically, it looks for all files and takes 
-            # the first one. But if there is more than one match, then the root of 
-            # error is not my sloppy coding.
-            # TODO: fix invalid escape sequence warning
-            f_match_target_module = lambda x: re.match(target_module + r"\.sv", x)
-            s_target_module_file = [
-                    i for i in l_rtl_files if bool(f_match_target_module(i))][0]
-            s_target_module_path = os.path.join(
-                            self.PLACEHOLDERS['DIR_RTL'], s_target_module_file)
+            s_target_module_path = self._find_module_file(target_module)
 
             file_vio_ctrl_signals = os.path.join(
                     self.PLACEHOLDERS['DIR_XIP_CTRL'],
                     self.PLACEHOLDERS['FILE_XILINX_VIO_CONTROL_SIGNALS_CONFIG'])
+            file_xip_ctrl_cache = os.path.join(
+                    self.PLACEHOLDERS['DIR_XIP_CTRL'],
+                    self.PLACEHOLDERS['FILE_XIP_CTRL_CACHE'])
 
+            self.xilinx_debug_core_manager.preprocessor_context = \
+                    self._get_sv_preprocessor_context()
+            # (the module name as it is declared, the file might be named 
+            # differently or declare more than one module)
             self.xilinx_debug_core_manager.process_module(
                     s_target_module_path,
                     s_xip_declaration_dir=self.PLACEHOLDERS['DIR_XILINX_IPS'],
-                    s_json_file_name_signals=file_vio_ctrl_signals)
+                    s_json_file_name_signals=file_vio_ctrl_signals,
+                    s_cache_file_name=file_xip_ctrl_cache,
+                    module_name=target_module)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+# discovery of HDL source files in (nested) project directory trees
+#
+# Everything that needs to resolve a module name to a file, or needs the list
+# of all HDL files of a project, goes through here. The directory trees are
+# walked with os.scandir (which gets the file type from the directory entry
+# without an extra stat per file), and directories that never contain sources
+# (version control, tool and build output) are pruned instead of descended
+# into.
+
+import os
+
+HDL_EXTENSIONS_VERILOG = (".sv", ".v")
+HDL_EXTENSIONS_VHDL = (".vhd", ".vhdl")
+HDL_EXTENSIONS = HDL_EXTENSIONS_VERILOG + HDL_EXTENSIONS_VHDL
+
+# directory names that are never descended into
+SKIP_DIRS = {
+        ".git",
+        ".Xil",
+        "build",
+        "xips",
+        "hw_build_log",
+        "__pycache__",
+        }
+# same for directory name suffixes (vivado project output directories)
+SKIP_DIR_SUFFIXES = (
+        ".cache",
+        ".gen",
+        ".hw",
+        ".ip_user_files",
+        ".runs",
+        ".sim",
+        ".srcs",
+        )
+
+
+def _skip_dir(dir_name, skip_dirs):
+    return dir_name in skip_dirs or dir_name.endswith(SKIP_DIR_SUFFIXES)
+
+
+def find_hdl_files(l_root_dirs, extensions=HDL_EXTENSIONS_VERILOG,
+                   skip_dirs=SKIP_DIRS):
+    """generator over the paths of all files below l_root_dirs (recursively)
+    that have one of the given extensions. Root directories that don't exist
+    are ignored.
+
+    :l_root_dirs: list of directories
+    :extensions: tuple of file extensions (including the '.')
+    :skip_dirs: directory names that are not descended into
+    """
+    l_dirs = list(reversed(l_root_dirs))
+    while l_dirs:
+        dir_path = l_dirs.pop()
+        try:
+            with os.scandir(dir_path) as it_entries:
+                l_entries = sorted(it_entries, key=lambda x: x.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        l_subdirs = []
+        for entry in l_entries:
+            if entry.is_dir():
+                if not _skip_dir(entry.name, skip_dirs):
+                    l_subdirs.append(entry.path)
+            elif entry.name.endswith(extensions):
+                yield entry.path
+        # (depth-first, but files of a directory before the files in its
+        # subdirectories, and subdirectories in alphabetical order)
+        l_dirs.extend(reversed(l_subdirs))
+
+
+def find_module_file(l_root_dirs, module_name, extensions=HDL_EXTENSIONS_VERILOG,
+                     skip_dirs=SKIP_DIRS):
+    """find the file for module_name by its file name (<module_name><ext>),
+    without looking into any file
+
+    :returns: path of the first file that matches (in the order of
+    find_hdl_files and extensions), None if there is none
+    """
+    d_file_names = {module_name + ext: i for i, ext in enumerate(extensions)}
+    file_match = None
+    priority_match = len(extensions)
+    for file in find_hdl_files(l_root_dirs, extensions, skip_dirs):
+        priority = d_file_names.get(os.path.basename(file), priority_match)
+        if priority < priority_match:
+            file_match = file
+            priority_match = priority
+            if priority == 0:
+                break
+    return file_match
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+# file writing for everything that rewrites source files or generated files
+# which the build flow depends on
+#
+# Two things matter for those files: an interrupted write must never leave
+# a truncated file behind (the new contents go to a temporary file in the same
+# directory, which then atomically replaces the target), and a file whose
+# contents don't change must not be touched at all (its mtime drives make and
+# incremental synthesis). Files that multiple processes read, modify and
+# write back are guarded by file_lock (whose lock files are kept out of the
+# project directories).
+
+import os
+import shutil
+import hashlib
+import tempfile
+import contextlib
+try:
+    import fcntl
+except ImportError:
+    # (no file locking on non-posix systems)
+    fcntl = None
+
+
+def detect_newline(file):
+    """:returns: the line break style of file ("\r\n" or "\n"), judged by the
+    first line break in the file. None if the file doesn't exist or has no
+    line break.
+    """
+    try:
+        with open(file, 'rb') as f_in:
+            line = f_in.readline()
+    except FileNotFoundError:
+        return None
+    if line.endswith(b"\r\n"):
+        return "\r\n"
+    if line.endswith(b"\n"):
+        return "\n"
+    return None
+
+
+def write_lines_if_changed(file, l_lines, newline=None):
+    """write l_lines to file, atomically and only if that changes the contents
+    of file
+
+    :l_lines: list of str, with '\n' line breaks (as read in text mode)
+    :newline: line break style to write ("\n" or "\r\n"). Default: the style
+    that file already has, "\n" for new files
+    :returns: True if the file was written
+    """
+    # (a symlink stays a symlink, its target is replaced)
+    file = os.path.realpath(file)
+    if newline is None:
+        newline = detect_newline(file) or "\n"
+    s_content = "".join(l_lines)
+    if newline != "\n":
+        s_content = s_content.replace("\n", newline)
+
+    try:
+        # (newline='' -> no translation in either direction, compare and write
+        # exactly what is on disk)
+        with open(file, 'r', newline='') as f_in:
+            if f_in.read() == s_content:
+                return False
+        file_exists = True
+    except FileNotFoundError:
+        file_exists = False
+
+    dir_name = os.path.dirname(file) or "."
+    fd, file_tmp = tempfile.mkstemp(
+            dir=dir_name, prefix="." + os.path.basename(file) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', newline='') as f_out:
+            f_out.write(s_content)
+        if file_exists:
+            shutil.copymode(file, file_tmp)
+        else:
+            # (mkstemp creates the file with 0o600)
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(file_tmp, 0o666 & ~umask)
+        os.replace(file_tmp, file)
+    except BaseException:
+        os.unlink(file_tmp)
+        raise
+    return True
+
+
+def _get_lock_file_name(file):
+    """:returns: the lock file of file for file_lock: in a directory of the 
+    user in the temp directory (instead of next to file, where lock files 
+    would pile up in the project directories), named after the hash of the 
+    real path of file
+    """
+    dir_locks = os.path.join(tempfile.gettempdir(), f"hdl_file_locks-{os.getuid()}")
+    os.makedirs(dir_locks, mode=0o700, exist_ok=True)
+    s_hash = hashlib.sha1(os.path.realpath(file).encode()).hexdigest()
+    return os.path.join(dir_locks, s_hash + ".lock")
+
+
+@contextlib.contextmanager
+def file_lock(file):
+    """exclusive lock for read-modify-write cycles on file (via a lock file in 
+    the temp directory, see _get_lock_file_name, no locking on systems 
+    without fcntl). Creates the directory of file if it doesn't exist.
+    """
+    dir_name = os.path.dirname(file)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    if not fcntl:
+        yield
+        return
+    with open(_get_lock_file_name(file), 'w') as f_lock:
+        fcntl.flock(f_lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f_lock, fcntl.LOCK_UN)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+# on-disk index of the module declarations in a project's HDL sources
+#
+# The index maps module name -> file, and keeps the parsed port list of every
+# module. It is persisted as a json file and refreshed incrementally: a file
+# only gets parsed again if its mtime or size changed since the last refresh,
+# for the rest of the files a stat is all it costs. Thus commands that need
+# to find a module (or its interface) don't have to guess file names or
+# re-parse declarations on every invocation.
+#
+# The declarations are parsed after preprocessing (see hdl_sv_preprocessor),
+# so the index also depends on the defines (the whole index is rebuilt if they
+# change) and on the files that are included (a file is parsed again if one
+# of the files it includes has changed). VHDL files are indexed in the same
+# run, with their entities as modules (see HdlModuleInterface.all_from_vhdl).
+#
+# A file that can't be parsed doesn't stop the refresh, it is recorded with
+# the error (see failed_files) and parsed again once it changes.
+#
+# A module that is declared in more than one file is indexed with the file
+# that was parsed last. If that file goes away (or doesn't declare the module
+# anymore), one of the other files takes over. VHDL entity names are case
+# insensitive, they are indexed (and looked up) in lower case.
+
+import os
+import json
+
+from .hdl_file_util import write_lines_if_changed, file_lock
+from .hdl_module_interface import HdlModuleInterface
+from .hdl_sv_preprocessor import SvPreprocessorContext
+from .hdl_file_discovery import find_hdl_files, HDL_EXTENSIONS, HDL_EXTENSIONS_VHDL
+
+
+class HdlModuleIndex(object):
+
+    # bump whenever the format of the index file changes, an index file with
+    # a different version is discarded and rebuilt
+    VERSION = 7
+
+    def __init__(self, index_file, root_dirs, extensions=HDL_EXTENSIONS,
+                 preprocessor_context=None):
+        """
+        :index_file: path of the json file that holds the index
+        :root_dirs: list of directories which are searched (recursively) for
+        HDL files
+        :extensions: file extensions of the files to index
+        :preprocessor_context: SvPreprocessorContext (defines and include
+        directories), default: no defines
+        """
+        self.index_file = index_file
+        self.root_dirs = root_dirs
+        self.extensions = extensions
+        if preprocessor_context is None:
+            preprocessor_context = SvPreprocessorContext.get_default()
+        self.preprocessor_context = preprocessor_context
+
+        # files: file path -> {"mtime", "size", "modules", "includes"[, 
+        # "error"]}, with modules: the interfaces (see 
+        # HdlModuleInterface.to_dict) of the modules that the file declares, 
+        # includes: included file path -> [mtime, size], and error: why the 
+        # file couldn't be parsed
+        # modules: module key (see _get_key) -> file path
+        self._files = {}
+        self._modules = {}
+        # HdlModuleInterface objects that have already been created from the
+        # index in this run, by module key
+        self._interfaces = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r') as f_in:
+                d_index = json.load(f_in)
+        except (OSError, ValueError):
+            # a broken index is no reason to fail, it just gets rebuilt
+            return
+        if d_index.get("version") != self.VERSION \
+                or d_index.get("preprocessor") != self.preprocessor_context.key:
+            return
+        self._files = d_index["files"]
+        self._modules = d_index["modules"]
+
+    def _write(self):
+        d_index = {
+                "version": self.VERSION,
+                "preprocessor": self.preprocessor_context.key,
+                "files": self._files,
+                "modules": self._modules,
+                }
+        # (atomically and locked: a truncated index would have to be rebuilt, 
+        # and other commands might be refreshing it at the same time)
+        with file_lock(self.index_file):
+            write_lines_if_changed(self.index_file, [json.dumps(d_index, indent=4)])
+
+    @staticmethod
+    def _get_key(module_name, file):
+        """:returns: the key of module_name (declared in file) in modules"""
+        if file.lower().endswith(HDL_EXTENSIONS_VHDL):
+            return module_name.lower()
+        return module_name
+
+    def _lookup_key(self, module_name):
+        """:returns: the key of module_name in modules, None if it is not 
+        indexed
+        """
+        if module_name in self._modules:
+            return module_name
+        key = module_name.lower()
+        # (only VHDL entities by another case)
+        file = self._modules.get(key)
+        if file and self._get_key(module_name, file) == key:
+            return key
+        return None
+
+    def _remove_file(self, file, s_orphans):
+        """remove file from the index
+
+        :s_orphans: set of the keys of modules that file was indexed with 
+        (they need another file that declares them, see _adopt_orphans), 
+        updated here
+        """
+        for d_interface in self._files.pop(file)["modules"]:
+            key = self._get_key(d_interface["name"], file)
+            # (only if the module is not indexed with another file)
+            if self._modules.get(key) == file:
+                del self._modules[key]
+                self._interfaces.pop(key, None)
+                s_orphans.add(key)
+
+    def _adopt_orphans(self, s_orphans):
+        """index the modules in s_orphans with any other file that declares 
+        them
+        """
+        for file, d_file in self._files.items():
+            for d_interface in d_file["modules"]:
+                key = self._get_key(d_interface["name"], file)
+                if key in s_orphans and key not in self._modules:
+                    self._modules[key] = file
+
+    def refresh(self):
+        """stat all HDL files below root_dirs, and (re-)parse the ones that are
+        new or have changed since the last refresh. Files that don't exist
+        anymore are removed from the index. The index file is only written if
+        anything changed.
+        """
+        changed = False
+        s_files_found = set()
+        # modules whose file has been removed or changed
+        s_orphans = set()
+        # included file -> [mtime, size] (None if it doesn't exist), such that
+        # files that are included everywhere are only stat'ed once
+        d_include_stats = {}
+
+        for file in find_hdl_files(self.root_dirs, self.extensions):
+            s_files_found.add(file)
+            stat = os.stat(file)
+            d_file = self._files.get(file)
+            if d_file and d_file["mtime"] == stat.st_mtime_ns \
+                    and d_file["size"] == stat.st_size \
+                    and self._includes_unchanged(d_file["includes"], d_include_stats):
+                continue
+
+            if d_file:
+                self._remove_file(file, s_orphans)
+            # (all modules of the file, in one read. The preprocessor stays
+            # unused for VHDL files, which thus have no includes)
+            preprocessor = self.preprocessor_context.preprocessor(file)
+            s_error = None
+            try:
+                l_interfaces = list(HdlModuleInterface.all_from_file(
+                        file, preprocessor=preprocessor))
+            except Exception as e:
+                # (unreadable, not decodable, or anything the parsers trip 
+                # over: one broken file mustn't make the whole index unusable)
+                l_interfaces = []
+                s_error = f"{type(e).__name__}: {e}"
+            for module_interface in l_interfaces:
+                key = self._get_key(module_interface.name, file)
+                self._modules[key] = file
+                self._interfaces[key] = module_interface
+            self._files[file] = {
+                    "mtime": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "modules": [x.to_dict() for x in l_interfaces],
+                    "includes": {path: list(stat_key) for path, stat_key
+                                 in preprocessor.d_included_files.items()},
+                    }
+            if s_error:
+                self._files[file]["error"] = s_error
+            changed = True
+
+        for file in set(self._files) - s_files_found:
+            self._remove_file(file, s_orphans)
+            changed = True
+        if s_orphans:
+            self._adopt_orphans(s_orphans)
+
+        if changed:
+            self._write()
+
+    @staticmethod
+    def _includes_unchanged(d_includes, d_include_stats):
+        """:d_includes: included file -> [mtime, size] as in the index
+        :d_include_stats: see refresh
+        """
+        for path, stat_key in d_includes.items():
+            if path not in d_include_stats:
+                try:
+                    stat = os.stat(path)
+                    d_include_stats[path] = [stat.st_mtime_ns, stat.st_size]
+                except OSError:
+                    d_include_stats[path] = None
+            if d_include_stats[path] != stat_key:
+                return False
+        return True
+
+    @property
+    def failed_files(self):
+        """dict file path -> error message, of the files that couldn't be 
+        parsed
+        """
+        return {file: d_file["error"] for file, d_file in self._files.items()
+                if "error" in d_file}
+
+    @property
+    def module_names(self):
+        """the names of all indexed modules (VHDL entities in lower case)"""
+        return list(self._modules)
+
+    def get_module_names(self, file):
+        """:returns: list of the names of the modules that file declares (as 
+        declared, in the order of their declarations), empty if the file is 
+        not indexed
+        """
+        try:
+            return [x["name"] for x in self._files[file]["modules"]]
+        except KeyError:
+            return []
+
+    def get_file(self, module_name):
+        """:returns: path of the file that declares module_name (VHDL entities 
+        in any case), None if the module is not known
+        """
+        key = self._lookup_key(module_name)
+        return None if key is None else self._modules[key]
+
+    def get_interface(self, module_name):
+        """:returns: HdlModuleInterface of module_name (see get_file), None if 
+        the module is not known
+        """
+        key = self._lookup_key(module_name)
+        if key is None:
+            return None
+        try:
+            return self._interfaces[key]
+        except KeyError:
+            pass
+        file = self._modules[key]
+        for d_interface in self._files[file]["modules"]:
+            if self._get_key(d_interface["name"], file) == key:
+                module_interface = HdlModuleInterface.from_dict(d_interface)
+                self._interfaces[key] = module_interface
+                return module_interface
+        return None
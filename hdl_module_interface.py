@@ -1,27 +1,302 @@
 #!/usr/bin/env python3
 
-# supported module declaration syntax (whitespaces optional as per language 
-# syntax):
+# supported module declaration syntax:
 #
 # (SYSTEM)VERILOG
 #
-# module <module_name> #(
-# ...
-#     ) (
-# );
-#
-# module <module_name> (
-# );
-#
-# - no separate line for opening round bracket
-# - parameters are optional
+# any module declaration, with ANSI or non-ANSI style port list, see
+# hdl_sv_header_parser. The source goes through the preprocessor first (see
+# hdl_sv_preprocessor), thus ports in `ifdef branches and macros in port
+# declarations are taken as the defines say.
 #
 # VHDL
-# TODO
+#
+# entity declarations, with their generic and port lists, see
+# hdl_vhdl_entity_parser. The data type of a port is its subtype indication
+# ("std_logic_vector(W-1 downto 0)"), the range of vector types is also
+# translated into a SystemVerilog packed dimension ("[W-1:0]").
 
 # TODO: also update the parameter list
 
+import os
 import re
+import functools
+import concurrent.futures
+
+from .hdl_file_util import write_lines_if_changed
+from .hdl_sv_header_parser import iter_sv_module_headers, parse_sv_port_declaration
+from .hdl_sv_const_eval import eval_sv_parameters, get_sv_port_widths, SvConstEvalError
+from .hdl_sv_preprocessor import SvPreprocessorContext
+from .hdl_vhdl_entity_parser import (
+        iter_vhdl_entities, eval_vhdl_generics, get_vhdl_width, get_vhdl_range_sv)
+from .hdl_file_discovery import HDL_EXTENSIONS_VHDL
+
+
+@functools.lru_cache(maxsize=256)
+def _get_re_module_inst_begin_sv(module_name, inst_prefix):
+    """compile the pattern for detecting the begin of an instantiation of 
+    module_name (or the end of its parameterization), see 
+    HdlModuleInterface.__detect_module_inst_begin. The match group which 
+    matched tells the kind of match. Cached per module name, such that 
+    detection doesn't compile anything per line.
+    """
+    return re.compile(
+            r'\s*' + module_name + r'\s*#\(\s*(?P<param>)'
+            + r'|\s*' + module_name + r'\s*' + inst_prefix + module_name
+            + r'\s*\(\s*(?P<no_param>)'
+            + r'|\s*\)\s*' + inst_prefix + module_name + r'\s*\(\s*(?P<param_end>)')
+
+
+# PORT LISTS OF INSTANTIATIONS
+#
+# update_instantiations doesn't rebuild the port list of an instantiation, it 
+# edits it: _parse_port_list only records where each connection is in the 
+# source text, and _get_port_list_edits derives the (few) text edits that make 
+# the port list match the module interface. Everything else (connections of 
+# any form, comments, formatting) stays as it is.
+
+# whitespaces and comments
+_D_RE_SPACE = {
+        "sv": re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.S),
+        "vhdl": re.compile(r'(?:\s+|--[^\n]*|/\*.*?\*/)*', re.S),
+        }
+# comments and literals, in which brackets and separators don't count
+_D_RE_SKIP = {
+        "sv": re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"', re.S),
+        "vhdl": re.compile(r'--[^\n]*|/\*.*?\*/|"[^"\n]*"|\'.\'', re.S),
+        }
+# begin of a named connection, group 1 is the port name ('*' for '.*')
+_D_RE_PORT_CONN = {
+        "sv": re.compile(r'\.(\w+|\*)'),
+        # (the formal can be a slice of the port)
+        "vhdl": re.compile(r'(\w+)(?:\s*\([^()]*\))?\s*=>'),
+        }
+_D_COMMENT = {"sv": "//", "vhdl": "--"}
+_RE_IDENTIFIER = re.compile(r'\w+')
+_RE_INDENT = re.compile(r'[ \t]*')
+
+
+class _PortListItem(object):
+    """one connection in the port list of an instantiation (offsets into the 
+    source text)
+
+    :port: port name, None for a positional connection, '*' for '.*'
+    :start: offset of the first character of the connection
+    :end: offset after its last character (without any separator or comment)
+    :comma: offset of the ',' after it, None if it is the last connection
+    """
+
+    __slots__ = ("port", "start", "end", "comma")
+
+    def __init__(self, port, start, end, comma=None):
+        self.port = port
+        self.start = start
+        self.end = end
+        self.comma = comma
+
+
+def _scan_expression(text, pos, hdl_lang):
+    """scan the expression (e.g. a connection) that begins at pos, up to the 
+    separator or closing bracket that ends it
+
+    :returns: (offset of that ',' or closing bracket, offset after the last 
+    character of the expression that is no whitespace or comment), None if 
+    text ends before
+    """
+    re_skip = _D_RE_SKIP[hdl_lang]
+    depth = 0
+    pos_end = pos
+    while pos < len(text):
+        c = text[pos]
+        if c in "/-\"'":
+            mo = re_skip.match(text, pos)
+            if mo:
+                pos = mo.end()
+                if c in "\"'":
+                    pos_end = pos
+                continue
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            if not depth:
+                return pos, pos_end
+            depth -= 1
+        elif c == "," and not depth:
+            return pos, pos_end
+        pos += 1
+        if not c.isspace():
+            pos_end = pos
+    return None
+
+
+def _parse_port_list(text, pos, hdl_lang):
+    """:pos: offset after the opening bracket of the port list (or port map)
+    :returns: (list of _PortListItem, offset of the closing bracket), None if 
+    the port list can't be parsed
+    """
+    re_space = _D_RE_SPACE[hdl_lang]
+    re_port_conn = _D_RE_PORT_CONN[hdl_lang]
+    l_items = []
+    while True:
+        pos = re_space.match(text, pos).end()
+        if pos >= len(text):
+            return None
+        if text[pos] == ")":
+            return l_items, pos
+        mo = re_port_conn.match(text, pos)
+        if not mo:
+            # positional connection
+            t_expression = _scan_expression(text, pos, hdl_lang)
+            if t_expression is None or t_expression[1] == pos:
+                return None
+            item = _PortListItem(None, pos, t_expression[1])
+        elif hdl_lang == "vhdl":
+            t_expression = _scan_expression(text, mo.end(), hdl_lang)
+            if t_expression is None or t_expression[1] <= mo.end():
+                return None
+            item = _PortListItem(mo.group(1), pos, t_expression[1])
+        else:
+            item = _PortListItem(mo.group(1), pos, mo.end())
+            pos_bracket = re_space.match(text, mo.end()).end()
+            if item.port != "*" and text.startswith("(", pos_bracket):
+                t_expression = _scan_expression(text, pos_bracket + 1, hdl_lang)
+                if t_expression is None or text[t_expression[0]] != ")":
+                    return None
+                item.end = t_expression[0] + 1
+            # (else '.*' or an implicit connection '.<port>')
+        l_items.append(item)
+
+        pos = re_space.match(text, item.end).end()
+        if text.startswith(",", pos):
+            item.comma = pos
+            pos += 1
+        elif not text.startswith(")", pos):
+            return None
+
+
+def _get_indent(text, pos):
+    """:returns: the indentation of the line that pos is in"""
+    return _RE_INDENT.match(text, text.rfind("\n", 0, pos) + 1).group()
+
+
+def _get_port_list_edits(text, pos_open, l_items, pos_close, l_port_names, hdl_lang):
+    """the edits of a port list (see _parse_port_list) that remove the 
+    connections to ports which are not in l_port_names, and add (empty) 
+    connections for those which are not connected yet. Port lists that 
+    already match l_port_names, or have positional connections, are left as 
+    they are. With '.*', no connections are added.
+
+    :pos_open: offset of the opening bracket of the port list
+    :returns: list of (start, end, replacement) edits of text, see _apply_edits
+    """
+    if any(x.port is None for x in l_items):
+        return []
+    if hdl_lang == "vhdl":
+        key = str.lower
+    else:
+        def key(port):
+            return port
+    s_ports = {key(x) for x in l_port_names}
+    s_connected = {key(x.port) for x in l_items}
+    l_remove = [x for x in l_items if x.port != "*" and key(x.port) not in s_ports]
+    l_add = [] if "*" in s_connected else \
+            [x for x in l_port_names if key(x) not in s_connected]
+    if not l_remove and not l_add:
+        return []
+
+    s_comment = _D_COMMENT[hdl_lang]
+    l_edits = []
+    for item in l_remove:
+        pos_end = item.end if item.comma is None else item.comma + 1
+        line_start = text.rfind("\n", 0, item.start) + 1
+        line_end = text.find("\n", pos_end)
+        s_rest = text[pos_end:line_end].strip() if line_end >= 0 else ")"
+        if not text[line_start:item.start].strip() \
+                and (not s_rest or s_rest.startswith(s_comment)):
+            # (the connection has its line(s) to itself: the lines are 
+            # removed, with the comment at the end)
+            l_edits.append((line_start, line_end + 1, ""))
+        elif item.comma is not None:
+            pos_end = _RE_INDENT.match(text, pos_end).end()
+            l_edits.append((item.start, pos_end, ""))
+        else:
+            # (the last connection: with the whitespaces before it)
+            pos_start = item.start
+            while text[pos_start - 1] in " \t":
+                pos_start -= 1
+            l_edits.append((pos_start, item.end, ""))
+
+    # (every connection but the last one needs a separator)
+    l_keep = [x for x in l_items if x not in l_remove]
+    for i, item in enumerate(l_keep):
+        if i < len(l_keep) - 1 or l_add:
+            if item.comma is None:
+                l_edits.append((item.end, item.end, ","))
+        elif item.comma is not None:
+            l_edits.append((item.comma, item.comma + 1, ""))
+
+    if l_add:
+        if hdl_lang == "vhdl":
+            l_new = HdlModuleInterface.instantiate_with_conn_vhdl(
+                    dict.fromkeys(l_add, ""), add_newlines=False)
+        else:
+            l_new = HdlModuleInterface.instantiate_with_conn(
+                    dict.fromkeys(l_add, ""), add_newlines=False)
+        l_new = [x.strip() for x in l_new]
+        if l_items:
+            # (after the last connection, with its indentation)
+            item = l_items[-1]
+            s_indent = _get_indent(text, item.start)
+            line_end = text.find("\n", item.end if item.comma is None else item.comma)
+            if text[text.rfind("\n", 0, item.start) + 1:item.start].strip():
+                # (connections on the line of other code: the new ones too)
+                l_edits.append((pos_close, pos_close, "".join(" " + x for x in l_new)))
+            elif 0 <= line_end < pos_close:
+                l_edits.append((line_end + 1, line_end + 1,
+                                "".join(s_indent + x + "\n" for x in l_new)))
+            else:
+                l_edits.append((pos_close, pos_close,
+                                "".join("\n" + s_indent + x for x in l_new)))
+        else:
+            s_indent = _get_indent(text, pos_open)
+            s_new = "".join("\n" + s_indent + "    " + x for x in l_new)
+            if text[pos_open + 1:pos_close].strip():
+                # (comments)
+                l_edits.append((pos_close, pos_close, s_new + "\n" + s_indent))
+            else:
+                l_edits.append((pos_open + 1, pos_close, s_new + "\n" + s_indent))
+
+    return l_edits
+
+
+def _apply_edits(text, l_edits):
+    """:l_edits: list of (start, end, replacement) tuples: text[start:end] is 
+    replaced by replacement. The ranges must not overlap, insertions (start == 
+    end) at the begin of a range go before its replacement.
+    :returns: the edited text
+    """
+    l_pieces = []
+    pos = 0
+    for start, end, s_new in sorted(l_edits, key=lambda x: x[:2]):
+        l_pieces.append(text[pos:start])
+        l_pieces.append(s_new)
+        pos = end
+    l_pieces.append(text[pos:])
+    return "".join(l_pieces)
+
+
+# the module interfaces of update_all_instantiations, per worker process (set 
+# once by the pool initializer instead of being pickled with every file)
+_d_interfaces_worker = None
+
+
+def _init_update_worker(d_interfaces):
+    global _d_interfaces_worker
+    _d_interfaces_worker = d_interfaces
+
+
+def _update_instantiations_worker(destination):
+    return HdlModuleInterface.update_instantiations(destination, _d_interfaces_worker)
 
 
 class HdlPort(object):
@@ -32,47 +307,43 @@ class HdlPort(object):
     PORT_IN         = "input"
     PORT_OUT        = "output"
     PORT_INOUT      = "inout"
+    PORT_REF        = "ref"
+    # (interface ports don't have a direction, but an interface/modport)
+    PORT_INTERFACE  = "interface"
+
+    # VHDL port mode -> direction
+    D_VHDL_MODES = {
+            "in": PORT_IN,
+            "out": PORT_OUT,
+            "inout": PORT_INOUT,
+            "buffer": PORT_OUT,
+            "linkage": PORT_INOUT,
+            }
+
+    # (slots, because there can be hundreds of thousands of ports when indexing 
+    # a large project)
+    __slots__ = ("name", "width", "direction", "packed", "unpacked", "data_type")
 
     # (doesn't work as a @property, because it's a classmethod. combining both 
     # apparently used to be possible, but is deprecated in python>3.12 or so)
     @classmethod
     def port_directions(cls):
-        return [cls.PORT_IN, cls.PORT_OUT, cls.PORT_INOUT]
-
-    # the re can not detect signal width in certain cases, but it should still 
-    # correctly detect the port name and direction:
-    # - multi-dimensional array
-    # - parameterized (non-digit) width
-    # - unpacked arrays
-    #
-    # setup for detecting multi-dimensional array in the future: the RE matches 
-    # an arbitrary number of width declarations ('[...:...]'), both for packed 
-    # and unpacked. The width per dimension can be retrieved by findall on the 
-    # respective match groups
-
-    # TODO: due to the ()* groups, the re accepts wrong syntax like '[N-1:0' 
-    # - no problem if things are coded correctly, but it would be nice to fix 
-    # that
-
-#     # match [PAR-1:0][3:1]...
-#     __re_sig_multi_dim_sv = r'((\[[\w+\+\-\*\/]+:[\w+\+\-\*\/]+\])\s*)*'
-#     # put it together for full line
-#     __re_port_decl_sv = \
-#         re.compile(r'\s*(input|output|inout)\s+(logic|reg|wire){0,1}\s+'
-#                    + __re_sig_multi_dim_sv + r'(\w+)\s*' + __re_sig_multi_dim_sv
-#                    + r',{0,1}\s*')
-    __re_sig_single_dim_sv = r'\[[\w+\+\-\*\/]+:[\w+\+\-\*\/]+\]'
-    __re_sig_multi_dim_sv = r'((' + __re_sig_single_dim_sv + ')*)'
-    __re_port_decl_sv = \
-            re.compile(r'\s*(input|output|inout)\s+((logic|reg|wire){0,1}\s+)'
-               + __re_sig_multi_dim_sv + r'\s*(\w+)\s*' + __re_sig_multi_dim_sv
-               + r',{0,1}\s*')
-
-    def __init__(self, name, width=1, direction=PORT_OUT, dimensions = None):
+        return [cls.PORT_IN, cls.PORT_OUT, cls.PORT_INOUT, cls.PORT_REF,
+                cls.PORT_INTERFACE]
+
+    def __init__(self, name, width=1, direction=PORT_OUT, dimensions = None,
+                 packed=(), unpacked=(), data_type=""):
         """
+        :width: width of one element (the packed dimensions, times the width 
+        of data_type), -1 if unknown (see hdl_sv_const_eval)
         :direction: one of HdlPort.PORT_* (default: PORT_OUT)
-        :dimensions: dictionary with keys "packed" and "unpacked", both items 
-        lists of plain-text dimension specifiers ("[...:...]")
+        :packed: tuple of plain-text packed dimension specifiers ("[...:...]")
+        :unpacked: same for the unpacked dimensions
+        :dimensions: alternative to packed and unpacked: dictionary with keys 
+        "packed" and "unpacked", both items lists of plain-text dimension 
+        specifiers
+        :data_type: plain-text data type ("logic", "wire signed", ...), "" if 
+        implicit
         """
         # TODO: dimensions might need to be represented in a way that also works 
         # for vhdl, so far it is plain systemverilog syntax. On the other hand, 
@@ -80,50 +351,79 @@ class HdlPort(object):
         self.name = name
         self.width = width
         self.direction = direction
-        if not dimensions:
-            self.dimensions = {
-                    "packed": [],
-                    "unpacked": [],
-                    }
-        else:
+        self.data_type = data_type
+        if dimensions:
             self.dimensions = dimensions
+        else:
+            self.packed = tuple(packed)
+            self.unpacked = tuple(unpacked)
 
-    @classmethod
-    def __from_port_decl_mo(cls, match_obj, lang="sv"):
+    @property
+    def dimensions(self):
+        """dimensions as a dictionary with keys "packed" and "unpacked" (both 
+        items lists, see __init__)
         """
-        :match_obj: match object retrieved by __re_port_decl_*
-        :lang: sv or vhdl
+        return {
+                "packed": list(self.packed),
+                "unpacked": list(self.unpacked),
+                }
+
+    @dimensions.setter
+    def dimensions(self, dimensions):
+        self.packed = tuple(dimensions["packed"])
+        self.unpacked = tuple(dimensions["unpacked"])
+
+    @classmethod
+    def _from_sv_port(cls, port):
+        """:port: port tuple as parsed by hdl_sv_header_parser
         """
-        if lang == "sv":
-            if not match_obj:
-                return None
-            name = match_obj.group(6)
-            direction = match_obj.group(1)
-            dimensions = {
-                    "packed": re.findall(cls.__re_sig_single_dim_sv, match_obj.group(4)),
-                    "unpacked": re.findall(cls.__re_sig_single_dim_sv, match_obj.group(7)),
-                    }
-
-            # TODO: couldn't you do this more elegant, with the port types as 
-            # a dictionary and then access to PORT_* with @property?
-            if not direction in cls.port_directions():
-                raise Exception(f"Invalid signal direction: {direction}")
-
-            # TODO: handle the width, as soon as you have a suitable data 
-            # structure for that
-            return cls(name, width=-1, direction=direction, dimensions=dimensions)
+        name, direction, data_type, packed, unpacked = port
+        # (the width depends on the parameters of the module, see 
+        # hdl_sv_const_eval)
+        return cls(name, width=-1, direction=direction,
+                   packed=packed, unpacked=unpacked, data_type=data_type)
 
-        else:
-            raise Exception(f"Support for {lang} port declaration match objects "
-                            "not implemented")
+    @classmethod
+    def _from_vhdl_port(cls, port, fun_lookup):
+        """:port: port tuple as parsed by hdl_vhdl_entity_parser
+        :fun_lookup: lookup of the generic values, see get_vhdl_width
+        """
+        name, mode, subtype, _ = port
+        s_range = get_vhdl_range_sv(subtype)
+        return cls(name, width=get_vhdl_width(subtype, fun_lookup),
+                   direction=cls.D_VHDL_MODES[mode],
+                   packed=(s_range,) if s_range else (), data_type=subtype)
 
     @classmethod
     def from_sv(cls, line):
         """
-        :line: line of code (within a module declaration)
+        :line: port declaration, e.g. a line of code within a module 
+        declaration. If it declares several ports, the first one is returned.
+        :returns: None if line is no port declaration
         """
-        match_obj = cls.__re_port_decl_sv.match(line)
-        return cls.__from_port_decl_mo(match_obj, "sv")
+        l_ports = parse_sv_port_declaration(line)
+        if not l_ports:
+            return None
+        return cls._from_sv_port(l_ports[0])
+
+    def to_dict(self):
+        """serializable (json) representation, see from_dict
+        """
+        return {
+                "name": self.name,
+                "width": self.width,
+                "direction": self.direction,
+                "dimensions": self.dimensions,
+                "data_type": self.data_type,
+                }
+
+    @classmethod
+    def from_dict(cls, d_port):
+        """:d_port: dict as returned by to_dict
+        """
+        return cls(d_port["name"], width=d_port["width"],
+                   direction=d_port["direction"], dimensions=d_port["dimensions"],
+                   data_type=d_port.get("data_type", ""))
 
     def to_member_signal_sv(self):
         """
@@ -137,41 +437,61 @@ class HdlPort(object):
         
         s_out = ""
         s_out = s_out + f"logic"
-        if self.dimensions["packed"]:
-            s_out = s_out + " "
-            for s_dim in self.dimensions["packed"]:
-                s_out = s_out + s_dim
+        if self.packed:
+            s_out = s_out + " " + "".join(self.packed)
         s_out = s_out + f" {self.name}"
-        if self.dimensions["unpacked"]:
-            s_out = s_out + " "
-            for s_dim in self.dimensions["unpacked"]:
-                s_out = s_out + s_dim
+        if self.unpacked:
+            s_out = s_out + " " + "".join(self.unpacked)
         s_out = s_out + ";"
         return s_out
 
 
+class HdlParameter(object):
+
+    PARAM = "parameter"
+    LOCALPARAM = "localparam"
+
+    __slots__ = ("name", "default", "kind", "data_type", "packed")
+
+    def __init__(self, name, default="", kind=PARAM, data_type="", packed=()):
+        """
+        :default: default value, as plain-text expression ("" if there is none)
+        :kind: HdlParameter.PARAM or HdlParameter.LOCALPARAM
+        :data_type: plain-text data type ("int", "type", ...), "" if implicit
+        :packed: tuple of plain-text packed dimension specifiers
+        """
+        self.name = name
+        self.default = default
+        self.kind = kind
+        self.data_type = data_type
+        self.packed = tuple(packed)
+
+    def to_dict(self):
+        """serializable (json) representation, see from_dict
+        """
+        return {
+                "name": self.name,
+                "default": self.default,
+                "kind": self.kind,
+                "data_type": self.data_type,
+                "packed": list(self.packed),
+                }
+
+    @classmethod
+    def from_dict(cls, d_param):
+        """:d_param: dict as returned by to_dict
+        """
+        return cls(d_param["name"], d_param["default"], d_param["kind"],
+                   d_param["data_type"], d_param["packed"])
+
+
 class HdlModuleInterface(object):
 
     ##############################
     # REGEX
     ##############################
 
-    # MODULE DECLARATION
-    
-    # distinct between parameterized and parameter-free declaration via the 
-    # regex
-    # match "module <name> ("
-    __re_begin_module_decl_sv_param = \
-        re.compile(r'\s*module\s+(\w+)\s*#\(\s*')
-    # match "module <name> #("
-    __re_begin_module_decl_sv_no_param = \
-        re.compile(r'\s*module\s+(\w+)\s*\(\s*')
-    # match "    ) ("
-    __re_module_decl_sv_param_end = \
-        re.compile(r'\s*\)\s*\(\s*')
-    # match ");"
-    __re_module_decl_sv_end = \
-        re.compile(r'\s*\)\s*;\s*')
+    # (module declarations are not parsed by regex, see hdl_sv_header_parser)
 
     # MODULE INSTANTIATION
     __re_begin_module_inst_sv_param = \
@@ -189,77 +509,187 @@ class HdlModuleInterface(object):
                        + __s_module_inst_sv_connected_signal + r')*\s*\),{0,1}\s*')
     __re_module_inst_sv_end_module = \
             re.compile(r'\s*endmodule\s*(//.*)*')
+    # (unlike __re_begin_module_inst_sv_no_param, these require a whitespace 
+    # between module and instance name, otherwise 'foo (' would match as 
+    # module 'fo', instance 'o')
+    __re_begin_any_module_inst_sv_no_param = \
+            re.compile(r'\s*(\w+)\s+(\w+)\s*\(\s*')
+    __re_begin_any_module_inst_sv_param = \
+            re.compile(r'\s*(\w+)\s*#\(\s*')
+    # VHDL (keywords in any case): "<label> : [entity <lib>.|component ]<name>", 
+    # optionally followed by the generic/port map on the same line
+    __re_begin_any_module_inst_vhdl = \
+            re.compile(r'\s*\w+\s*:\s*(?:entity\s+(?:\w+\.)?|component\s+)?(\w+)\b', re.I)
+    __re_module_inst_vhdl_generic_map = \
+            re.compile(r'generic\s+map\s*\(', re.I)
+    __re_module_inst_vhdl_port_map = \
+            re.compile(r'port\s+map\s*\(', re.I)
 
     INST_PREFIX = "inst_"
 
-    def __init__(self, name, ports=[]):
+    def __init__(self, name, ports=[], parameters=None):
         """
         :ports: list of HdlPort objects
+        :parameters: list of HdlParameter objects
         """
         self.name = name
         self.ports = ports
+        if parameters is None:
+            self.parameters = []
+        else:
+            self.parameters = parameters
 
     @property
     def port_connections(self):
         return dict.fromkeys([x.name for x in self.ports], "")
 
+    def to_dict(self):
+        """serializable (json) representation, see from_dict
+        """
+        return {
+                "name": self.name,
+                "parameters": [x.to_dict() for x in self.parameters],
+                "ports": [x.to_dict() for x in self.ports],
+                }
+
     @classmethod
-    def from_sv(cls, declaration):
+    def from_dict(cls, d_interface):
+        """:d_interface: dict as returned by to_dict
+        """
+        return cls(d_interface["name"],
+                   [HdlPort.from_dict(x) for x in d_interface["ports"]],
+                   [HdlParameter.from_dict(x)
+                    for x in d_interface.get("parameters", [])])
+
+    @classmethod
+    def from_sv(cls, declaration, preprocessor_context=None):
         """assumes that only one module is declared in declaration. (If there 
-        are multiple, the first one is detected)
+        are multiple, the first one is detected, see all_from_sv for all of 
+        them)
+
+        The source is read chunk by chunk, and only until the end of the 
+        (first) module declaration (for ANSI style port lists; non-ANSI ones 
+        are read until endmodule). Thus a file is only read up to there, no 
+        matter how large it is.
 
-        :declaration: can be one of 2 options:
+        :declaration: can be one of 3 options:
             1. str - file name to SystemVerilog module file
-            2. list of str - lines of code that contains a SystemVerilog module 
-            declaration
+            2. file object
+            3. iterable of str (list, ...) - lines of code that contain 
+            a SystemVerilog module declaration
+        :preprocessor_context: SvPreprocessorContext (defines and include 
+        directories), default: no defines
+        :returns: None if there is no module declaration
+        """
+
+        for module_interface in cls.all_from_sv(declaration, preprocessor_context):
+            return module_interface
+        return None
+
+    @classmethod
+    def all_from_sv(cls, declaration, preprocessor_context=None,
+                    preprocessor=None):
+        """generator over the interfaces of all modules that are declared in 
+        declaration, in the order of declaration. The source is read in one 
+        pass (chunk by chunk, as far as the iteration goes), the module bodies 
+        are skipped.
+
+        :declaration: see from_sv
+        :preprocessor_context: see from_sv
+        :preprocessor: SvPreprocessor to use (instead of a new one from 
+        preprocessor_context), e.g. to find out which files it included
         """
 
         if isinstance(declaration, str):
             with open(declaration, 'r') as f_in:
-                l_lines = f_in.readlines()
-        else:
-            l_lines = declaration
+                yield from cls.all_from_sv(f_in, preprocessor_context, preprocessor)
+            return
 
-        in_ports_decl = False
-        in_param_decl = False
+        if preprocessor is None:
+            if preprocessor_context is None:
+                preprocessor_context = SvPreprocessorContext.get_default()
+            preprocessor = preprocessor_context.preprocessor(
+                    getattr(declaration, "name", None))
+        for header in iter_sv_module_headers(preprocessor.process(declaration)):
+            yield cls._from_sv_header(header)
 
-        for line in l_lines:
-            if not in_ports_decl and not in_param_decl:
-                # check for module declaration begin (first non-parameterized 
-                # module, then parameterized module)
-                mo = cls.__re_begin_module_decl_sv_no_param.match(line)
-                if mo:
-                    in_ports_decl = True
-                    module_name = mo.group(1)
-                    l_module_ports = []
+    @classmethod
+    def from_vhdl(cls, declaration):
+        """the interface of the first entity that is declared in declaration, 
+        see all_from_vhdl
 
-                mo = cls.__re_begin_module_decl_sv_param.match(line)
-                if mo:
-                    in_param_decl = True
-                    module_name = mo.group(1)
-                    l_module_ports = []
+        :declaration: file name, file object or iterable of lines (see 
+        from_sv), of VHDL code
+        :returns: None if there is no entity declaration
+        """
+        for module_interface in cls.all_from_vhdl(declaration):
+            return module_interface
+        return None
 
-            elif in_param_decl:
-                mo = cls.__re_module_decl_sv_param_end.match(line)
-                if mo:
-                    in_param_decl = False
-                    in_ports_decl = True
+    @classmethod
+    def all_from_vhdl(cls, declaration):
+        """generator over the interfaces of all entities that are declared in 
+        declaration, in the order of declaration, read in one pass like 
+        all_from_sv (architectures, packages, ... are skipped)
 
-            else:
-                mo = cls.__re_module_decl_sv_end.match(line)
-                if mo:
-                    # if module declaration end detected, finish reading and 
-                    # return
-                    in_ports_decl = False
-                    return cls(module_name, l_module_ports)
-                else:
-                    # if no module declaration detected, detect ports in line
-                    port = HdlPort.from_sv(line)
-                    if port:
-                        l_module_ports.append(port)
-
-        # return None if no module declaration was detected
-        return None
+        :declaration: see from_vhdl
+        """
+        if isinstance(declaration, str):
+            with open(declaration, 'r') as f_in:
+                yield from cls.all_from_vhdl(f_in)
+            return
+
+        for entity in iter_vhdl_entities(declaration):
+            yield cls._from_vhdl_entity(entity)
+
+    @classmethod
+    def all_from_file(cls, file, preprocessor_context=None, preprocessor=None):
+        """all_from_vhdl for VHDL files (by the file extension, see 
+        hdl_file_discovery), all_from_sv for everything else
+
+        :file: file name
+        :preprocessor_context: see all_from_sv (not used for VHDL)
+        :preprocessor: see all_from_sv (not used for VHDL)
+        """
+        if file.lower().endswith(HDL_EXTENSIONS_VHDL):
+            return cls.all_from_vhdl(file)
+        return cls.all_from_sv(file, preprocessor_context, preprocessor)
+
+    @classmethod
+    def _from_vhdl_entity(cls, entity):
+        """:entity: VhdlEntity
+        """
+        l_parameters = [HdlParameter(name, default, HdlParameter.PARAM, data_type)
+                        for name, data_type, default in entity.generics]
+        # (widths for the default values of the generics)
+        d_generics = eval_vhdl_generics(entity.generics)
+
+        def fun_lookup(name):
+            value = d_generics.get(name)
+            if value is None:
+                raise SvConstEvalError(f"Unknown identifier: {name}")
+            return value
+
+        l_ports = [HdlPort._from_vhdl_port(x, fun_lookup) for x in entity.ports]
+        return cls(entity.name, l_ports, l_parameters)
+
+    @classmethod
+    def _from_sv_header(cls, header):
+        """:header: SvModuleHeader
+        """
+        l_ports = [HdlPort._from_sv_port(x) for x in header.ports]
+        l_parameters = [HdlParameter(name, default, kind, data_type, packed)
+                        for name, kind, data_type, packed, default
+                        in header.parameters]
+        # port widths for the default parameter values (without packages, see 
+        # SvWidthResolver for those, and for other parameter values)
+        d_parameters = eval_sv_parameters(
+                [(name, kind, data_type, default)
+                 for name, kind, data_type, _, default in header.parameters])
+        d_widths = get_sv_port_widths(l_ports, d_parameters)
+        for port in l_ports:
+            port.width = d_widths[port.name]
+        return cls(header.name, l_ports, l_parameters)
 
     def __detect_module_inst_begin(self, line):
         """
@@ -271,21 +701,14 @@ class HdlModuleInterface(object):
         was detected, thus "no_param" always indicates the start of the port 
         list
         """
-        re_begin_module_inst_sv_param = \
-                re.compile(r'\s*' + self.name + r'\s*#\(\s*')
-        re_begin_module_inst_sv_no_param = \
-            re.compile(r'\s*' + self.name + r'\s*'
-                    + self.INST_PREFIX + self.name + r'\s*\(\s*')
-        re_module_inst_sv_param_end = \
-                re.compile(r'\s*\)\s*'+self.INST_PREFIX+self.name+r'\s*\(\s*')
-
-        if re_begin_module_inst_sv_param.match(line):
+        mo = _get_re_module_inst_begin_sv(self.name, self.INST_PREFIX).match(line)
+        if not mo:
+            return None
+        if mo.lastgroup == "param":
             return "param"
-        if re_begin_module_inst_sv_no_param.match(line):
-            return "no_param"
-        if re_module_inst_sv_param_end.match(line):
-            return "no_param"
-        return None
+        # begin of a non-parameterized instantiation, or end of the 
+        # parameterization
+        return "no_param"
 
 
     def update_instantiation(self, destination, overwrite=True, no_create=False):
@@ -322,9 +745,8 @@ class HdlModuleInterface(object):
 
         # TODO: implement overwrite option
 
-        # TODO: add sort of a "reverse" option: for a given file, update all the 
-        # module instantiations in that file. Because then you can just do that 
-        # to your entire codebase (ok, maybe that's useless)
+        # (for updating all module instantiations in a file, or in an entire 
+        # codebase, see update_instantiations/update_all_instantiations)
 
         with open(destination, 'r') as f_in:
             l_lines = f_in.readlines()
@@ -357,9 +779,10 @@ class HdlModuleInterface(object):
                 l_lines_out.append(line)
             elif not (in_port_list or in_param_list):
                 l_lines_out.append(line)
-                if self.__detect_module_inst_begin(line) == "no_param":
+                inst_begin = self.__detect_module_inst_begin(line)
+                if inst_begin == "no_param":
                     in_port_list = True
-                elif self.__detect_module_inst_begin(line) == "param":
+                elif inst_begin == "param":
                     in_param_list = True
             elif in_param_list:
                 l_lines_out.append(line)
@@ -394,8 +817,205 @@ class HdlModuleInterface(object):
                     except KeyError:
                         pass
 
-        with open(destination, 'w') as f_out:
-            f_out.writelines(l_lines_out)
+        write_lines_if_changed(destination, l_lines_out)
+
+    @classmethod
+    def build_index(cls, l_declarations, preprocessor_context=None):
+        """parse the module interfaces from a set of module files
+
+        :l_declarations: list of file names (SystemVerilog and VHDL, see 
+        all_from_file)
+        :preprocessor_context: see from_sv (shared by all files)
+        :returns: dict with module names as keys and HdlModuleInterface objects 
+        as values, for all modules (and entities) that are declared in the 
+        files
+        """
+        d_interfaces = {}
+        for declaration in l_declarations:
+            for module_interface in cls.all_from_file(declaration, preprocessor_context):
+                d_interfaces[module_interface.name] = module_interface
+        return d_interfaces
+
+    @classmethod
+    def update_instantiations(cls, destination, d_interfaces):
+        """the "reverse" of update_instantiation: update every instantiation of 
+        any module from d_interfaces in destination, with one read and (at 
+        most) one write of destination. In contrast to update_instantiation, 
+        instance names are arbitrary, and no instantiations are created. An 
+        instantiation is detected by the line it begins with, the rest is free 
+        form:
+
+        <module> #(...) <inst_name> (...);
+
+        <module> <inst_name> (...);
+
+        Connections to ports that a module does not have (anymore) are 
+        removed from the instantiation, ports that are not connected yet get 
+        an empty connection (none with '.*'). The connections themselves, 
+        comments and formatting are left as they are, and instantiations whose 
+        ports already match (or which connect by position) are not touched at 
+        all.
+
+        VHDL files (by the file extension) are updated in VHDL syntax, see 
+        _update_instantiations_vhdl.
+
+        :destination: file path of the file to update
+        :d_interfaces: dict module name -> HdlModuleInterface (see build_index)
+        :returns: True if destination was changed
+        """
+
+        if destination.lower().endswith(HDL_EXTENSIONS_VHDL):
+            return cls._update_instantiations_vhdl(destination, d_interfaces)
+
+        with open(destination, 'r') as f_in:
+            text = f_in.read()
+
+        l_edits = []
+        # offset of the current line, and the end of the last instantiation 
+        # (what is before is not searched again)
+        pos_line = 0
+        pos_done = 0
+        for line in text.splitlines(True):
+            pos = pos_line
+            pos_line += len(line)
+            # (cheap check before any regex: the begin of an instantiation 
+            # always has an opening bracket)
+            if pos < pos_done or "(" not in line:
+                continue
+            mo = cls.__re_begin_any_module_inst_sv_param.match(line)
+            b_param = bool(mo)
+            if not mo:
+                mo = cls.__re_begin_any_module_inst_sv_no_param.match(line)
+            if not mo or mo.group(1) not in d_interfaces:
+                continue
+
+            pos_open = cls.__find_port_list_sv(text, pos + mo.end(1), b_param)
+            if pos_open is None:
+                continue
+            t_port_list = _parse_port_list(text, pos_open + 1, "sv")
+            if t_port_list is None:
+                continue
+            l_items, pos_done = t_port_list
+            l_edits.extend(_get_port_list_edits(
+                    text, pos_open, l_items, pos_done,
+                    [x.name for x in d_interfaces[mo.group(1)].ports], "sv"))
+
+        if not l_edits:
+            return False
+        return write_lines_if_changed(destination, [_apply_edits(text, l_edits)])
+
+    @staticmethod
+    def __find_port_list_sv(text, pos, b_param):
+        """:pos: offset after the module name of an instantiation
+        :b_param: True for a parameterized instantiation
+        :returns: offset of the opening bracket of the port list, None if 
+        there is no instantiation at pos
+        """
+        re_space = _D_RE_SPACE["sv"]
+        pos = re_space.match(text, pos).end()
+        if b_param:
+            # (the parameter list, from the bracket after '#')
+            pos = re_space.match(text, pos + 1).end()
+            t_expression = _scan_expression(text, pos + 1, "sv")
+            if t_expression is None or text[t_expression[0]] != ")":
+                return None
+            pos = re_space.match(text, t_expression[0] + 1).end()
+        mo = _RE_IDENTIFIER.match(text, pos)
+        if not mo:
+            return None
+        pos = re_space.match(text, mo.end()).end()
+        # (instance arrays)
+        while text.startswith("[", pos):
+            t_expression = _scan_expression(text, pos + 1, "sv")
+            if t_expression is None or text[t_expression[0]] != "]":
+                return None
+            pos = re_space.match(text, t_expression[0] + 1).end()
+        return pos if text.startswith("(", pos) else None
+
+    @classmethod
+    def _update_instantiations_vhdl(cls, destination, d_interfaces):
+        """update_instantiations for a VHDL file: entity and component 
+        instantiations of any module from d_interfaces (names in any case), 
+        detected by the line they begin with:
+
+        <label> : [entity work.|component ]<name> [generic map (...)] port map (...);
+
+        The port map is updated as in update_instantiations (with 'open' for 
+        new ports), the generic map is left as it is.
+        """
+
+        with open(destination, 'r') as f_in:
+            text = f_in.read()
+
+        d_interfaces_lower = {x.lower(): y for x, y in d_interfaces.items()}
+        l_edits = []
+        # (see update_instantiations)
+        pos_line = 0
+        pos_done = 0
+        for line in text.splitlines(True):
+            pos = pos_line
+            pos_line += len(line)
+            if pos < pos_done or ":" not in line:
+                continue
+            mo = cls.__re_begin_any_module_inst_vhdl.match(line)
+            if not mo or mo.group(1).lower() not in d_interfaces_lower:
+                continue
+
+            pos_open = cls.__find_port_map_vhdl(text, pos + mo.end())
+            if pos_open is None:
+                continue
+            t_port_list = _parse_port_list(text, pos_open + 1, "vhdl")
+            if t_port_list is None:
+                continue
+            l_items, pos_done = t_port_list
+            l_edits.extend(_get_port_list_edits(
+                    text, pos_open, l_items, pos_done,
+                    [x.name for x in d_interfaces_lower[mo.group(1).lower()].ports],
+                    "vhdl"))
+
+        if not l_edits:
+            return False
+        return write_lines_if_changed(destination, [_apply_edits(text, l_edits)])
+
+    @classmethod
+    def __find_port_map_vhdl(cls, text, pos):
+        """:pos: offset after the entity/component name of an instantiation
+        :returns: offset of the opening bracket of the port map, None if there 
+        is none
+        """
+        re_space = _D_RE_SPACE["vhdl"]
+        pos = re_space.match(text, pos).end()
+        mo = cls.__re_module_inst_vhdl_generic_map.match(text, pos)
+        if mo:
+            t_expression = _scan_expression(text, mo.end(), "vhdl")
+            if t_expression is None or text[t_expression[0]] != ")":
+                return None
+            pos = re_space.match(text, t_expression[0] + 1).end()
+        mo = cls.__re_module_inst_vhdl_port_map.match(text, pos)
+        return mo.end() - 1 if mo else None
+
+    @classmethod
+    def update_all_instantiations(cls, l_destinations, d_interfaces, max_workers=None):
+        """update_instantiations for a set of files, processed in parallel in 
+        a process pool
+
+        :l_destinations: list of file paths
+        :d_interfaces: see update_instantiations
+        :max_workers: number of worker processes (default: cpu count)
+        :returns: list of the files that were changed
+        """
+        if len(l_destinations) > 1:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers, initializer=_init_update_worker,
+                    initargs=(d_interfaces,)) as executor:
+                chunksize = max(1, len(l_destinations) // (4*(max_workers or os.cpu_count() or 1)))
+                l_changed = list(executor.map(
+                        _update_instantiations_worker, l_destinations,
+                        chunksize=chunksize))
+        else:
+            l_changed = [cls.update_instantiations(x, d_interfaces) for x in l_destinations]
+
+        return [x for x, changed in zip(l_destinations, l_changed) if changed]
 
     def generate_interface_class_sv(self, include_rst=False, clk_to_ports=True,
                                     file_out=None):
@@ -475,17 +1095,33 @@ class HdlModuleInterface(object):
         s_endline = '\n' if add_newlines else ''
         l_lines_out = []
         for port, conn in d_port_connections.items():
-            l_lines_out.append(f"    .{port} ({conn})," + s_endline)
+            l_lines_out.append(f"    .{port} ({conn}),")
             # TODO: ensure proper bracket alignment
             # TODO: preserve leading whitespaces (e.g. higher 
             # indentation in generate blocks)
-        # remove ',' from last port-connection
-        s_last_line = l_lines_out.pop()
-        l_lines_out.append(s_last_line.replace(',',''))
+        # remove the ',' after the last port-connection (only that one, the 
+        # connection itself might contain commas)
+        if l_lines_out:
+            l_lines_out[-1] = l_lines_out[-1][:-1]
 
-        return l_lines_out
+        return [x + s_endline for x in l_lines_out]
 
+    @staticmethod
+    def instantiate_with_conn_vhdl(d_port_connections, add_newlines=True):
+        """instantiate_with_conn in VHDL syntax: the associations of a port 
+        map, unconnected ports are left open
 
-        
+        :d_port_connections: see instantiate_with_conn
+        :add_newlines: see instantiate_with_conn
+        :returns: list of strings
+        """
 
+        s_endline = '\n' if add_newlines else ''
+        l_lines_out = []
+        for port, conn in d_port_connections.items():
+            l_lines_out.append(f"    {port} => {conn or 'open'},")
+        # remove the ',' after the last association (see instantiate_with_conn)
+        if l_lines_out:
+            l_lines_out[-1] = l_lines_out[-1][:-1]
 
+        return [x + s_endline for x in l_lines_out]
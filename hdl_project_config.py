@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+# the project config file (project_config.json) of an HDL project
+#
+# One ProjectConfig object is shared by everything in a command that reads or
+# writes the project config. It reads the file lazily on first access, and
+# reads it again only if the file has changed on disk since (judged by path,
+# mtime and size, the path because commands may chdir into a project).
+# Writing is a no-op if the contents are the same as on disk.
+
+import os
+import copy
+import json
+from collections.abc import MutableMapping
+
+from .hdl_file_util import write_lines_if_changed
+
+
+class ProjectConfig(MutableMapping):
+
+    def __init__(self, file):
+        """
+        :file: path of the project config json file, relative paths are
+        relative to the current working directory at the time of the access
+        """
+        self.file = file
+        # contents as they are being edited
+        self._d_config = {}
+        # contents as they are on disk, None if the file doesn't exist
+        self._d_config_file = None
+        # (absolute path, mtime, size) of the file at the time it was read,
+        # None if it hasn't been read yet
+        self._stat_key = None
+
+    def _get_stat_key(self):
+        path = os.path.abspath(self.file)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return (path, None, None)
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self):
+        """(re-)read the file, if it hasn't been read yet or has changed on disk
+        since. Changes that haven't been written are discarded in that case.
+        """
+        stat_key = self._get_stat_key()
+        if stat_key == self._stat_key:
+            return
+        if stat_key[1] is None:
+            self._d_config_file = None
+        else:
+            with open(stat_key[0], 'r') as f_in:
+                self._d_config_file = json.load(f_in)
+        self._d_config = copy.deepcopy(self._d_config_file or {})
+        self._stat_key = stat_key
+
+    def _get_config(self):
+        if self._stat_key is None:
+            self.refresh()
+        return self._d_config
+
+    @property
+    def exists(self):
+        self._get_config()
+        return self._d_config_file is not None
+
+    def replace(self, d_config):
+        """replace the entire contents (without writing them yet)"""
+        self._get_config()
+        self._d_config = copy.deepcopy(d_config)
+
+    def write(self):
+        """write the contents to the file, unless they are the same as on disk
+
+        :returns: True if the file was written
+        """
+        d_config = self._get_config()
+        if self._d_config_file is not None and d_config == self._d_config_file:
+            return False
+        # (the format is the same as it has always been, json.dump with
+        # indent=4, such that the file doesn't change just by switching
+        # versions)
+        write_lines_if_changed(os.path.abspath(self.file), [json.dumps(d_config, indent=4)])
+        self._d_config_file = copy.deepcopy(d_config)
+        self._stat_key = self._get_stat_key()
+        return True
+
+    def __getitem__(self, key):
+        return self._get_config()[key]
+
+    def __setitem__(self, key, value):
+        self._get_config()[key] = value
+
+    def __delitem__(self, key):
+        del self._get_config()[key]
+
+    def __iter__(self):
+        return iter(self._get_config())
+
+    def __len__(self):
+        return len(self._get_config())
@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+
+# constant expressions of (System)Verilog: values of parameters, and from
+# them the widths of ports
+#
+# Port dimensions are kept as source text ("[DATA_W-1:0]"), which is all it
+# takes to write declarations and instantiations. Sizing anything by a port
+# (debug cores, generated interfaces) takes the actual width though. The
+# parameters of a module (with their defaults, or with the values of an
+# instantiation) make up a symbol table, plus the parameters and localparams
+# of packages, and the dimensions are evaluated with it.
+#
+# SvWidthResolver memoizes the results per module and set of parameter
+# overrides: in a hierarchy, most modules are instantiated with the same few
+# parameter sets, and each set only has to be evaluated once.
+#
+# Expressions are evaluated by a Pratt parser (operator precedence parsing)
+# over the tokens of hdl_sv_header_parser. Values are python ints, without
+# width or signedness (which doesn't make a difference for the usual
+# dimension arithmetic).
+
+import operator
+import functools
+
+from .hdl_sv_header_parser import tokenize_sv, iter_sv_packages
+from .hdl_sv_preprocessor import SvPreprocessorContext
+
+
+class SvConstEvalError(Exception):
+    pass
+
+
+# width of the built-in types without packed dimensions (the ones that are
+# not in here and not in TYPES_1_BIT can not be resolved, e.g. user-defined
+# types and interfaces)
+D_TYPE_WIDTHS = {
+        "byte": 8,
+        "shortint": 16,
+        "int": 32,
+        "integer": 32,
+        "longint": 64,
+        "time": 64,
+        }
+# (type modifiers are in here as well, they don't change the width)
+TYPES_1_BIT = frozenset((
+        "logic", "reg", "bit", "wire", "tri", "tri0", "tri1", "triand",
+        "trior", "trireg", "wand", "wor", "uwire", "supply0", "supply1", "var",
+        "signed", "unsigned",
+        ))
+
+
+def _div(a, b):
+    # (truncates towards zero, not towards -inf like //)
+    if b == 0:
+        raise SvConstEvalError("Division by zero")
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+
+def _mod(a, b):
+    # (the result has the sign of a)
+    if b == 0:
+        raise SvConstEvalError("Division by zero")
+    r = abs(a) % abs(b)
+    return r if a >= 0 else -r
+
+
+def _pow(a, b):
+    if b < 0:
+        raise SvConstEvalError("Negative exponent")
+    return a ** b
+
+
+def _shift_left(a, b):
+    if b < 0:
+        raise SvConstEvalError("Negative shift")
+    return a << b
+
+
+def _shift_right(a, b):
+    if b < 0:
+        raise SvConstEvalError("Negative shift")
+    return a >> b
+
+
+# binary operator -> (binding power, function). All of them are left
+# associative except for **. (?: is handled separately, below all of them)
+_D_BINARY_OPS = {
+        "**": (13, _pow),
+        "*": (12, operator.mul),
+        "/": (12, _div),
+        "%": (12, _mod),
+        "+": (11, operator.add),
+        "-": (11, operator.sub),
+        "<<": (10, _shift_left),
+        ">>": (10, _shift_right),
+        "<<<": (10, _shift_left),
+        ">>>": (10, _shift_right),
+        "<": (9, lambda a, b: int(a < b)),
+        "<=": (9, lambda a, b: int(a <= b)),
+        ">": (9, lambda a, b: int(a > b)),
+        ">=": (9, lambda a, b: int(a >= b)),
+        "==": (8, lambda a, b: int(a == b)),
+        "!=": (8, lambda a, b: int(a != b)),
+        "===": (8, lambda a, b: int(a == b)),
+        "!==": (8, lambda a, b: int(a != b)),
+        "&": (7, operator.and_),
+        "^": (6, operator.xor),
+        "~^": (6, lambda a, b: ~(a ^ b)),
+        "^~": (6, lambda a, b: ~(a ^ b)),
+        "|": (5, operator.or_),
+        "&&": (4, lambda a, b: int(bool(a) and bool(b))),
+        "||": (3, lambda a, b: int(bool(a) or bool(b))),
+        }
+_BP_TERNARY = 2
+_BP_UNARY = 14
+_D_UNARY_OPS = {
+        "+": operator.pos,
+        "-": operator.neg,
+        "!": lambda a: int(not a),
+        "~": operator.invert,
+        }
+# system functions -> function of the (one) argument
+_D_SYSTEM_FUNCTIONS = {
+        "$clog2": lambda a: (a - 1).bit_length() if a > 0 else 0,
+        "$signed": lambda a: a,
+        "$unsigned": lambda a: a,
+        }
+_D_BASES = {"b": 2, "o": 8, "d": 10, "h": 16}
+
+
+def _parse_number(text):
+    """:text: number token (decimal or based, e.g. "8'hff")"""
+    text = "".join(text.split()).replace("_", "")
+    try:
+        if "'" not in text:
+            return int(text)
+        s_size, s_value = text.split("'", 1)
+        s_value = s_value.lstrip("sS")
+        value = int(s_value[1:], _D_BASES[s_value[0].lower()])
+    except (ValueError, KeyError, IndexError):
+        # (reals, x/z digits, ...)
+        raise SvConstEvalError(f"Unsupported number: {text}")
+    if s_size:
+        value &= (1 << int(s_size)) - 1
+    return value
+
+
+class _SvConstExprParser(object):
+    """evaluates the expression(s) in a list of tokens"""
+
+    def __init__(self, l_tokens, fun_lookup):
+        """
+        :fun_lookup: function name -> value, for the identifiers in the
+        expression (with the package for scoped ones: "pkg::name"). Raises
+        SvConstEvalError for unknown ones.
+        """
+        self.l_tokens = l_tokens
+        self.pos = 0
+        self.fun_lookup = fun_lookup
+        # >0 while evaluating the branch of ?: that is not taken (anything
+        # goes in there, e.g. a division by zero)
+        self.skip = 0
+
+    def peek(self):
+        if self.pos < len(self.l_tokens):
+            return self.l_tokens[self.pos]
+        return None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise SvConstEvalError("Unexpected end of expression")
+        self.pos += 1
+        return token
+
+    def expect(self, text):
+        token = self.take()
+        if token != text:
+            raise SvConstEvalError(f"Expected '{text}' instead of '{token}'")
+
+    def _apply(self, fun, *args):
+        if self.skip:
+            return 0
+        return fun(*args)
+
+    def _parse_operand(self):
+        token = self.take()
+        if token == "(":
+            value = self.parse()
+            self.expect(")")
+            return value
+        if token in _D_UNARY_OPS:
+            return self._apply(_D_UNARY_OPS[token], self.parse(_BP_UNARY))
+        if token[0].isdigit() or token[0] == "'":
+            return _parse_number(token)
+        if token in _D_SYSTEM_FUNCTIONS:
+            self.expect("(")
+            value = self.parse()
+            self.expect(")")
+            return self._apply(_D_SYSTEM_FUNCTIONS[token], value)
+        if token[0].isalpha() or token[0] == "_":
+            name = token
+            if self.peek() == "::":
+                self.take()
+                name = f"{name}::{self.take()}"
+            if self.peek() == "(":
+                raise SvConstEvalError(f"Unsupported function call: {name}")
+            if self.skip:
+                return 0
+            return self.fun_lookup(name)
+        raise SvConstEvalError(f"Unsupported token: {token}")
+
+    def parse(self, bp_min=0):
+        """:returns: value of the expression from the current token on, up to
+        the first operator that binds less than bp_min"""
+        value = self._parse_operand()
+        while True:
+            op = self.peek()
+            if op == "?" and _BP_TERNARY > bp_min:
+                self.take()
+                self.skip += not value
+                value_true = self.parse()
+                self.skip -= not value
+                self.expect(":")
+                self.skip += bool(value)
+                # (right associative)
+                value_false = self.parse(_BP_TERNARY - 1)
+                self.skip -= bool(value)
+                value = value_true if value else value_false
+            elif op in _D_BINARY_OPS and _D_BINARY_OPS[op][0] > bp_min:
+                bp, fun = _D_BINARY_OPS[op]
+                self.take()
+                # (** is right associative, the rest left associative)
+                value_right = self.parse(bp - 1 if op == "**" else bp)
+                value = self._apply(fun, value, value_right)
+            else:
+                return value
+
+    def parse_all(self):
+        value = self.parse()
+        if self.peek() is not None:
+            raise SvConstEvalError(f"Unexpected token: {self.peek()}")
+        return value
+
+
+@functools.lru_cache(maxsize=4096)
+def _tokenize(s_expr):
+    """tokenize_sv, cached: the same few dimensions and parameter values
+    ("[W-1:0]", "8", ...) come up in file after file
+    """
+    return tuple(tokenize_sv(s_expr))
+
+
+def _lookup_nothing(name):
+    raise SvConstEvalError(f"Unknown identifier: {name}")
+
+
+def eval_sv_const_expr(s_expr, fun_lookup=_lookup_nothing):
+    """:returns: value of the constant expression s_expr (int)
+    :fun_lookup: see _SvConstExprParser (default: no identifiers at all)
+    :raises: SvConstEvalError if s_expr can't be evaluated
+    """
+    if s_expr.isdigit():
+        return int(s_expr)
+    return _SvConstExprParser(_tokenize(s_expr), fun_lookup).parse_all()
+
+
+def eval_sv_dimension_size(s_dim, fun_lookup):
+    """:s_dim: dimension ("[7:0]", "[N]", ...)
+    :returns: number of elements in the dimension
+    :raises: SvConstEvalError if s_dim can't be evaluated
+    """
+    parser = _SvConstExprParser(_tokenize(s_dim), fun_lookup)
+    parser.expect("[")
+    left = parser.parse()
+    sep = parser.take()
+    if sep == "]":
+        # [size] (C-style)
+        size = left
+    else:
+        if sep not in (":", "+:", "-:"):
+            raise SvConstEvalError(f"Unsupported dimension: {s_dim}")
+        right = parser.parse()
+        parser.expect("]")
+        # ([base+:width]/[base-:width] only appear in part selects, but it
+        # doesn't cost anything to support them here)
+        size = right if sep != ":" else abs(left - right) + 1
+    if parser.peek() is not None:
+        raise SvConstEvalError(f"Unexpected token: {parser.peek()}")
+    return size
+
+
+def get_sv_width(data_type, packed, fun_lookup):
+    """:returns: width of a signal/port of data_type with the packed
+    dimensions packed, -1 if it can't be determined
+    """
+    width = 1
+    for word in data_type.split():
+        if word in D_TYPE_WIDTHS:
+            width = D_TYPE_WIDTHS[word]
+        elif word not in TYPES_1_BIT:
+            return -1
+    try:
+        for s_dim in packed:
+            width *= eval_sv_dimension_size(s_dim, fun_lookup)
+    except SvConstEvalError:
+        return -1
+    return width
+
+
+def eval_sv_parameters(l_parameters, d_overrides=None, fun_lookup=_lookup_nothing):
+    """evaluate the parameters of a module (or package), in the order of
+    declaration, such that every parameter can refer to the ones before
+
+    :l_parameters: list of (name, kind, data type, default value (source
+    text)) tuples
+    :d_overrides: dict parameter name -> value (int, or expression that is
+    evaluated with fun_lookup) that replaces the default (localparams can't
+    be overridden)
+    :fun_lookup: see _SvConstExprParser, for the identifiers that aren't
+    parameters of the module itself (package parameters)
+    :returns: dict parameter name -> value, None for the ones that can't be
+    evaluated (and type parameters)
+    """
+    if d_overrides is None:
+        d_overrides = {}
+    d_values = {}
+
+    def fun_lookup_module(name):
+        if name in d_values:
+            if d_values[name] is None:
+                raise SvConstEvalError(f"Parameter without value: {name}")
+            return d_values[name]
+        return fun_lookup(name)
+
+    for name, kind, data_type, s_value in l_parameters:
+        value = None
+        if data_type != "type":
+            if name in d_overrides and kind != "localparam":
+                s_value = d_overrides[name]
+            try:
+                if isinstance(s_value, int):
+                    value = s_value
+                elif s_value:
+                    value = eval_sv_const_expr(s_value, fun_lookup_module)
+            except SvConstEvalError:
+                pass
+        d_values[name] = value
+    return d_values
+
+
+def get_sv_port_widths(l_ports, d_parameters, fun_lookup=_lookup_nothing):
+    """:l_ports: list of HdlPort objects
+    :d_parameters: dict parameter name -> value, as returned by
+    eval_sv_parameters
+    :returns: dict port name -> width (of one element, unpacked dimensions
+    aren't included), -1 for the ones that can't be determined
+    """
+    def fun_lookup_module(name):
+        value = d_parameters.get(name)
+        if value is not None:
+            return value
+        if name in d_parameters:
+            raise SvConstEvalError(f"Parameter without value: {name}")
+        return fun_lookup(name)
+
+    d_widths = {}
+    # (data type, packed dimensions) -> width: there are usually lots of ports
+    # with the same declaration
+    d_cache = {}
+    for port in l_ports:
+        key = (port.data_type, port.packed)
+        try:
+            d_widths[port.name] = d_cache[key]
+        except KeyError:
+            width = d_cache[key] = get_sv_width(port.data_type, port.packed,
+                                                fun_lookup_module)
+            d_widths[port.name] = width
+    return d_widths
+
+
+class SvWidthResolver(object):
+    """port widths of module interfaces, for their default parameters, or
+    other parameter values, memoized per module and set of parameter values.
+    Packages can be added to resolve the parameters that modules import from
+    them.
+    """
+
+    def __init__(self):
+        # package name -> dict parameter name -> value (None if it can't be
+        # evaluated)
+        self.d_packages = {}
+        # unscoped parameter name -> value, of all packages (the packages that
+        # a module imports are not tracked, it can refer to any of them)
+        self._d_package_parameters = {}
+        # (module name, frozenset of overrides) -> (parameter values, port
+        # widths)
+        self._d_cache = {}
+
+    def add_packages_from_sv(self, declaration, preprocessor_context=None):
+        """read the parameters of all packages that are declared in declaration
+
+        :declaration: see HdlModuleInterface.from_sv (file name, file object,
+        or lines)
+        :preprocessor_context: see HdlModuleInterface.from_sv
+        :returns: list of the names of the packages
+        """
+        if isinstance(declaration, str):
+            with open(declaration, 'r') as f_in:
+                return self.add_packages_from_sv(f_in, preprocessor_context)
+
+        if preprocessor_context is None:
+            preprocessor_context = SvPreprocessorContext.get_default()
+        preprocessor = preprocessor_context.preprocessor(getattr(declaration, "name", None))
+        l_names = []
+        for package in iter_sv_packages(preprocessor.process(declaration)):
+            l_parameters = [(name, kind, data_type, default)
+                            for name, kind, data_type, _, default
+                            in package.parameters]
+            d_values = eval_sv_parameters(l_parameters, fun_lookup=self._lookup_package)
+            self.d_packages[package.name] = d_values
+            for name, value in d_values.items():
+                self._d_package_parameters.setdefault(name, value)
+            l_names.append(package.name)
+        # (results from before might have been unresolvable without them)
+        self._d_cache.clear()
+        return l_names
+
+    def _lookup_package(self, name):
+        if "::" in name:
+            s_package, s_name = name.split("::", 1)
+            value = self.d_packages.get(s_package, {}).get(s_name)
+        else:
+            value = self._d_package_parameters.get(name)
+        if value is None:
+            raise SvConstEvalError(f"Unknown identifier: {name}")
+        return value
+
+    def clear(self):
+        """forget the memoized results (e.g. because module interfaces have
+        been parsed again)
+        """
+        self._d_cache.clear()
+
+    def _resolve(self, module_interface, d_overrides):
+        if d_overrides:
+            key = (module_interface.name, frozenset(d_overrides.items()))
+        else:
+            key = (module_interface.name, frozenset())
+        try:
+            return self._d_cache[key]
+        except KeyError:
+            pass
+        d_parameters = eval_sv_parameters(
+                [(x.name, x.kind, x.data_type, x.default)
+                 for x in module_interface.parameters],
+                d_overrides, self._lookup_package)
+        d_widths = get_sv_port_widths(
+                module_interface.ports, d_parameters, self._lookup_package)
+        self._d_cache[key] = (d_parameters, d_widths)
+        return d_parameters, d_widths
+
+    def get_parameters(self, module_interface, d_overrides=None):
+        """:d_overrides: see eval_sv_parameters
+        :returns: dict parameter name -> value (None if it can't be evaluated)
+        """
+        return self._resolve(module_interface, d_overrides)[0]
+
+    def get_port_widths(self, module_interface, d_overrides=None):
+        """:d_overrides: see eval_sv_parameters
+        :returns: dict port name -> width, see get_sv_port_widths
+        """
+        return self._resolve(module_interface, d_overrides)[1]
+
+    def apply(self, module_interface, d_overrides=None):
+        """set the width of the ports of module_interface
+        """
+        d_widths = self.get_port_widths(module_interface, d_overrides)
+        for port in module_interface.ports:
+            port.width = d_widths[port.name]
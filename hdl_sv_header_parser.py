@@ -0,0 +1,735 @@
+#!/usr/bin/env python3
+
+# single-pass parser for (System)Verilog module headers (and the parameters
+# of packages)
+#
+# Instead of matching every line against a set of regexes (which requires one
+# port per line, no comments, and a fixed layout of the header), the source is
+# split into tokens by one combined regex, which skips whitespace, comments,
+# attributes and compiler directives on the way, and keeps strings in one
+# piece. The module headers are then parsed from the tokens:
+#
+# module [static|automatic] <name> [import ...;] [#(<parameters>)] [(<ports>)];
+#
+# with ANSI style ports (direction, type and dimensions in the header, also
+# inherited by subsequent ports, as per the language rules), as well as
+# non-ANSI style ports (only the names in the header, the declarations follow
+# in the module body).
+#
+# Going through the source token by token in python is slow for large files
+# though, so the two things that make up most of the source are done by the
+# regex engine on the whole buffer instead:
+# - finding the module headers, and skipping the module bodies: one regex
+#   search for the (end)module keyword, that steps over comments and strings
+# - the items of port and parameter lists that consist of nothing but words
+#   and simple dimensions (which is most of them): one regex match per item
+#   (_RE_ITEM_SIMPLE). Only the others (with default values, expressions,
+#   interface types, ...) are split into tokens.
+#
+# The source is read in chunks, and only as far as necessary: iterating over
+# the modules of a file stops reading where the iteration stops. If a module
+# header spans the end of the current chunk, more gets read (a multiple of
+# what is already buffered, such that re-parsing the header stays linear
+# overall) and the header is parsed again.
+
+import re
+import functools
+
+# what is skipped between tokens besides whitespace: comments, attributes and
+# compiler directives (the ones that take the rest of the line before other
+# macros)
+_S_SKIP_SV = r"""
+    //[^\n]*|/\*.*?(?:\*/|\Z)|\(\*(?!\)).*?(?:\*\)|\Z)
+    |`(?:define|undef|undefineall|timescale|default_nettype|include|resetall
+        |celldefine|endcelldefine|pragma|line|unconnected_drive
+        |nounconnected_drive|begin_keywords|end_keywords)\b(?:\\\r?\n|[^\n])*
+    |`(?:ifdef|ifndef|elsif)\s+\w+|`(?:else|endif)\b
+"""
+_S_STRING_SV = r'"(?:\\.|[^"\\\n])*(?:"|\Z)'
+
+# (the order matters: comments before operators, numbers before identifiers)
+_RE_TOKEN_SV = re.compile(rf"""
+    (?:\s+|{_S_SKIP_SV})+
+    |(?P<token>
+        {_S_STRING_SV}
+      | (?:\d[\d_]*)?\s*'[sS]?[bBoOdDhH]\s*[0-9a-fA-FxXzZ?_]+
+      | \d[\d_]*(?:\.\d[\d_]*)?(?:[eE][+-]?\d+)?
+      | [A-Za-z_][\w$]*
+      | \\\S+
+      | [`$][\w$]+
+      | ::|\*\*|<<<|>>>|<<|>>|===|!==|==|!=|<=|>=|&&|\|\||\+:|-:|~&|~\||~\^|\^~|'\{{
+      | \S
+    )
+""", re.VERBOSE | re.DOTALL)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_re_keyword_sv(t_keywords):
+    """compile the pattern that finds the keywords t_keywords, outside of
+    comments, strings and escaped identifiers
+
+    (the lookahead for the first characters of the alternatives lets the regex
+    engine skip the characters that can't begin any of them quickly, which is
+    most of a module body)
+    """
+    s_first = "".join(sorted(set(x[0] for x in t_keywords)))
+    return re.compile(rf"""
+        (?=[/(`"\\{s_first}])
+        (?:{_S_SKIP_SV}|{_S_STRING_SV}|\\\S+
+          |(?<![\w$`])(?P<keyword>{"|".join(t_keywords)})(?![\w$]))
+    """, re.VERBOSE | re.DOTALL)
+
+
+# list item that consists of words and dimensions (without parentheses,
+# operators other than the arithmetic ones, ...) only, including the ',' or
+# ')' after it. There may be comments around it, but not within it.
+#
+# (every part of it can match in one way only, such that a failing match
+# - which falls back to the tokens - can't backtrack into e.g. taking code for
+# a comment, or part of a comment for code)
+_S_SKIP_ITEM = r"\s*(?:(?://[^\n]*(?![^\n])|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/)\s*)*"
+_S_DIM_SIMPLE = r"\[[^\[\](){}'\"/`;,=]*\]"
+_RE_ITEM_SIMPLE = re.compile(rf"""
+    {_S_SKIP_ITEM}
+    (?:(?P<first>input|output|inout|ref|parameter|localparam)\s+)?
+    (?P<type>(?:[A-Za-z_][\w$]*\s+)*)
+    (?P<packed>(?:{_S_DIM_SIMPLE}\s*)*)
+    (?P<name>[A-Za-z_][\w$]*)
+    (?P<unpacked>(?:\s*{_S_DIM_SIMPLE})*)
+    {_S_SKIP_ITEM}
+    (?P<sep>[,)])
+""", re.VERBOSE)
+_RE_DIM_SIMPLE = re.compile(_S_DIM_SIMPLE)
+
+KEYWORDS_MODULE = ("module", "macromodule")
+KEYWORD_ENDMODULE = "endmodule"
+KEYWORD_PACKAGE = "package"
+KEYWORD_ENDPACKAGE = "endpackage"
+PARAMETER_KINDS = ("parameter", "localparam")
+DIRECTIONS = ("input", "output", "inout", "ref")
+# direction of interface ports (which have an interface (and modport) as type
+# instead of a direction)
+DIRECTION_INTERFACE = "interface"
+# built-in net and data types, and type modifiers - a port without direction
+# whose type is none of these is an interface port
+TYPES_BUILTIN = frozenset((
+        "wire", "tri", "tri0", "tri1", "triand", "trior", "trireg", "wand",
+        "wor", "uwire", "supply0", "supply1", "interconnect", "var", "logic",
+        "reg", "bit", "byte", "shortint", "int", "longint", "integer", "time",
+        "real", "shortreal", "realtime", "string", "chandle", "event", "signed",
+        "unsigned",
+        ))
+_BRACKETS_OPEN = {"(": ")", "[": "]", "{": "}", "'{": "}"}
+_BRACKETS_CLOSE = frozenset((")", "]", "}"))
+
+CHUNK_SIZE = 64*1024
+
+
+class _NeedMoreData(Exception):
+
+    def __init__(self, pos_keep=None):
+        """:pos_keep: position in the buffer from which on it has to be kept,
+        None if that's up to the caller
+        """
+        super().__init__()
+        self.pos_keep = pos_keep
+
+
+class SvModuleHeader(object):
+    """module header as parsed by iter_sv_module_headers
+
+    :parameters: list of (name, kind ("parameter" or "localparam"), data type,
+    packed dimensions (tuple), default value (source text)) tuples
+    :ports: list of (name, direction, data type, packed dimensions (tuple),
+    unpacked dimensions (tuple)) tuples. direction is one of DIRECTIONS or
+    DIRECTION_INTERFACE.
+    """
+
+    __slots__ = ("name", "parameters", "ports")
+
+    def __init__(self, name, parameters, ports):
+        self.name = name
+        self.parameters = parameters
+        self.ports = ports
+
+
+class SvPackage(object):
+    """package as parsed by iter_sv_packages
+
+    :parameters: list of parameter tuples (see SvModuleHeader) of the
+    parameters and localparams that are declared in the package (outside of
+    functions, tasks and classes)
+    """
+
+    __slots__ = ("name", "parameters")
+
+    def __init__(self, name, parameters):
+        self.name = name
+        self.parameters = parameters
+
+
+class _SvSourceReader(object):
+    """buffer over the source, which gets extended chunk by chunk
+
+    (the language comes in by the token regex and the keyword regexes only,
+    see hdl_vhdl_entity_parser for the VHDL version)
+    """
+
+    # factor by which the buffer grows at least (see grow)
+    GROWTH = 4
+
+    _re_token = _RE_TOKEN_SV
+    _get_re_keyword = staticmethod(_get_re_keyword_sv)
+
+    def __init__(self, source, chunk_size=CHUNK_SIZE):
+        """:source: str (the source code itself), file object, or iterable of
+        lines
+        """
+        self.chunk_size = chunk_size
+        if isinstance(source, str):
+            self.buf = source
+            self.eof = True
+            self._fun_read = None
+        else:
+            self.buf = ""
+            self.eof = False
+            if hasattr(source, "read"):
+                self._fun_read = source.read
+            else:
+                it_lines = iter(source)
+
+                def fun_read(size):
+                    l_lines = []
+                    num_chars = 0
+                    for line in it_lines:
+                        l_lines.append(line)
+                        num_chars += len(line)
+                        if num_chars >= size:
+                            break
+                    return "".join(l_lines)
+                self._fun_read = fun_read
+
+    def grow(self, pos_keep):
+        """drop the buffer up to pos_keep, and read the next chunk
+
+        :returns: the new position of what used to be at pos_keep (0)
+        """
+        num_keep = len(self.buf) - pos_keep
+        s_chunk = self._fun_read(max(self.chunk_size, (self.GROWTH-1) * num_keep))
+        if not s_chunk:
+            self.eof = True
+        self.buf = self.buf[pos_keep:] + s_chunk
+        return 0
+
+    def extend(self):
+        """read the next chunk, and append it to the buffer (positions in the
+        buffer stay valid)
+        """
+        s_chunk = self._fun_read(max(self.chunk_size, (self.GROWTH-1) * len(self.buf)))
+        if not s_chunk:
+            self.eof = True
+        self.buf += s_chunk
+
+    def tokens(self, pos):
+        """generator over the tokens (text, start, end) in the buffer from pos
+
+        :raises: _NeedMoreData if a token reaches the end of the buffer (it
+        might continue in the next chunk), unless the end of the source has
+        been reached
+        """
+        buf = self.buf
+        len_buf = len(buf)
+        eof = self.eof
+        for mo in self._re_token.finditer(buf, pos):
+            if mo.end() == len_buf and not eof:
+                raise _NeedMoreData()
+            if mo.lastgroup:
+                yield (mo.group("token"), mo.start("token"), mo.end())
+        if not eof:
+            raise _NeedMoreData()
+
+    def token(self, pos):
+        """:returns: next token (text, start, end) from pos, None at the end of
+        the source
+        :raises: see tokens
+        """
+        for token in self.tokens(pos):
+            return token
+        return None
+
+    def find_keyword(self, pos, t_keywords):
+        """:returns: (keyword, start, end) of the next of t_keywords from pos
+        (see _get_re_keyword_sv), None at the end of the source. The keyword
+        is returned in lower case (for languages in which keywords are not
+        case sensitive).
+        :raises: _NeedMoreData, with the position from which on the buffer
+        has to be kept to search on
+        """
+        buf = self.buf
+        len_buf = len(buf)
+        for mo in self._get_re_keyword(t_keywords).finditer(buf, pos):
+            if mo.end() == len_buf and not self.eof:
+                raise _NeedMoreData(mo.start())
+            keyword = mo.group("keyword")
+            if keyword:
+                return keyword.lower(), mo.start(), mo.end()
+            pos = mo.end()
+        if self.eof:
+            return None
+        # a keyword, comment, ... could begin at the end of the buffer, but not
+        # before the last whitespace: from the last match on, there is nothing
+        # but plain code (a comment or string that isn't complete would have
+        # been matched up to the end of the buffer)
+        pos_keep = len_buf
+        while pos_keep > pos and not buf[pos_keep-1].isspace():
+            pos_keep -= 1
+        raise _NeedMoreData(pos_keep)
+
+
+def _dims_simple(s_dims):
+    """:returns: tuple of the dimensions in s_dims (as matched by
+    _RE_ITEM_SIMPLE), without whitespace, as if they were joined tokens
+    """
+    return tuple("".join(x.split()) for x in _RE_DIM_SIMPLE.findall(s_dims))
+
+
+def _read_list(reader, pos):
+    """read the items of a port or parameter list up to the closing bracket
+    (the opening one has been read already)
+
+    Lists are what makes up most of a module header, thus if a list doesn't
+    fit into the buffer, the buffer gets extended (instead of having to parse
+    the entire header again).
+
+    :returns: (list of items as returned by _parse_item; position after the
+    closing bracket) or (None, None) at the end of the source
+    """
+    match_item_simple = _RE_ITEM_SIMPLE.match
+    l_items = []
+    buf = reader.buf
+    # source text of type, packed and unpacked dimensions -> type words,
+    # packed and unpacked dimensions (the same ones tend to be used over and
+    # over again in a list)
+    d_parts = {}
+    while True:
+        mo = match_item_simple(buf, pos)
+        if mo:
+            first, s_type, s_packed, name, s_unpacked, sep = mo.groups()
+            key_parts = (s_type, s_packed, s_unpacked)
+            parts = d_parts.get(key_parts)
+            if parts is None:
+                parts = d_parts[key_parts] = (
+                        tuple(s_type.split()), _dims_simple(s_packed),
+                        _dims_simple(s_unpacked))
+            l_items.append((first, parts[0], parts[1], name, parts[2], ""))
+            pos = mo.end()
+            if sep == ")":
+                return l_items, pos
+            continue
+        try:
+            item, pos_next, done = _read_item(reader, pos)
+        except _NeedMoreData:
+            reader.extend()
+            buf = reader.buf
+            continue
+        if pos_next is None:
+            return None, None
+        l_items.append(item)
+        pos = pos_next
+        if done:
+            return l_items, pos
+
+
+def _read_item(reader, pos):
+    """read a list item (split into tokens) up to the ',' or closing bracket
+    after it
+
+    :returns: (item as returned by _parse_item; position after the ',' or
+    bracket; True if it was the closing bracket) or (None, None, None) at the
+    end of the source
+    """
+    l_tokens = []
+    l_close = []
+    for token in reader.tokens(pos):
+        text = token[0]
+        if not l_close:
+            if text == ",":
+                return _parse_item(l_tokens, reader.buf), token[2], False
+            if text == ")":
+                return _parse_item(l_tokens, reader.buf), token[2], True
+        if text in _BRACKETS_OPEN:
+            l_close.append(_BRACKETS_OPEN[text])
+        elif text in _BRACKETS_CLOSE and l_close and text == l_close[-1]:
+            l_close.pop()
+        l_tokens.append(token)
+    return None, None, None
+
+
+def _is_identifier(text):
+    return text[0].isalpha() or text[0] in "_\\"
+
+
+def _parse_item(l_tokens, buf):
+    """split the tokens of a declaration item (port or parameter) into its
+    parts
+
+    :returns: (first word if it is a direction or parameter kind, else None;
+    tuple of the type words; packed dimensions; name; unpacked dimensions;
+    default value (source text, "" if there is none)) or None if the item has
+    no name
+    """
+    s_default = ""
+    l_words = []
+    # (dimension, number of words before it) - the name is the last word, thus
+    # the dimensions before it are packed, the ones after it unpacked
+    l_dims = []
+    l_dim = None
+    depth = 0
+    for i, (text, _, _) in enumerate(l_tokens):
+        if depth == 0:
+            if text == "=":
+                if i + 1 < len(l_tokens):
+                    s_default = buf[l_tokens[i+1][1]:l_tokens[-1][2]].strip()
+                break
+            if text == "[":
+                depth = 1
+                l_dim = [text]
+            else:
+                l_words.append(text)
+            continue
+        l_dim.append(text)
+        if text in _BRACKETS_OPEN:
+            depth += 1
+        elif text in _BRACKETS_CLOSE:
+            depth -= 1
+            if depth == 0:
+                l_dims.append(("".join(l_dim), len(l_words)))
+
+    if not l_words or not _is_identifier(l_words[-1]):
+        return None
+    num_words_type = len(l_words) - 1
+    name = l_words.pop()
+    first = None
+    if l_words and (l_words[0] in DIRECTIONS or l_words[0] in PARAMETER_KINDS):
+        first = l_words.pop(0)
+    packed = tuple(x for x, num_words in l_dims if num_words <= num_words_type)
+    unpacked = tuple(x for x, num_words in l_dims if num_words > num_words_type)
+    return first, tuple(l_words), packed, name, unpacked, s_default
+
+
+@functools.lru_cache(maxsize=1024)
+def _join_type(t_words):
+    return " ".join(t_words).replace(" . ", ".").replace(" :: ", "::")
+
+
+def _parse_parameters(l_items):
+    """parse parameter declaration items, in which kind, type and dimensions
+    are inherited from the previous item if not given
+    """
+    l_parameters = []
+    kind = "parameter"
+    data_type = ""
+    packed = ()
+    for item in l_items:
+        if not item:
+            continue
+        first, t_words, packed_item, name, _, s_default = item
+        if first:
+            kind = first
+        if first or t_words or packed_item:
+            data_type = _join_type(t_words)
+            packed = packed_item
+        l_parameters.append((name, kind, data_type, packed, s_default))
+    return l_parameters
+
+
+def _parse_ports_ansi(l_items, l_ports, d_ports=None, direction=None,
+                      data_type="", packed=()):
+    """parse port declaration items, in which direction, type and dimensions
+    are inherited from the previous item if not given
+
+    :d_ports: dict name -> index in l_ports, for non-ANSI declarations (only
+    ports that are listed in there are updated, no ports are added)
+    :returns: False if there was an item with only a name and no direction to
+    inherit from (aka the items are a non-ANSI port list)
+    """
+    # the direction of the last data port (what a data port without direction 
+    # after an interface port gets)
+    direction_data = None if direction == DIRECTION_INTERFACE else direction
+    for item in l_items:
+        if not item:
+            continue
+        first, t_words, packed_item, name, unpacked, _ = item
+        if first:
+            direction = first
+            data_type = _join_type(t_words)
+            packed = packed_item
+        elif t_words or packed_item:
+            data_type = _join_type(t_words)
+            packed = packed_item
+            if "::" not in t_words and (
+                    "." in t_words or (direction in (None, DIRECTION_INTERFACE)
+                                       and t_words and t_words[0] not in TYPES_BUILTIN)):
+                # interface (and modport) as type (a user-defined type after
+                # a port with direction inherits that direction instead, and 
+                # a type from a package is never an interface)
+                direction = DIRECTION_INTERFACE
+            elif direction in (None, DIRECTION_INTERFACE):
+                # (the default direction, as per the language rules)
+                direction = direction_data or "inout"
+        elif direction is None:
+            return False
+        if direction != DIRECTION_INTERFACE:
+            direction_data = direction
+        port = (name, direction, data_type, packed, unpacked)
+        if d_ports is None:
+            l_ports.append(port)
+        elif name in d_ports:
+            l_ports[d_ports[name]] = port
+    return True
+
+
+def _read_declaration(it_tokens, token_first=None):
+    """read the tokens of a declaration up to the ';' that ends it (or up to
+    a closing bracket without opening one, or the end of the tokens), split by
+    the commas on the top level
+
+    :token_first: first token of the declaration, if it has been read already
+    :returns: list of items, each a list of tokens
+    """
+    l_items = [[token_first] if token_first else []]
+    depth = 0
+    for token in it_tokens:
+        text = token[0]
+        if depth == 0:
+            if text == ";" or text in _BRACKETS_CLOSE:
+                break
+            if text == ",":
+                l_items.append([])
+                continue
+        if text in _BRACKETS_OPEN:
+            depth += 1
+        elif text in _BRACKETS_CLOSE:
+            depth -= 1
+        l_items[-1].append(token)
+    return l_items
+
+
+def parse_sv_port_declaration(source):
+    """parse a port declaration with one or more ports, e.g. a line of an ANSI
+    style port list, or a port declaration in the body of a module with
+    a non-ANSI style port list
+
+    (as opposed to in a port list, an interface port can't be told from any
+    other declaration or statement here, thus a port declaration has to begin
+    with a direction)
+
+    :source: str
+    :returns: list of port tuples (see SvModuleHeader), empty if source is no
+    port declaration
+    """
+    reader = _SvSourceReader(source)
+    l_items = [_parse_item(x, source) for x in _read_declaration(reader.tokens(0))]
+    if not l_items[0] or not l_items[0][0] in DIRECTIONS:
+        return []
+    l_ports = []
+    _parse_ports_ansi(l_items, l_ports)
+    return l_ports
+
+
+def _parse_body_non_ansi(it_tokens, buf, l_ports):
+    """read the module body up to endmodule, and take the port declarations
+    from it (outside of functions and tasks, which have ports of their own)
+
+    :returns: endmodule token, None if the end of the source has been reached
+    before endmodule
+    """
+    d_ports = {x[0]: i for i, x in enumerate(l_ports)}
+    depth_subroutine = 0
+    depth = 0
+    for token in it_tokens:
+        text = token[0]
+        if text == KEYWORD_ENDMODULE:
+            return token
+        if text in _BRACKETS_OPEN:
+            depth += 1
+        elif text in _BRACKETS_CLOSE:
+            depth -= 1
+        elif text in ("function", "task"):
+            depth_subroutine += 1
+        elif text in ("endfunction", "endtask"):
+            depth_subroutine -= 1
+        elif text in DIRECTIONS and depth == 0 and depth_subroutine == 0:
+            l_items = _read_declaration(it_tokens, token)
+            _parse_ports_ansi([_parse_item(x, buf) for x in l_items], l_ports, d_ports)
+    return None
+
+
+def _parse_header(reader, pos):
+    """parse the module header from pos, which is right after the 'module'
+    keyword
+
+    :returns: (SvModuleHeader, True if the body has been read up to endmodule
+    already, position after the last token that has been read) or (None,
+    None, None) at the end of the source
+    """
+    token = reader.token(pos)
+    if token and token[0] in ("static", "automatic"):
+        token = reader.token(token[2])
+    if not token:
+        return None, None, None
+    name = token[0]
+    l_parameters = []
+    l_ports = []
+    non_ansi = False
+
+    token = reader.token(token[2])
+    # package imports
+    while token and token[0] == "import":
+        for token in reader.tokens(token[2]):
+            if token[0] == ";":
+                break
+        else:
+            return None, None, None
+        token = reader.token(token[2])
+    if token and token[0] == "#":
+        token = reader.token(token[2])
+        if token and token[0] == "(":
+            l_items, pos = _read_list(reader, token[2])
+            if l_items is None:
+                return None, None, None
+            l_parameters = _parse_parameters(l_items)
+            token = reader.token(pos)
+    if token and token[0] == "(":
+        l_items, pos = _read_list(reader, token[2])
+        if l_items is None:
+            return None, None, None
+        if not _parse_ports_ansi(l_items, l_ports):
+            # non-ANSI: only the port names in the header
+            non_ansi = True
+            l_ports = [(x[3], DIRECTIONS[2], "", (), ()) for x in l_items if x]
+        token = reader.token(pos)
+    if not token:
+        return None, None, None
+    # (token is the ';' that ends the header now)
+
+    if non_ansi:
+        token = _parse_body_non_ansi(reader.tokens(token[2]), reader.buf, l_ports)
+        if not token:
+            return None, None, None
+    return SvModuleHeader(name, l_parameters, l_ports), non_ansi, token[2]
+
+
+def iter_sv_module_headers(source, chunk_size=CHUNK_SIZE):
+    """generator over the headers of all modules in source, as SvModuleHeader
+    objects
+
+    :source: str (the source code itself), file object, or iterable of lines
+    """
+    reader = _SvSourceReader(source, chunk_size)
+    pos = 0
+    # "search": looking for the next module, "body": skipping the body of the
+    # module that has been parsed last
+    state = "search"
+    while True:
+        try:
+            if state == "search":
+                keyword = reader.find_keyword(pos, KEYWORDS_MODULE)
+                if not keyword:
+                    return
+                # (if the header doesn't fit into the buffer, it gets parsed
+                # again from here)
+                pos = keyword[1]
+                header, body_read, pos_end = _parse_header(reader, keyword[2])
+                if not header:
+                    return
+                pos = pos_end
+                state = "search" if body_read else "body"
+                yield header
+            else:
+                keyword = reader.find_keyword(pos, (KEYWORD_ENDMODULE,))
+                if not keyword:
+                    return
+                pos = keyword[2]
+                state = "search"
+        except _NeedMoreData as e:
+            if reader.eof:
+                return
+            if e.pos_keep is not None:
+                pos = e.pos_keep
+            pos = reader.grow(pos)
+
+
+def _next_token(it_tokens):
+    """:returns: next token, None at the end of the source"""
+    return next(it_tokens, None)
+
+
+def _parse_package(it_tokens, buf):
+    """parse a package, the 'package' keyword has been read already
+
+    :returns: (SvPackage, endpackage token) or (None, None) at the end of the
+    source
+    """
+    token = _next_token(it_tokens)
+    if token and token[0] in ("static", "automatic"):
+        token = _next_token(it_tokens)
+    if not token:
+        return None, None
+    name = token[0]
+    l_parameters = []
+    depth_scope = 0
+    depth = 0
+    for token in it_tokens:
+        text = token[0]
+        if text == KEYWORD_ENDPACKAGE:
+            return SvPackage(name, l_parameters), token
+        if text in _BRACKETS_OPEN:
+            depth += 1
+        elif text in _BRACKETS_CLOSE:
+            depth -= 1
+        elif text in ("function", "task", "class"):
+            depth_scope += 1
+        elif text in ("endfunction", "endtask", "endclass"):
+            depth_scope -= 1
+        elif text in PARAMETER_KINDS and depth == 0 and depth_scope == 0:
+            l_items = _read_declaration(it_tokens, token)
+            l_parameters.extend(
+                    _parse_parameters([_parse_item(x, buf) for x in l_items]))
+    return None, None
+
+
+def iter_sv_packages(source, chunk_size=CHUNK_SIZE):
+    """generator over all packages in source, as SvPackage objects
+
+    :source: see iter_sv_module_headers
+    """
+    reader = _SvSourceReader(source, chunk_size)
+    pos = 0
+    while True:
+        try:
+            keyword = reader.find_keyword(pos, (KEYWORD_PACKAGE,))
+            if not keyword:
+                return
+            # (if the package doesn't fit into the buffer, it gets parsed again
+            # from here)
+            pos = keyword[1]
+            package, token = _parse_package(reader.tokens(keyword[2]), reader.buf)
+            if not package:
+                return
+            pos = token[2]
+            yield package
+        except _NeedMoreData as e:
+            if reader.eof:
+                return
+            if e.pos_keep is not None:
+                pos = e.pos_keep
+            pos = reader.grow(pos)
+
+
+def tokenize_sv(source):
+    """:source: str
+    :returns: list of the tokens (text only) in source, without whitespace,
+    comments, attributes and compiler directives
+    """
+    return [x[0] for x in _SvSourceReader(source).tokens(0)]
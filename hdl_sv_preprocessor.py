@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+
+# lightweight (System)Verilog preprocessor, as a streaming stage in front of
+# the parsers
+#
+# The parsers on their own see both branches of every `ifdef, don't know the
+# value of any macro, and never look into included files. SvPreprocessor
+# handles the directives that decide what the parsers get to see:
+# - `define (object-like and function-like macros, with line continuations),
+#   `undef, `undefineall
+# - `ifdef, `ifndef, `elsif, `else, `endif
+# - `include "file" / <file>
+# and expands the macros that are defined. Everything else (`timescale,
+# `default_nettype, uses of macros that are not defined, ...) is passed on as
+# it is.
+#
+# The source is processed chunk by chunk (or line by line, see process_line),
+# and most of it doesn't contain a single backtick: such text is passed on
+# as it is, without looking at it any further. Only the lines with a backtick
+# go through the directive regex.
+#
+# Every file starts with the defines of its SvPreprocessorContext (e.g. from
+# the project config), which is shared by all files of a run. The context
+# also holds the include cache: an included file is read and split into
+# pieces (see _split_pp_text) once, and only processed from the pieces for
+# every further `include of it.
+#
+# Limitations: comments that span multiple lines are not tracked (directives
+# in there are processed as well), and the arguments of a macro call have to
+# be on the line of the macro call.
+
+import os
+import re
+
+# chunk size for reading files (see SvPreprocessor.process)
+CHUNK_SIZE = 64*1024
+
+# files that include each other without include guards would be included
+# forever
+MAX_INCLUDE_DEPTH = 32
+# (same for macros that expand to themselves)
+MAX_EXPANSION_DEPTH = 32
+
+DIRECTIVES_CONDITIONAL = ("ifdef", "ifndef", "elsif", "else", "endif")
+# directives that are passed on to the parsers, along with the rest of the line
+DIRECTIVES_PASS = frozenset((
+        "timescale", "default_nettype", "resetall", "celldefine",
+        "endcelldefine", "pragma", "line", "unconnected_drive",
+        "nounconnected_drive", "begin_keywords", "end_keywords",
+        "__FILE__", "__LINE__"))
+
+# strings and comments (which are passed on as they are), and directives or
+# macro uses (group 1: the name)
+_RE_PP = re.compile(r"""
+    "(?:\\.|[^"\\\n])*"?
+    |//[^\n]*
+    |/\*.*?(?:\*/|\Z)
+    |`(\w+)
+""", re.VERBOSE | re.DOTALL)
+_RE_PP_NAME = re.compile(r"\s*(\w+)")
+_RE_PP_DEFINE = re.compile(r"[ \t]+(\w+)(\([^)]*\))?[ \t]*(.*)", re.DOTALL)
+_RE_PP_INCLUDE = re.compile(r"""\s*(?:"([^"\n]*)"|<([^>\n]*)>)""")
+_RE_PP_LINE_COMMENT = re.compile(r'("(?:\\.|[^"\\\n])*"?)|//[^\n]*')
+_RE_PP_MACRO_ARGS = re.compile(r'"(?:\\.|[^"\\])*"?|[()\[\]{},]|[^"()\[\]{},]+')
+_RE_PP_MACRO_BODY = re.compile(r"``|(?<![`\w$])([A-Za-z_]\w*)")
+
+# (bytes, for searching files without decoding them, see has_sv_directives)
+_RE_PP_STATEFUL_BYTES = re.compile(
+        rb"`(?:ifdef|ifndef|elsif|else|endif|define|undef|undefineall|include)\b")
+
+
+def has_sv_directives(buf):
+    """:buf: bytes-like (bytes, mmap, ...)
+    :returns: True if buf contains any directive that changes what the
+    preprocessor passes on beyond the line it is in (conditionals, defines,
+    includes). Without those, the lines of a file can be preprocessed in any
+    order, or only some of them.
+    """
+    return _RE_PP_STATEFUL_BYTES.search(buf) is not None
+
+
+def _split_pp_text(text):
+    """split text (complete lines) into pieces that need preprocessing and
+    pieces that don't
+
+    :returns: tuple of (needs preprocessing, text) - runs of lines without
+    a backtick, and single lines with a backtick (along with their
+    continuation lines, if they end with a backslash)
+    """
+    l_pieces = []
+    pos = 0
+    while True:
+        idx = text.find("`", pos)
+        if idx < 0:
+            if pos < len(text):
+                l_pieces.append((False, text[pos:]))
+            return tuple(l_pieces)
+        idx_line = text.rfind("\n", pos, idx) + 1 or pos
+        if idx_line > pos:
+            l_pieces.append((False, text[pos:idx_line]))
+        idx_end = text.find("\n", idx)
+        while idx_end > 0 and text[idx_end-1] == "\\":
+            idx_end = text.find("\n", idx_end + 1)
+        idx_end = len(text) if idx_end < 0 else idx_end + 1
+        l_pieces.append((True, text[idx_line:idx_end]))
+        pos = idx_end
+
+
+def _get_end_complete(text):
+    """:returns: position after the last complete line in text (which
+    doesn't continue in the next line)
+    """
+    idx_end = text.rfind("\n") + 1
+    while idx_end > 1 and text[idx_end-2] == "\\":
+        idx_end = text.rfind("\n", 0, idx_end - 1) + 1
+    return idx_end
+
+
+def _parse_defines(defines):
+    """:defines: dict name -> value (None or True for just defined), or list
+    of "NAME" or "NAME=VALUE" strings
+    :returns: dict name -> (None, value text), as SvPreprocessor keeps its
+    defines
+    """
+    if not defines:
+        return {}
+    if not isinstance(defines, dict):
+        defines = dict((x.split("=", 1) + [None])[:2] for x in defines)
+    d_defines = {}
+    for name, value in defines.items():
+        if value is None or value is True:
+            value = ""
+        d_defines[name] = (None, str(value))
+    return d_defines
+
+
+class SvPreprocessorContext(object):
+    """what preprocessing starts from in every file of a run: the defines and
+    the include directories. Also the cache of the included files, which is
+    shared by all SvPreprocessor objects of the context.
+    """
+
+    # project config keys (see from_project_config)
+    KEY_DEFINES = "defines"
+    KEY_INCLUDE_DIRS = "include_dirs"
+
+    _default = None
+
+    def __init__(self, defines=None, include_dirs=()):
+        """
+        :defines: dict name -> value (None or True for just defined), or list
+        of "NAME" or "NAME=VALUE" strings
+        :include_dirs: directories to search for included files (after the
+        directory of the including file)
+        """
+        self._d_defines = _parse_defines(defines)
+        self.include_dirs = list(include_dirs)
+        # absolute path -> ((mtime, size), pieces as from _split_pp_text)
+        self._d_includes = {}
+
+    @classmethod
+    def from_project_config(cls, project_config):
+        """:project_config: ProjectConfig (or dict) - with the optional keys
+        "defines" (see __init__) and "include_dirs"
+        """
+        return cls(project_config.get(cls.KEY_DEFINES),
+                   project_config.get(cls.KEY_INCLUDE_DIRS) or ())
+
+    @classmethod
+    def get_default(cls):
+        """:returns: the context without any defines or include directories
+        (one for all, such that its include cache is shared)
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    @property
+    def key(self):
+        """serializable (json) representation of what preprocessing depends on
+        (besides the files), to tell if results from an earlier run still hold
+        """
+        return [sorted([name, value] for name, (_, value) in self._d_defines.items()),
+                self.include_dirs]
+
+    def __getstate__(self):
+        # (the include cache stays with the process, pickling it to a worker
+        # process would cost more than reading the files there)
+        d_state = dict(self.__dict__)
+        d_state["_d_includes"] = {}
+        return d_state
+
+    def preprocessor(self, file=None):
+        """:file: path of the file that is going to be processed (for
+        includes relative to it)
+        :returns: SvPreprocessor
+        """
+        return SvPreprocessor(self, file)
+
+    def find_include(self, s_include, dir_including):
+        """:returns: absolute path of the file to include for s_include, None if
+        it can't be found
+        """
+        for dir_path in [dir_including] + self.include_dirs:
+            path = os.path.join(dir_path, s_include)
+            if os.path.isfile(path):
+                return os.path.abspath(path)
+        return None
+
+    def get_include(self, path):
+        """:path: absolute path of an included file
+        :returns: ((mtime, size), pieces) of the file, read only if it isn't in
+        the cache already or has changed since
+        :raises: OSError if the file can't be read
+        """
+        stat = os.stat(path)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        entry = self._d_includes.get(path)
+        if entry is None or entry[0] != stat_key:
+            with open(path, 'r') as f_in:
+                text = f_in.read()
+            if text and not text.endswith("\n"):
+                text += "\n"
+            entry = (stat_key, _split_pp_text(text))
+            self._d_includes[path] = entry
+        return entry
+
+
+class SvPreprocessor(object):
+    """preprocessor state for one file: the defines (the context's, plus
+    what the file defines itself), the stack of conditionals, and the files
+    that it has included so far
+    """
+
+    def __init__(self, context=None, file=None):
+        """
+        :context: SvPreprocessorContext, default: SvPreprocessorContext.get_default()
+        :file: see SvPreprocessorContext.preprocessor
+        """
+        if context is None:
+            context = SvPreprocessorContext.get_default()
+        self.context = context
+        self.d_defines = dict(context._d_defines)
+        # absolute path -> (mtime, size) of every file that has been included
+        self.d_included_files = {}
+        # one [active before the conditional, some branch taken] per open
+        # conditional
+        self._l_conditionals = []
+        self._active = True
+        # directories of the files being processed, innermost last
+        # (file objects can have anything as their name)
+        self._l_dirs = [os.path.dirname(os.path.abspath(file))
+                        if isinstance(file, (str, os.PathLike)) else os.getcwd()]
+        # (start of a line that continues in the next input)
+        self._s_pending = ""
+
+    @property
+    def active(self):
+        """False while inside of a conditional branch that is not taken"""
+        return self._active
+
+    @property
+    def plain(self):
+        """True if a line without a backtick would be passed on as it is"""
+        return self._active and not self._s_pending
+
+    def process(self, source, chunk_size=CHUNK_SIZE):
+        """generator over the preprocessed text of source, chunk by chunk
+
+        :source: str (the source code itself), file object, or iterable of
+        lines (or of any pieces of text)
+        """
+        if isinstance(source, str):
+            s_out = self.feed(source) + self.flush()
+            if s_out:
+                yield s_out
+            return
+        if hasattr(source, "read"):
+            fun_read = source.read
+            source = iter(lambda: fun_read(chunk_size), "")
+        for text in source:
+            s_out = self.feed(text)
+            if s_out:
+                yield s_out
+        s_out = self.flush()
+        if s_out:
+            yield s_out
+
+    def feed(self, text):
+        """:text: next piece of the source (any size, lines can continue in
+        the next piece)
+        :returns: preprocessed text of all the lines in text that are complete
+        """
+        if self._s_pending:
+            text = self._s_pending + text
+        idx_end = _get_end_complete(text)
+        self._s_pending = text[idx_end:]
+        if idx_end < len(text):
+            text = text[:idx_end]
+        if self._active and "`" not in text:
+            return text
+        l_out = []
+        self._process_pieces(_split_pp_text(text), l_out, 0)
+        return "".join(l_out)
+
+    def flush(self):
+        """:returns: preprocessed text of what is left over from feed (a last
+        line without line break)
+        """
+        text, self._s_pending = self._s_pending, ""
+        if not text:
+            return ""
+        l_out = []
+        self._process_pieces(_split_pp_text(text), l_out, 0)
+        return "".join(l_out)
+
+    def process_line(self, line):
+        """preprocess the source line by line (instead of with feed)
+
+        :line: next line of the source (with its line break)
+        :returns: preprocessed text of line - empty if it is a directive or not
+        active, several lines if it is an include. If line continues in the
+        next line, nothing is returned for it, and the whole of it with the
+        next line.
+        """
+        if self._s_pending:
+            line = self._s_pending + line
+            self._s_pending = ""
+        if "`" not in line:
+            return line if self._active else ""
+        if line.endswith("\\\n"):
+            self._s_pending = line
+            return ""
+        l_out = []
+        self._process_piece(line, l_out, 0)
+        return "".join(l_out)
+
+    def _process_pieces(self, t_pieces, l_out, depth):
+        for b_preprocess, text in t_pieces:
+            if b_preprocess:
+                self._process_piece(text, l_out, depth)
+            elif self._active:
+                l_out.append(text)
+
+    def _process_piece(self, text, l_out, depth):
+        """process the directives and macro uses in text (one line, plus its
+        continuation lines), append the output to l_out
+        """
+        pos = 0
+        while True:
+            mo = _RE_PP.search(text, pos)
+            if mo is None:
+                if self._active:
+                    l_out.append(text[pos:])
+                return
+            name = mo.group(1)
+            if name is None:
+                # (string or comment)
+                if self._active:
+                    l_out.append(text[pos:mo.end()])
+                pos = mo.end()
+                continue
+
+            if self._active and mo.start() > pos:
+                l_out.append(text[pos:mo.start()])
+            pos = mo.end()
+            if name in DIRECTIVES_CONDITIONAL:
+                pos = self._conditional(name, text, pos)
+            elif not self._active:
+                pass
+            elif name == "define":
+                mo_define = _RE_PP_DEFINE.match(text, pos)
+                if mo_define:
+                    self._define(*mo_define.groups())
+                    # (the definition takes the rest of the line)
+                    if text.endswith("\n"):
+                        l_out.append("\n")
+                    return
+            elif name == "undef":
+                mo_name = _RE_PP_NAME.match(text, pos)
+                if mo_name:
+                    self.d_defines.pop(mo_name.group(1), None)
+                    pos = mo_name.end()
+            elif name == "undefineall":
+                self.d_defines.clear()
+            elif name == "include":
+                mo_include = _RE_PP_INCLUDE.match(text, pos)
+                if mo_include:
+                    self._include(mo_include.group(1) or mo_include.group(2),
+                                  l_out, depth)
+                    pos = mo_include.end()
+            elif name in DIRECTIVES_PASS:
+                l_out.append(text[mo.start():])
+                return
+            else:
+                pos = self._expand_macro(name, text, mo.start(), pos, l_out, depth)
+
+    def _conditional(self, name, text, pos):
+        """:returns: position after the conditional directive (and its macro
+        name)
+        """
+        if name in ("ifdef", "ifndef", "elsif"):
+            mo_name = _RE_PP_NAME.match(text, pos)
+            if mo_name is None:
+                return pos
+            defined = (mo_name.group(1) in self.d_defines) != (name == "ifndef")
+            pos = mo_name.end()
+        if name in ("ifdef", "ifndef"):
+            self._l_conditionals.append([self._active, defined])
+            self._active = self._active and defined
+            return pos
+        if not self._l_conditionals:
+            # (unbalanced, ignore it)
+            return pos
+        conditional = self._l_conditionals[-1]
+        if name == "endif":
+            self._active = conditional[0]
+            self._l_conditionals.pop()
+        elif name == "else":
+            self._active = conditional[0] and not conditional[1]
+            conditional[1] = True
+        else:
+            self._active = conditional[0] and not conditional[1] and defined
+            conditional[1] = conditional[1] or defined
+        return pos
+
+    def _define(self, name, s_params, body):
+        # (line continuations are line breaks in the macro text, and
+        # a comment at the end of the line is not part of it)
+        body = body.replace("\\\r\n", "\n").replace("\\\n", "\n")
+        body = _RE_PP_LINE_COMMENT.sub(lambda mo: mo.group(1) or "", body).strip()
+        t_params = None
+        if s_params is not None:
+            l_params = []
+            for s_param in s_params[1:-1].split(","):
+                if not s_param.strip():
+                    continue
+                param_name, _, default = s_param.partition("=")
+                l_params.append((param_name.strip(), default.strip() if _ else None))
+            t_params = tuple(l_params)
+        self.d_defines[name] = (t_params, body)
+
+    def _include(self, s_include, l_out, depth):
+        if depth >= MAX_INCLUDE_DEPTH:
+            return
+        path = self.context.find_include(s_include, self._l_dirs[-1])
+        if path is None:
+            return
+        try:
+            stat_key, t_pieces = self.context.get_include(path)
+        except OSError:
+            return
+        self.d_included_files[path] = stat_key
+        self._l_dirs.append(os.path.dirname(path))
+        self._process_pieces(t_pieces, l_out, depth + 1)
+        self._l_dirs.pop()
+
+    def _expand_macro(self, name, text, pos_start, pos, l_out, depth):
+        """append the expansion of the use of macro name (at pos_start in text,
+        pos is after the name) to l_out. Macros that are not defined (and
+        function-like macros without arguments) are passed on as they are.
+
+        :returns: position after the macro use (including its arguments)
+        """
+        definition = self.d_defines.get(name)
+        if definition is None or depth >= MAX_EXPANSION_DEPTH:
+            l_out.append(text[pos_start:pos])
+            return pos
+        t_params, body = definition
+        if t_params is not None:
+            l_args, pos_args = _read_macro_args(text, pos)
+            if l_args is None:
+                l_out.append(text[pos_start:pos])
+                return pos
+            pos = pos_args
+            body = _substitute_macro_args(body, t_params, l_args)
+        if "`" in body:
+            # (macros in the macro text, but no directives)
+            self._expand_text(body, l_out, depth + 1)
+        else:
+            l_out.append(body)
+        return pos
+
+    def _expand_text(self, text, l_out, depth):
+        pos = 0
+        while True:
+            mo = _RE_PP.search(text, pos)
+            if mo is None:
+                l_out.append(text[pos:])
+                return
+            l_out.append(text[pos:mo.start()])
+            if mo.group(1) is None:
+                l_out.append(mo.group(0))
+                pos = mo.end()
+            else:
+                pos = self._expand_macro(
+                        mo.group(1), text, mo.start(), mo.end(), l_out, depth)
+
+
+def _read_macro_args(text, pos):
+    """read the arguments of a function-like macro call, which start at pos
+    in text (with the opening parenthesis)
+
+    :returns: (list of the argument texts, position after the closing
+    parenthesis), (None, None) if there are no arguments (on this line)
+    """
+    idx = len(text) - len(text[pos:].lstrip())
+    if text[idx:idx+1] != "(":
+        return None, None
+    l_args = []
+    l_arg = []
+    level = 0
+    for mo in _RE_PP_MACRO_ARGS.finditer(text, idx + 1):
+        s = mo.group(0)
+        if s in "([{":
+            level += 1
+        elif s in ")]}":
+            if level == 0:
+                l_args.append("".join(l_arg).strip())
+                return l_args, mo.end()
+            level -= 1
+        elif s == "," and level == 0:
+            l_args.append("".join(l_arg).strip())
+            l_arg = []
+            continue
+        l_arg.append(s)
+    return None, None
+
+
+def _substitute_macro_args(body, t_params, l_args):
+    d_args = {}
+    for idx, (param_name, default) in enumerate(t_params):
+        arg = l_args[idx] if idx < len(l_args) else ""
+        d_args[param_name] = arg if arg or default is None else default
+
+    def fun_replace(mo):
+        if mo.group(1) is None:
+            # (`` joins the text on both sides)
+            return ""
+        return d_args.get(mo.group(1), mo.group(1))
+
+    body = _RE_PP_MACRO_BODY.sub(fun_replace, body)
+    return body.replace('`\\`"', '\\"').replace('`"', '"')
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+# execution of external tools (vivado & co.) as subprocesses
+#
+# Every tool invocation streams its output (stdout and stderr) to a log file
+# in the log directory (and optionally to the terminal), and appends one json
+# line with command, exit code, wall-clock time and peak memory (RSS) to the
+# run log in the same directory. That's where the data comes from to tell
+# where the build time goes. Invocations can have a timeout, and independent
+# invocations can run concurrently (run_all).
+#
+# The peak memory is an upper bound: it also counts the Python process that
+# launches the tool (the peak RSS of a process carries over its exec, thus
+# the tool "starts" with the RSS of the forked launcher image, some 10-20 MB).
+# It's meaningful for the tools that matter (vivado takes GBs), not for small
+# ones.
+
+import os
+import sys
+import json
+import time
+import shlex
+import signal
+import datetime
+import itertools
+import threading
+import subprocess
+import concurrent.futures
+
+from .hdl_file_util import file_lock
+
+
+class ToolRunResult(object):
+
+    def __init__(self, l_command, returncode, wall_time, max_rss_kib, log_file,
+                 timed_out=False, start=None):
+        """
+        :returncode: exit code of the tool, negative for "killed by signal" (as
+        in subprocess), None if it couldn't be determined
+        :wall_time: in seconds
+        :max_rss_kib: peak resident set size of the tool (and its children,
+        which is where vivado does the work), None if not available. An upper 
+        bound that includes the launching Python process (see the module 
+        description), i.e. it never is below the launcher's RSS.
+        :start: datetime of the start of the tool
+        """
+        self.l_command = l_command
+        self.returncode = returncode
+        self.wall_time = wall_time
+        self.max_rss_kib = max_rss_kib
+        self.log_file = log_file
+        self.timed_out = timed_out
+        self.start = start
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+
+class ToolRunner(object):
+
+    S_RUN_LOG_FILE = "tool_runs.jsonl"
+
+    def __init__(self, log_dir, echo=True):
+        """
+        :log_dir: directory for the tool log files and the run log
+        :echo: also print the tool output to stdout (while it's running). Only
+        for run, run_all never echoes (the outputs would be interleaved).
+        """
+        self.log_dir = log_dir
+        self.echo = echo
+        # (part of the log file names, such that concurrent runs of the same 
+        # tool never share a log file)
+        self._it_run_number = itertools.count()
+
+    @property
+    def run_log_file(self):
+        return os.path.join(self.log_dir, self.S_RUN_LOG_FILE)
+
+    def _get_log_file(self, name):
+        s_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(
+                self.log_dir,
+                f"{name}_{s_timestamp}_{os.getpid()}_{next(self._it_run_number)}.log")
+
+    @staticmethod
+    def _kill(process):
+        """kill the tool, including its child processes (vivado for instance is 
+        a launcher script that starts the actual binary)
+        """
+        if os.name == "posix":
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        else:
+            process.kill()
+
+    @staticmethod
+    def _wait(process):
+        """wait for process to finish
+
+        :returns: (returncode, peak RSS in KiB or None)
+        """
+        if hasattr(os, "wait4"):
+            # (wait4 returns the resource usage of the process, including its
+            # waited-for children. ru_maxrss also includes the forked launcher 
+            # image from before the exec, see ToolRunResult.max_rss_kib)
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            max_rss = rusage.ru_maxrss
+            # (ru_maxrss is in bytes on macOS, KiB everywhere else)
+            if sys.platform == "darwin":
+                max_rss //= 1024
+            return process.returncode, max_rss
+        return process.wait(), None
+
+    def run(self, l_command, name=None, timeout=None, cwd=None, echo=None):
+        """run l_command, stream its output to a log file (and to stdout, see
+        echo), and record the run in the run log
+
+        :l_command: list of the executable and its arguments
+        :name: prefix of the log file name, default: the executable's name
+        :timeout: in seconds, the tool gets killed after that
+        :returns: ToolRunResult
+        """
+        if name is None:
+            name = os.path.basename(l_command[0])
+        if echo is None:
+            echo = self.echo
+        os.makedirs(self.log_dir, exist_ok=True)
+        log_file = self._get_log_file(name)
+
+        datetime_start = datetime.datetime.now().astimezone()
+        time_start = time.monotonic()
+        # (in a new process group on posix, see _kill)
+        process = subprocess.Popen(
+                l_command, cwd=cwd, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                start_new_session=(os.name == "posix"))
+
+        # the timeout is enforced by a timer thread that kills the process,
+        # such that the output can be streamed without polling
+        timed_out = threading.Event()
+
+        def fun_kill():
+            timed_out.set()
+            self._kill(process)
+
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, fun_kill)
+            timer.start()
+        try:
+            with open(log_file, 'wb') as f_log:
+                for line in process.stdout:
+                    f_log.write(line)
+                    if echo:
+                        sys.stdout.buffer.write(line)
+                        sys.stdout.flush()
+            process.stdout.close()
+            returncode, max_rss_kib = self._wait(process)
+        except BaseException:
+            # (e.g. KeyboardInterrupt, which doesn't reach the tool in its own 
+            # process group: don't leave the tool running)
+            self._kill(process)
+            process.wait()
+            raise
+        finally:
+            if timer:
+                timer.cancel()
+        wall_time = time.monotonic() - time_start
+
+        result = ToolRunResult(l_command, returncode, wall_time, max_rss_kib,
+                               log_file, timed_out.is_set(), datetime_start)
+        self._append_run_log(result, name)
+        return result
+
+    def run_all(self, l_jobs, max_workers=None):
+        """run independent tool jobs concurrently
+
+        :l_jobs: list of dicts with the arguments for run (l_command, name,
+        timeout, cwd)
+        :returns: list of ToolRunResult, in the order of l_jobs
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            l_futures = [executor.submit(self.run, echo=False, **d_job)
+                         for d_job in l_jobs]
+            return [x.result() for x in l_futures]
+
+    def _append_run_log(self, result, name):
+        d_entry = {
+                "name": name,
+                "command": shlex.join(result.l_command),
+                "start": result.start.isoformat(timespec="seconds"),
+                "returncode": result.returncode,
+                "timed_out": result.timed_out,
+                "wall_time_s": round(result.wall_time, 3),
+                "max_rss_kib": result.max_rss_kib,
+                "log_file": os.path.basename(result.log_file),
+                }
+        # (the lock, because concurrent runs - also from concurrent code
+        # manager processes - append to the same file)
+        with file_lock(self.run_log_file):
+            with open(self.run_log_file, 'a') as f_out:
+                f_out.write(json.dumps(d_entry) + "\n")
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+
+# single-pass parser for VHDL entity declarations
+#
+# The VHDL counterpart of hdl_sv_header_parser, on the same reader: the source
+# is read in chunks, one regex search (that steps over comments, strings and
+# character literals) finds the next 'entity' keyword, and only the entity
+# header is split into tokens:
+#
+# entity <name> is [generic (<generics>);] [port (<ports>);] ... end ...;
+#
+# Everything in between the entity headers (architectures, packages, ...) is
+# skipped by the keyword search. 'entity' also appears in direct entity
+# instantiations ("inst : entity work.foo port map ...") and in
+# "end entity", these are told apart by the 'is' after the name.
+#
+# Widths are evaluated by the expression evaluator of hdl_sv_const_eval, the
+# VHDL operators are translated to their SystemVerilog counterparts for that
+# (mod is evaluated like rem, which only makes a difference for negative
+# operands).
+
+import re
+import functools
+
+from .hdl_sv_header_parser import _SvSourceReader, _NeedMoreData, CHUNK_SIZE
+from .hdl_sv_const_eval import eval_sv_const_expr, SvConstEvalError, _lookup_nothing
+
+_S_SKIP_VHDL = r"--[^\n]*|/\*.*?(?:\*/|\Z)"
+_S_STRING_VHDL = r'"(?:""|[^"\n])*(?:"|\Z)'
+# (not to be confused with the tick of an attribute, sig'length: a character
+# literal is always one character between two ticks)
+_S_CHAR_VHDL = r"'[^\n]'"
+
+# (the order matters: based literals before numbers, bit string literals
+# (x"ff") with the identifiers)
+_RE_TOKEN_VHDL = re.compile(rf"""
+    (?:\s+|{_S_SKIP_VHDL})+
+    |(?P<token>
+        {_S_STRING_VHDL}
+      | {_S_CHAR_VHDL}
+      | \d[\d_]*\#[0-9a-fA-F_.]+\#(?:[eE][+-]?\d+)?
+      | \d[\d_]*(?:\.\d[\d_]*)?(?:[eE][+-]?\d+)?
+      | [A-Za-z]\w*(?:"[^"\n]*")?
+      | \\[^\\\n]*\\
+      | :=|=>|<=|>=|/=|\*\*|<>|\?\?
+      | \S
+    )
+""", re.VERBOSE | re.DOTALL)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_re_keyword_vhdl(t_keywords):
+    """compile the pattern that finds the keywords t_keywords (in any case),
+    outside of comments, strings, character literals and extended
+    identifiers, see _get_re_keyword_sv
+    """
+    s_first = "".join(sorted(set(x[0] for x in t_keywords)))
+    return re.compile(rf"""
+        (?=[-/"'\\{s_first}])
+        (?:{_S_SKIP_VHDL}|{_S_STRING_VHDL}|{_S_CHAR_VHDL}|\\[^\\\n]*\\
+          |(?<!\w)(?P<keyword>{"|".join(t_keywords)})(?!\w))
+    """, re.VERBOSE | re.DOTALL | re.IGNORECASE)
+
+
+KEYWORD_ENTITY = "entity"
+OBJECT_CLASSES = ("signal", "constant", "variable", "file")
+MODES = ("in", "out", "inout", "buffer", "linkage")
+# data type of generic types (VHDL-2008, "generic (type T)")
+TYPE_GENERIC = "type"
+TYPES_1_BIT = frozenset(("std_logic", "std_ulogic", "bit", "boolean"))
+TYPES_VECTOR = frozenset((
+        "std_logic_vector", "std_ulogic_vector", "bit_vector", "boolean_vector",
+        "unsigned", "signed", "unresolved_unsigned", "unresolved_signed",
+        "u_unsigned", "u_signed"))
+D_TYPE_WIDTHS = {"integer": 32, "natural": 32, "positive": 32}
+
+# VHDL operators -> SystemVerilog operators (see _get_tokens_sv)
+_D_OPERATORS_SV = {
+        "mod": "%", "rem": "%", "=": "==", "/=": "!=", "and": "&&",
+        "or": "||", "not": "!", "xor": "^",
+        }
+
+
+class _VhdlSourceReader(_SvSourceReader):
+
+    _re_token = _RE_TOKEN_VHDL
+    _get_re_keyword = staticmethod(_get_re_keyword_vhdl)
+
+
+class VhdlEntity(object):
+    """entity as parsed by iter_vhdl_entities
+
+    :generics: list of (name, data type (source text, TYPE_GENERIC for generic
+    types), default value (source text, "" if there is none)) tuples
+    :ports: list of (name, mode (one of MODES), subtype indication (source
+    text), default value (source text)) tuples
+    """
+
+    __slots__ = ("name", "generics", "ports")
+
+    def __init__(self, name, generics, ports):
+        self.name = name
+        self.generics = generics
+        self.ports = ports
+
+
+def _get_text(buf, l_tokens):
+    """:returns: the source text from the first to the last of l_tokens, with
+    all whitespace as single spaces
+    """
+    if not l_tokens:
+        return ""
+    return " ".join(buf[l_tokens[0][1]:l_tokens[-1][2]].split())
+
+
+def _read_interface_list(reader, pos):
+    """read the items of a generic or port list up to the closing parenthesis
+    (the opening one has been read already)
+
+    :returns: (list of items (each a list of tokens), position after the
+    closing parenthesis) or (None, None) at the end of the source
+    """
+    l_items = []
+    l_item = []
+    depth = 0
+    for token in reader.tokens(pos):
+        text = token[0]
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            if depth == 0:
+                if l_item:
+                    l_items.append(l_item)
+                return l_items, token[2]
+            depth -= 1
+        elif text == ";" and depth == 0:
+            l_items.append(l_item)
+            l_item = []
+            continue
+        l_item.append(token)
+    return None, None
+
+
+def _parse_interface_item(l_tokens, buf):
+    """:returns: (list of names, mode ("" if there is none), subtype
+    indication, default value), None if l_tokens is no interface declaration
+    """
+    idx = 0
+    if l_tokens and l_tokens[0][0].lower() in OBJECT_CLASSES:
+        idx = 1
+    if idx < len(l_tokens) and l_tokens[idx][0].lower() == TYPE_GENERIC:
+        if idx + 1 < len(l_tokens):
+            return [l_tokens[idx+1][0]], "", TYPE_GENERIC, ""
+        return None
+    l_names = []
+    for token in l_tokens[idx:]:
+        idx += 1
+        if token[0] == ":":
+            break
+        if token[0] != ",":
+            l_names.append(token[0])
+    else:
+        return None
+    mode = ""
+    if idx < len(l_tokens) and l_tokens[idx][0].lower() in MODES:
+        mode = l_tokens[idx][0].lower()
+        idx += 1
+    l_subtype = l_tokens[idx:]
+    l_default = []
+    for i, token in enumerate(l_subtype):
+        if token[0] == ":=":
+            l_default = l_subtype[i+1:]
+            l_subtype = l_subtype[:i]
+            break
+    if l_subtype and l_subtype[-1][0].lower() == "bus":
+        l_subtype = l_subtype[:-1]
+    if not l_names or not l_subtype:
+        return None
+    return l_names, mode, _get_text(buf, l_subtype), _get_text(buf, l_default)
+
+
+def _parse_entity(reader, pos):
+    """parse the entity declaration from pos, which is right after the
+    'entity' keyword
+
+    :returns: (VhdlEntity, position after the last token that has been read),
+    (None, position) if it's no entity declaration after all, or (None, None)
+    at the end of the source
+    """
+    token = reader.token(pos)
+    if not token:
+        return None, None
+    name = token[0]
+    token = reader.token(token[2])
+    if not token:
+        return None, None
+    if token[0].lower() != "is":
+        return None, token[1]
+
+    l_generics = []
+    l_ports = []
+    token = reader.token(token[2])
+    while token and token[0].lower() in ("generic", "port"):
+        kind = token[0].lower()
+        token = reader.token(token[2])
+        if not token or token[0] != "(":
+            break
+        l_items, pos = _read_interface_list(reader, token[2])
+        if l_items is None:
+            return None, None
+        for l_tokens in l_items:
+            item = _parse_interface_item(l_tokens, reader.buf)
+            if not item:
+                continue
+            l_names, mode, subtype, default = item
+            for item_name in l_names:
+                if kind == "generic":
+                    l_generics.append((item_name, subtype, default))
+                else:
+                    l_ports.append((item_name, mode or MODES[0], subtype, default))
+        token = reader.token(pos)
+        if token and token[0] == ";":
+            token = reader.token(token[2])
+    pos_end = token[1] if token else len(reader.buf)
+    return VhdlEntity(name, l_generics, l_ports), pos_end
+
+
+def iter_vhdl_entities(source, chunk_size=CHUNK_SIZE):
+    """generator over all entity declarations in source, as VhdlEntity objects
+
+    :source: str (the source code itself), file object, or iterable of lines
+    """
+    reader = _VhdlSourceReader(source, chunk_size)
+    pos = 0
+    while True:
+        try:
+            keyword = reader.find_keyword(pos, (KEYWORD_ENTITY,))
+            if not keyword:
+                return
+            # (if the entity doesn't fit into the buffer, it gets parsed again
+            # from here)
+            pos = keyword[1]
+            entity, pos_end = _parse_entity(reader, keyword[2])
+            if pos_end is None:
+                return
+            pos = pos_end
+            if entity:
+                yield entity
+        except _NeedMoreData as e:
+            if reader.eof:
+                return
+            if e.pos_keep is not None:
+                pos = e.pos_keep
+            pos = reader.grow(pos)
+
+
+@functools.lru_cache(maxsize=4096)
+def tokenize_vhdl(source):
+    """:source: str
+    :returns: tuple of the tokens (text only) in source, without whitespace
+    and comments
+    """
+    return tuple(x[0] for x in _VhdlSourceReader(source).tokens(0))
+
+
+def _get_tokens_sv(l_tokens, lower=True):
+    """translate the expression l_tokens (token texts) to SystemVerilog (see
+    hdl_sv_const_eval)
+
+    :lower: identifiers in lower case (VHDL isn't case sensitive)
+    :returns: list of the translated tokens
+    """
+    l_tokens_sv = []
+    for token in l_tokens:
+        token_lower = token.lower()
+        if token_lower in _D_OPERATORS_SV:
+            l_tokens_sv.append(_D_OPERATORS_SV[token_lower])
+        elif "#" in token:
+            # based literal (16#ff#, stays as it is if it's no integer)
+            s_base, s_digits = token.rstrip("#").split("#")[:2]
+            try:
+                l_tokens_sv.append(str(int(s_digits.replace("_", ""), int(s_base))))
+            except ValueError:
+                l_tokens_sv.append(token)
+        elif lower and token[0].isalpha():
+            l_tokens_sv.append(token_lower)
+        else:
+            l_tokens_sv.append(token)
+    return l_tokens_sv
+
+
+def _eval_tokens(l_tokens, fun_lookup):
+    """evaluate the expression l_tokens (token texts)
+
+    :fun_lookup: function (lower case) name -> value
+    :raises: SvConstEvalError if the expression can't be evaluated
+    """
+    return eval_sv_const_expr(" ".join(_get_tokens_sv(l_tokens)), fun_lookup)
+
+
+def eval_vhdl_const_expr(s_expr, fun_lookup=_lookup_nothing):
+    """:returns: value of the constant expression s_expr (int)
+    :fun_lookup: function (lower case) name -> value, for the identifiers in
+    the expression, raises SvConstEvalError for unknown ones (default: no
+    identifiers at all)
+    :raises: SvConstEvalError if s_expr can't be evaluated
+    """
+    if s_expr.isdigit():
+        return int(s_expr)
+    return _eval_tokens(tokenize_vhdl(s_expr), fun_lookup)
+
+
+def _split_range(t_tokens):
+    """:t_tokens: tokens of a subtype indication
+    :returns: (type mark (lower case, without library and package), tokens of
+    the left bound, "downto" or "to", tokens of the right bound), the range
+    being None if there is no (single) index constraint
+    """
+    idx_mark = 0
+    while idx_mark + 2 < len(t_tokens) and t_tokens[idx_mark+1] == ".":
+        idx_mark += 2
+    mark = t_tokens[idx_mark].lower()
+    t_constraint = t_tokens[idx_mark+1:]
+    if len(t_constraint) < 5 or t_constraint[0] != "(" or t_constraint[-1] != ")":
+        return mark, None, None, None
+    depth = 0
+    for idx, token in enumerate(t_constraint[1:-1], 1):
+        if token in ("(", "["):
+            depth += 1
+        elif token in (")", "]"):
+            depth -= 1
+        elif depth == 0 and token.lower() in ("downto", "to"):
+            return mark, t_constraint[1:idx], token.lower(), t_constraint[idx+1:-1]
+        elif depth == 0 and token == ",":
+            break
+    return mark, None, None, None
+
+
+def get_vhdl_width(subtype, fun_lookup=_lookup_nothing):
+    """:subtype: subtype indication (source text, e.g. "std_logic_vector(W-1
+    downto 0)")
+    :fun_lookup: see eval_vhdl_const_expr
+    :returns: width of subtype, -1 if it can't be evaluated (other types,
+    generics without value, ...)
+    """
+    t_tokens = tokenize_vhdl(subtype)
+    if not t_tokens:
+        return -1
+    mark, l_left, _, l_right = _split_range(t_tokens)
+    if mark in TYPES_1_BIT and len(t_tokens) == 1:
+        return 1
+    if mark in D_TYPE_WIDTHS:
+        return D_TYPE_WIDTHS[mark]
+    if mark not in TYPES_VECTOR or l_left is None:
+        return -1
+    try:
+        return abs(_eval_tokens(l_left, fun_lookup) - _eval_tokens(l_right, fun_lookup)) + 1
+    except SvConstEvalError:
+        return -1
+
+
+def get_vhdl_range_sv(subtype):
+    """:returns: the index constraint of a vector subtype as SystemVerilog
+    packed dimension ("std_logic_vector(W-1 downto 0)" -> "[W-1:0]"), None if
+    subtype is no vector type with a (single) index constraint
+    """
+    t_tokens = tokenize_vhdl(subtype)
+    if not t_tokens:
+        return None
+    mark, l_left, _, l_right = _split_range(t_tokens)
+    if mark not in TYPES_VECTOR or l_left is None:
+        return None
+    return f"[{''.join(_get_tokens_sv(l_left, False))}:{''.join(_get_tokens_sv(l_right, False))}]"
+
+
+def eval_vhdl_generics(l_generics, d_overrides=None):
+    """evaluate the generics of an entity, in the order of declaration (later
+    ones can depend on earlier ones)
+
+    :l_generics: list of generic tuples (see VhdlEntity)
+    :d_overrides: dict name -> value (int, or expression string) of a generic
+    map
+    :returns: dict lower case name -> value (int), None for the ones that
+    can't be evaluated (and for generic types)
+    """
+    d_overrides = {k.lower(): v for k, v in (d_overrides or {}).items()}
+    d_values = {}
+
+    def fun_lookup(name):
+        value = d_values.get(name)
+        if value is None:
+            raise SvConstEvalError(f"Unknown identifier: {name}")
+        return value
+
+    for name, data_type, default in l_generics:
+        name = name.lower()
+        d_values[name] = None
+        if data_type == TYPE_GENERIC:
+            continue
+        value = d_overrides.get(name, default)
+        if isinstance(value, int):
+            d_values[name] = value
+            continue
+        if not value:
+            continue
+        try:
+            d_values[name] = eval_vhdl_const_expr(value, fun_lookup)
+        except SvConstEvalError:
+            pass
+    return d_values
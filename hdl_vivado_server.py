@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+# long-lived vivado tcl session, and a local server to share it between
+# code manager invocations
+#
+# Every 'vivado -mode batch' pays the full tool startup (30-60 seconds).
+# Instead, VivadoTclSession keeps one 'vivado -mode tcl' process running and
+# feeds it commands through its stdin, reading the output up to an end marker
+# that is printed after every command. VivadoTclServer makes such a session
+# available to other processes (the code manager commands) via
+# multiprocessing.connection (unix socket, named pipe on windows), and
+# VivadoTclClient is the counterpart to connect to it.
+#
+# For testing without vivado, this file can be executed with --stand-in: it
+# then behaves like 'vivado -mode tcl' (plain tcl via python's tkinter, plus
+# stub versions of the vivado project commands that only print what they
+# would do).
+#
+# (no package-relative imports in here, such that the stand-in can be run as
+# a script)
+
+import os
+import re
+import sys
+import json
+import uuid
+import secrets
+import tempfile
+import subprocess
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+
+class VivadoSessionError(Exception):
+    pass
+
+
+def tcl_quote(s):
+    """:returns: s as one tcl word in double quotes, with every character that
+    tcl would substitute escaped (and line breaks as \\n, such that the word is
+    on one line)
+    """
+    return '"' + re.sub(r'([\\\[\]$"{};])', r'\\\1', s).replace("\n", "\\n") + '"'
+
+
+class VivadoTclSession(object):
+
+    # command that starts vivado in tcl mode
+    L_COMMAND_VIVADO = ["-mode", "tcl", "-nolog", "-nojournal", "-notrace"]
+    # command that starts the stand-in instead
+    L_COMMAND_STAND_IN = [sys.executable, os.path.abspath(__file__), "--stand-in"]
+    # prompt that vivado prints in tcl mode (not followed by a line break,
+    # thus it ends up at the beginning of output lines)
+    S_PROMPT = "Vivado% "
+
+    def __init__(self, xil_tool="vivado", cwd=None, stand_in=False):
+        """
+        :xil_tool: vivado executable
+        :cwd: working directory of the session (relative paths in commands
+        refer to that), default: the current one
+        :stand_in: run the pure-python stand-in instead of vivado
+        """
+        if stand_in:
+            self.l_command = list(self.L_COMMAND_STAND_IN)
+        else:
+            self.l_command = [xil_tool] + self.L_COMMAND_VIVADO
+        self.cwd = cwd
+        self.process = None
+        # (unique per session, such that no tool output can be mistaken for it)
+        self._s_marker = f"__MCM_DONE_{uuid.uuid4().hex}__"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        if self.running:
+            return
+        self.process = subprocess.Popen(
+                self.l_command, cwd=self.cwd,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, text=True, bufsize=1)
+
+    def close(self):
+        if not self.running:
+            self.process = None
+            return
+        try:
+            self.process.stdin.write("exit\n")
+            self.process.stdin.flush()
+            self.process.wait(timeout=60)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    def run(self, s_tcl):
+        """evaluate s_tcl (at global level) in the session, starting it if it
+        isn't running (anymore)
+
+        :returns: (return code of the command (0: TCL_OK, 1: TCL_ERROR, ...),
+        output of the command, followed by its result or error message)
+        :raises: VivadoSessionError if the session terminates while running
+        the command (e.g. because the command calls exit)
+        """
+        self.start()
+        marker = self._s_marker
+        # (the command is a single line, tcl_quote escapes the line breaks)
+        s_line = (
+            f"set __mcm_rc [catch {{uplevel #0 {tcl_quote(s_tcl)}}} __mcm_result]; "
+            f"if {{$__mcm_rc == 1}} {{puts \"ERROR: $__mcm_result\"}} "
+            f"elseif {{$__mcm_result ne {{}}}} {{puts $__mcm_result}}; "
+            f"puts \"\\n{marker} $__mcm_rc\"; flush stdout\n")
+        try:
+            self.process.stdin.write(s_line)
+            self.process.stdin.flush()
+        except OSError as e:
+            raise VivadoSessionError(f"Vivado session is not running anymore: {e}")
+
+        l_output = []
+        for line in self.process.stdout:
+            while line.startswith(self.S_PROMPT):
+                line = line[len(self.S_PROMPT):]
+            if line.startswith(marker):
+                # (the marker is preceded by an extra line break, in case the
+                # command's output doesn't end with one)
+                if l_output and l_output[-1] == "\n":
+                    l_output.pop()
+                return int(line.split()[1]), "".join(l_output)
+            l_output.append(line)
+
+        self.process.wait()
+        self.process = None
+        raise VivadoSessionError(
+                "Vivado session terminated while running a command. Output:\n"
+                + "".join(l_output))
+
+    def source(self, script, l_args=()):
+        """source a tcl script the way 'vivado -mode batch -source script
+        -tclargs l_args' would: with argv/argc set, and without a project that
+        is still open from an earlier command
+        """
+        s_tcl = (
+            f"catch {{close_project}}\n"
+            f"set ::argv [list {' '.join(tcl_quote(x) for x in l_args)}]\n"
+            f"set ::argc {len(l_args)}\n"
+            f"source -notrace {tcl_quote(script)}")
+        return self.run(s_tcl)
+
+
+class VivadoTclServer(object):
+    """serves one VivadoTclSession to VivadoTclClient connections (one at
+    a time, the session can only do one thing at a time anyways)
+
+    The address and the authentication key of the server are written to
+    info_file (readable only by the user), which is how clients find it.
+    """
+
+    def __init__(self, session, info_file):
+        self.session = session
+        self.info_file = info_file
+
+    @staticmethod
+    def _get_address():
+        if sys.platform == "win32":
+            return rf"\\.\pipe\mcm_vivado_{os.getpid()}"
+        return os.path.join(tempfile.gettempdir(), f"mcm_vivado_{os.getpid()}.sock")
+
+    def _write_info_file(self, address, authkey):
+        fd = os.open(self.info_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f_out:
+            json.dump({"address": address, "authkey": authkey.hex(),
+                       "pid": os.getpid()}, f_out, indent=4)
+
+    def serve_forever(self):
+        """run the server until a client sends "stop" (or the process gets
+        interrupted). The session is started right away, not with the first
+        command.
+        """
+        address = self._get_address()
+        authkey = secrets.token_bytes(32)
+        self.session.start()
+        try:
+            with Listener(address, authkey=authkey) as listener:
+                self._write_info_file(address, authkey)
+                stop = False
+                while not stop:
+                    try:
+                        conn = listener.accept()
+                    except (OSError, AuthenticationError):
+                        # (e.g. a client with the wrong key)
+                        continue
+                    with conn:
+                        stop = self._serve_connection(conn)
+        finally:
+            try:
+                os.remove(self.info_file)
+            except FileNotFoundError:
+                pass
+            self.session.close()
+
+    def _serve_connection(self, conn):
+        """:returns: True if the client asked the server to stop"""
+        while True:
+            try:
+                d_request = conn.recv()
+            except (EOFError, OSError):
+                return False
+            op = d_request.get("op")
+            if op == "stop":
+                conn.send((0, ""))
+                return True
+            try:
+                if op == "run":
+                    result = self.session.run(d_request["tcl"])
+                elif op == "source":
+                    result = self.session.source(
+                            d_request["script"], d_request.get("args", ()))
+                else:
+                    result = (1, f"ERROR: unknown request '{op}'")
+            except VivadoSessionError as e:
+                # (the session gets restarted with the next request)
+                result = (1, f"ERROR: {e}")
+            conn.send(result)
+
+
+class VivadoTclClient(object):
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @classmethod
+    def connect(cls, info_file):
+        """:returns: client connected to the server announced in info_file, None
+        if there is no server (running)
+        """
+        try:
+            with open(info_file, 'r') as f_in:
+                d_info = json.load(f_in)
+            conn = Client(d_info["address"], authkey=bytes.fromhex(d_info["authkey"]))
+        except (OSError, ValueError, KeyError, AuthenticationError):
+            return None
+        return cls(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _request(self, **d_request):
+        self.conn.send(d_request)
+        return self.conn.recv()
+
+    def run(self, s_tcl):
+        """see VivadoTclSession.run"""
+        return self._request(op="run", tcl=s_tcl)
+
+    def source(self, script, l_args=()):
+        """see VivadoTclSession.source. script is relative to the working
+        directory of the server, so better pass an absolute path.
+        """
+        return self._request(op="source", script=script, args=list(l_args))
+
+    def stop(self):
+        """stop the server (and its vivado session)"""
+        return self._request(op="stop")
+
+
+# stub versions of the vivado commands that the code manager scripts use on
+# a project, for the stand-in
+L_STAND_IN_COMMANDS = [
+        "create_project", "open_project", "close_project", "current_project",
+        "set_property", "get_property", "add_files", "read_verilog",
+        "import_ip", "create_ip", "generate_target", "launch_runs",
+        "wait_on_run", "get_runs", "get_files", "get_ips", "upgrade_ip",
+        ]
+
+
+def _stand_in_main():
+    """'vivado -mode tcl' stand-in: read tcl from stdin, evaluate it in a plain
+    tcl interpreter (with stubs for L_STAND_IN_COMMANDS), print the output
+    """
+    import tkinter
+
+    interp = tkinter.Tcl()
+    for command in L_STAND_IN_COMMANDS:
+        interp.eval(
+            f"proc {command} {{args}} {{puts \"INFO: \\[stand-in\\] {command} $args\"}}")
+    interp.eval("proc version {args} {return \"Vivado v0000.0 (stand-in)\"}")
+    # (vivado's source knows -notrace, plain tcl's doesn't)
+    interp.eval("rename source __tcl_source")
+    interp.eval("proc source {args} {uplevel 1 __tcl_source [lsearch -all -inline -not $args -notrace]}")
+    # (exit terminates the process right away, like it does in vivado)
+    interp.createcommand("exit", lambda *args: os._exit(int(args[0]) if args else 0))
+
+    s_command = ""
+    for line in sys.stdin:
+        s_command += line
+        if not interp.eval(f"info complete {tcl_quote(s_command)}") == "1":
+            continue
+        try:
+            s_result = interp.eval(s_command)
+            if s_result:
+                print(s_result, flush=True)
+        except tkinter.TclError as e:
+            print(f"ERROR: {e}", flush=True)
+        s_command = ""
+
+
+if __name__ == "__main__":
+    if "--stand-in" in sys.argv[1:]:
+        _stand_in_main()
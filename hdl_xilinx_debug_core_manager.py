@@ -2,10 +2,17 @@
 
 import re
 import os
+import mmap
 import json
+import hashlib
 import itertools
+import concurrent.futures
 
 import m_code_manager.util.files as files
+from .hdl_file_util import write_lines_if_changed, file_lock
+from .hdl_sv_const_eval import eval_sv_const_expr, SvConstEvalError
+from .hdl_sv_preprocessor import SvPreprocessorContext, has_sv_directives
+from .hdl_vhdl_entity_parser import get_vhdl_width
 
 # TODO: For VIOs, add something to the comment format so that signals can have 
 # a false path specified. In that case, the VIO would register that and would 
@@ -19,6 +26,29 @@ import m_code_manager.util.files as files
 # see how well that statement ages.
 
 
+def _get_signal_width_vhdl(subtype):
+    """:returns: (width, scalar) of a debug signal of the VHDL subtype (e.g. 
+    "std_logic_vector(7 downto 0)"), scalar being True for std_logic signals 
+    (which are connected to element 0 of the debug core port). The width is 
+    None if it can't be evaluated (e.g. because it depends on generics).
+    """
+    width = get_vhdl_width(subtype)
+    if width == -1:
+        return None, False
+    return width, "_vector" not in subtype.lower()
+
+
+def _get_signal_width(s_upper, s_lower):
+    """:returns: width of a debug signal with the dimension [s_upper:s_lower] 
+    (constant expressions, e.g. what the macros in there expand to), None if 
+    it can't be evaluated (e.g. because it depends on parameters)
+    """
+    try:
+        return eval_sv_const_expr(s_upper.strip()) - eval_sv_const_expr(s_lower.strip()) + 1
+    except SvConstEvalError:
+        return None
+
+
 class IlaSignal(object):
     """All the necessary fields for describing a signal that needs to be added 
     to an ILA
@@ -27,16 +57,27 @@ class IlaSignal(object):
     # TODO: actually adapt the re such that ila_name (or the signal name?) 
     # cannot have any '_'
     pattern_sig_sv = re.compile(
-r'[\s]*(logic|reg|wire)[\s]+(\[([\d]+):([\d]+)\][\s]+){0,1}ila_ctrl_([a-zA-Z0-9]+)_([\w]+)[\s]*;([\s]*//[\s]*(trigger_type=([\w]+)[\s]*){0,1}[\s]*(comparators=([\d]+)){0,1}[\s]*){0,1}'
+r'[\s]*(logic|reg|wire)[\s]+(\[([^\[\]:]+):([^\[\]:]+)\][\s]+){0,1}ila_ctrl_([a-zA-Z0-9]+)_([\w]+)[\s]*;([\s]*//[\s]*(trigger_type=([\w]+)[\s]*){0,1}[\s]*(comparators=([\d]+)){0,1}[\s]*){0,1}'
     )
     pattern_sig_clk_sv = re.compile(
 r'[\s]*(logic|reg|wire)[\s]+ila_ctrl_([a-zA-Z0-9]+)_clk[\s]*;[\s]*'
     )
+    # (keywords and types in any case, as VHDL has it, but the ila_ctrl_ 
+    # prefix in lower case like in systemverilog)
+    pattern_sig_vhdl = re.compile(
+r'[\s]*(?i:signal)[\s]+ila_ctrl_([a-zA-Z0-9]+)_([\w]+)[\s]*:[\s]*((?i:std_u?logic)(?i:_vector[\s]*\([^;:]*\))?)[\s]*(:=[^;]*)?;([\s]*--[\s]*(trigger_type=([\w]+)[\s]*){0,1}[\s]*(comparators=([\d]+)){0,1}[\s]*){0,1}'
+    )
+
+    __slots__ = ("name", "ila_name", "width", "index", "num_comparators",
+                 "trigger_type", "scalar")
 
     def __init__(self, name="", width=1, ila_name="",
-                 trigger_type="both", num_comparators=1, index=None):
+                 trigger_type="both", num_comparators=1, index=None,
+                 scalar=False):
         """
         trigger_type - can be 'data', 'trigger' or 'both'
+        scalar - the signal is a VHDL std_logic (not a vector), which is 
+        connected to element 0 of the probe port
         """
         self.name = name
         self.ila_name = ila_name
@@ -44,6 +85,7 @@ r'[\s]*(logic|reg|wire)[\s]+ila_ctrl_([a-zA-Z0-9]+)_clk[\s]*;[\s]*'
         self.index = index
         self.num_comparators = num_comparators
         self.trigger_type = trigger_type
+        self.scalar = scalar
 
     @property
     def trigger_type_xilinx_id(self):
@@ -74,16 +116,21 @@ r'[\s]*(logic|reg|wire)[\s]+ila_ctrl_([a-zA-Z0-9]+)_clk[\s]*;[\s]*'
           to observe). ila_name can not contain any '_'!!! ila_name can not be empty.
         - no width is automatically interpreted as width = 1.
             - otherwise, width = width_upper - width_lower + 1
-            the restriction here is, as is quite visible: No 
-            placeholders/parameters/variables in the signal definition. The 
-            widths need to be given explicitly (otherwise the line will be 
-            ignored).
+            the restriction here is: No parameters/variables in the signal 
+            definition. The widths need to be constant expressions (otherwise 
+            the line will be ignored). Macros are fine, as long as the line 
+            has been preprocessed (see XilinxDebugCoreManager.scan_module).
         - there can be an arbitrary amount of whitespaces in any spot that has 
           a whitespace in the format given (as long as it doesn't affect the 
           syntactical meaning of course)
         - trigger_type is the CONFIG.TYPE property of the ILA port. It specifies 
           if a signal is data, trigger, or both.
 
+        In VHDL files, the format is (std_logic is interpreted as width = 1, 
+        an initial value is allowed):
+        signal ila_ctrl_<ila_name>_<name> : std_logic_vector(<left> downto 
+        <right>); -- trigger_type=<trigger_type> comparators=<num_comparators>
+
         The ila clock needs to have the name ila_<ila_name>_clk and be present 
         in the module. With that there is no need to match for the clock here, 
         it will always be named the same when generating the vio (so you don't 
@@ -103,9 +150,9 @@ r'[\s]*(logic|reg|wire)[\s]+ila_ctrl_([a-zA-Z0-9]+)_clk[\s]*;[\s]*'
                 # TODO: adapt the group indices in debugging
                 # the match group indices are determined by just trying out
                 if mo.group(3):
-                    width_upper = int(mo.group(3))
-                    width_lower = int(mo.group(4))
-                    width = width_upper - width_lower + 1
+                    width = _get_signal_width(mo.group(3), mo.group(4))
+                    if width is None:
+                        return None
                 else:
                     width = 1
                 ila_name = mo.group(5)
@@ -123,15 +170,34 @@ r'[\s]*(logic|reg|wire)[\s]+ila_ctrl_([a-zA-Z0-9]+)_clk[\s]*;[\s]*'
             else:
                 return None
 
+        elif hdl_lang == "vhdl":
+
+            mo = cls.pattern_sig_vhdl.match(s_input)
+            # (the ila clock is no signal, see above)
+            if not mo or mo.group(2) == "clk":
+                return None
+            width, scalar = _get_signal_width_vhdl(mo.group(3))
+            if width is None:
+                return None
+            if mo.group(9):
+                num_comparators = mo.group(9)
+            else:
+                num_comparators = 1
+            return IlaSignal(mo.group(2), width, mo.group(1), mo.group(7),
+                             num_comparators, scalar=scalar)
+
         else:
             raise Exception(f"Language {hdl_lang} not supported (yet)")
 
-    def print_instantiation(self, probe_index=0):
+    def print_instantiation(self, probe_index=0, hdl_lang="systemverilog"):
         """prints the line to be used within a verilog/systemverilog ila ctrl 
-        module instantiation
+        module instantiation (or the association in a VHDL port map)
         """
         # TODO: add a note to the instantiation that this is generated code
 
+        if hdl_lang == "vhdl":
+            s_probe = f"probe{self.index}(0)" if self.scalar else f"probe{self.index}"
+            return f"            {s_probe:<24}=> ila_ctrl_{self.ila_name}_{self.name},"
         return f"    .probe{self.index}             (ila_ctrl_{self.ila_name}_{self.name}),"
 
 
@@ -145,10 +211,10 @@ class VioSignal(object):
     vio_ctrl_<"in"/"out">_<name>; // radix=<radix> init=<val>
     - no width is automatically interpreted as width = 1.
         - otherwise, width = width_upper - width_lower + 1
-        the restriction here is, as is quite visible: No 
-        placeholders/parameters/variables in the signal definition. The 
-        widths need to be given explicitly (otherwise the line will be 
-        ignored).
+        the restriction here is: No parameters/variables in the signal 
+        definition. The widths need to be constant expressions (otherwise 
+        the line will be ignored). Macros are fine, as long as the line 
+        has been preprocessed (see XilinxDebugCoreManager.scan_module).
     - there can be an arbitrary amount of whitespaces in any spot that has 
       a whitespace in the format given (as long as it doesn't affect the 
       syntactical meaning of course)
@@ -160,6 +226,11 @@ class VioSignal(object):
     - <val> is the initialization value for the signal that the vio core 
       will set at device initialization. Setting init is optional
 
+    In VHDL files, the format is (std_logic is interpreted as width = 1, an 
+    initial value is allowed):
+    signal vio_ctrl_<"in"/"out">_<name> : std_logic_vector(<left> downto 
+    <right>); -- radix=<radix> init=<val>
+
     The vio clock needs to have the name vio_ctrl_clk and be present in the 
     module. With that there is no need to match for the clock here, it will 
     always be named the same when generating the vio (so you don't gain 
@@ -170,15 +241,35 @@ class VioSignal(object):
     # the pattern of death... it does what is described above for the arbitrary 
     # signal names (not the clock)
     pattern_sig_sv = re.compile(
-r'[\s]*(logic|reg|wire)[\s]+(\[([\d]+):([\d]+)\][\s]+){0,1}vio_ctrl_(in|out)_([\w]+)[\s]*;([\s]*//[\s]*(radix=([\w]+)[\s]*){0,1}[\s]*(init=([\w]+)){0,1}[\s]*){0,1}'
+r'[\s]*(logic|reg|wire)[\s]+(\[([^\[\]:]+):([^\[\]:]+)\][\s]+){0,1}vio_ctrl_(in|out)_([\w]+)[\s]*;([\s]*//[\s]*(radix=([\w]+)[\s]*){0,1}[\s]*(init=([\w]+)){0,1}[\s]*){0,1}'
+    )
+    # (see IlaSignal.pattern_sig_vhdl)
+    pattern_sig_vhdl = re.compile(
+r'[\s]*(?i:signal)[\s]+vio_ctrl_(in|out)_([\w]+)[\s]*:[\s]*((?i:std_u?logic)(?i:_vector[\s]*\([^;:]*\))?)[\s]*(:=[^;]*)?;([\s]*--[\s]*(radix=([\w]+)[\s]*){0,1}[\s]*(init=([\w]+)){0,1}[\s]*){0,1}'
     )
 
+    __slots__ = ("name", "init", "index", "width", "radix", "direction",
+                 "scalar")
+
     def __init__(self, name="", direction="input",
-                 width=1, radix="binary", init=0, index=None):
+                 width=1, radix="binary", init=0, index=None, scalar=False):
         """
         radix - can be 'binary', 'hex' or 'decimal' (TODO: distinguish 
         signed/unsigned decimal, and maybe others if there are other radices 
         available for VIO ports)
+        scalar - see IlaSignal
+        """
+        self.name = name
+        self.init = init
+        self.index = index
+        self.width = width
+        self.radix = radix
+        self.direction = direction
+        self.scalar = scalar
+
+    def to_json_dict(self):
+        """the signal as it goes into the vio ctrl signals json file (see 
+        XilinxVioCore.write_json_sig_list)
         """
         # !!! THE ORDER OF THE FIELDS IS IMPORTANT HERE !!!
         # why you ask? Let's say there is an 'unexpected behavior' somewhere in 
@@ -194,17 +285,17 @@ r'[\s]*(logic|reg|wire)[\s]+(\[([\d]+):([\d]+)\][\s]+){0,1}vio_ctrl_(in|out)_([\
         # do on that field. (I have seen it with one integer as the last entry, 
         # one as a middle entry, the middle entry got parsed correctly...). The 
         # solution is: make sure that there is no integer entry in the last 
-        # position. At least by the time of testing, the fields get written in 
-        # the same order as the properties are registered with the VioSignal 
-        # object. And that is the order in which they are given here, so by 
+        # position. The fields get written in the order of this dict, so by 
         # putting something like 'direction' at the end, which is guaranteed to 
         # be a string, you more or less circumvent the problem.
-        self.name = name
-        self.init = init
-        self.index = index
-        self.width = width
-        self.radix = radix
-        self.direction = direction
+        return {
+                "name": self.name,
+                "init": self.init,
+                "index": self.index,
+                "width": self.width,
+                "radix": self.radix,
+                "direction": self.direction,
+                }
 
     @classmethod
     def from_str(cls, s_input, hdl_lang="systemverilog"):
@@ -219,9 +310,9 @@ r'[\s]*(logic|reg|wire)[\s]+(\[([\d]+):([\d]+)\][\s]+){0,1}vio_ctrl_(in|out)_([\
             if mo:
                 # the match group indices are determined by just trying out
                 if mo.group(3):
-                    width_upper = int(mo.group(3))
-                    width_lower = int(mo.group(4))
-                    width = width_upper - width_lower + 1
+                    width = _get_signal_width(mo.group(3), mo.group(4))
+                    if width is None:
+                        return None
                 else:
                     width = 1
                 direction = mo.group(5)
@@ -240,15 +331,36 @@ r'[\s]*(logic|reg|wire)[\s]+(\[([\d]+):([\d]+)\][\s]+){0,1}vio_ctrl_(in|out)_([\
             else:
                 return None
 
+        elif hdl_lang == "vhdl":
+
+            mo = cls.pattern_sig_vhdl.match(s_input)
+            if not mo:
+                return None
+            width, scalar = _get_signal_width_vhdl(mo.group(3))
+            if width is None:
+                return None
+            if mo.group(7):
+                radix = mo.group(7).upper()
+            else:
+                radix = ""
+            return cls(mo.group(2), mo.group(1), width, radix, mo.group(9),
+                       scalar=scalar)
+
         else:
             raise Exception(f"Language {hdl_lang} not supported (yet)")
 
-    def print_instantiation(self, probe_index=0):
+    def print_instantiation(self, probe_index=0, hdl_lang="systemverilog"):
         """prints the line to be used within a verilog/systemverilog vio ctrl 
-        module instantiation (".probe...<probe_index>     (<signal>))
+        module instantiation (".probe...<probe_index>     (<signal>)), or the 
+        association in a VHDL port map ("probe...<probe_index> => <signal>")
 
         probe_index: probe index for the given group ('in' or 'out').
         """
+        if hdl_lang == "vhdl":
+            s_probe = f"probe_{self.direction}{probe_index}"
+            if self.scalar:
+                s_probe = s_probe + "(0)"
+            return f"            {s_probe:<24}=> vio_ctrl_{self.direction}_{self.name},"
         # purely inserting a space for cosmetics, to make sure that in the
         # instantiation the ports are aligned no matter if the direction
         # string would have 2 or 3 letters...
@@ -267,21 +379,90 @@ class XilinxDebugCore(object):
     def __init__(self):
         super.__init__()
 
+    @property
+    def config_hash(self):
+        """deterministic fingerprint of the ip and its CONFIG properties (see 
+        config_properties). It changes if and only if the ip needs to be 
+        regenerated.
+        """
+        d_fingerprint = {
+                "ip": self.IP_TYPE,
+                "config": self.config_properties(),
+                }
+        return hashlib.sha256(
+                json.dumps(d_fingerprint, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def _generate_ip_config_lines(l_config_properties):
+        return [f"        {key:<40}{{{value}}} \\" for key, value in l_config_properties]
+
+    def _generate_ip_instantiation_vhdl(self, s_clk, l_probes, l_associations):
+        """VHDL instantiation of the core: a block statement (labeled like the 
+        instance in systemverilog) that declares the ip as a component, and 
+        instantiates it. (A component needs a declaration before it can be 
+        instantiated, with the block both are in one place, and all of it can go 
+        right in front of the end of the architecture.)
+
+        :s_clk: signal connected to the clock
+        :l_probes: list of (port name, mode, width) of the probe ports
+        :l_associations: lines with the port map associations of the probe 
+        ports (see print_instantiation)
+        :returns: list of strings
+        """
+        l_lines = [
+f"inst_{self.ip_name} : block",
+f"    component {self.ip_name}",
+"        port (",
+"            clk                     : in std_logic;"]
+        for name, mode, width in l_probes:
+            l_lines.append(
+f"            {name:<24}: {mode} std_logic_vector({width-1} downto 0);")
+        # remove the ';' from the last port
+        s_last_line = l_lines.pop()
+        l_lines.append(s_last_line[:-1])
+        l_lines.extend([
+"        );",
+"    end component;",
+"begin",
+f"    inst : {self.ip_name}",
+"        port map (",
+f"            {'clk':<24}=> {s_clk},"])
+        l_lines.extend(l_associations)
+        # remove the ',' from the last association
+        s_last_line = l_lines.pop()
+        l_lines.append(s_last_line[:-1])
+        l_lines.extend([
+"        );",
+"end block;"])
+        return l_lines
+
 
 class XilinxIlaCore(XilinxDebugCore):
 
+    IP_TYPE = "xilinx.com:ip:ila"
+
     def __init__(self, signals, module_name, name):
         self.signals = signals
         self.module_name = module_name
         self.name = name
 
+    @property
+    def ip_name(self):
+        return f"xip_ila_ctrl_{self.module_name}_{self.name}"
+
     def generate_ip_instantiation(self, hdl_lang):
         """
         always generates lines of code for the instantiation of ONE core.
         Returns: A list of strings, representing the lines of verilog code for the 
-        ila core instantiation
+        ila core instantiation (VHDL code if hdl_lang is "vhdl")
         """
 
+        if hdl_lang == "vhdl":
+            return self._generate_ip_instantiation_vhdl(
+                    f"ila_ctrl_{self.name}_clk",
+                    [(f"probe{x.index}", "in", x.width) for x in self.signals],
+                    [x.print_instantiation(x.index, hdl_lang) for x in self.signals])
+
         l_lines = [
 f"xip_ila_ctrl_{self.module_name}_{self.name} inst_xip_ila_ctrl"
 f"_{self.module_name}_{self.name} (",
@@ -301,47 +482,42 @@ f"    .clk                    (ila_ctrl_{self.name}_clk),"]
         return l_lines
 
     @classmethod
-    def from_module(cls, s_module_file_name):
-        """analyse an hdl module for vio-connected signal definitions
+    def from_module(cls, s_module_file_name, lines=None, preprocessor_context=None):
+        """analyse an hdl module for ila-connected signal definitions
+
+        :lines: see XilinxDebugCoreManager.scan_module
+        :preprocessor_context: see XilinxDebugCoreManager.scan_module
         """
-        module_name, hdl_lang = XilinxDebugCoreManager.parse_module_file_name(s_module_file_name)
+        return XilinxDebugCoreManager.scan_module(
+                s_module_file_name, lines, keep_lines=False,
+                preprocessor_context=preprocessor_context).ila_cores or None
 
-        with open(s_module_file_name, 'r') as f_in:
-            l_lines = f_in.readlines()
+    @classmethod
+    def from_signals(cls, l_signals, module_name):
+        """group a list of IlaSignal objects (in order of appearance in the 
+        module) into ila cores by their ila_name, and assign the probe indices
 
+        :returns: list of XilinxIlaCore objects (empty if l_signals is empty)
+        """
         # it is possible to have multiple ILAs defined in one module. Therefore,
         # we have to make a list of cores here
         l_ila_cores = []
-        l_detected_ila_names = []
-        # counter to hold the indices with which the signals will be 
-        # connected to the ila ports.
-        count_ports = []
-        for line in l_lines:
-            ila_ctrl_sig = IlaSignal.from_str(line, hdl_lang)
-            if ila_ctrl_sig:
-
-                try:
-                    # TODO: figure out which Exception to listen to
-                    core_index = l_detected_ila_names.index(ila_ctrl_sig.ila_name)
-                except Exception:
-                    core_index = -1
-
-                if core_index >= 0:
-                    core = l_ila_cores[core_index]
-                    count_ports[core_index] = count_ports[core_index] + 1
-                    ila_ctrl_sig.index = count_ports[core_index]
-                    core.signals.append(ila_ctrl_sig)
-                else:
-                    core = cls([ila_ctrl_sig], module_name, ila_ctrl_sig.ila_name)
-                    l_ila_cores.append(core)
-                    count_ports.append(0)
-                    l_detected_ila_names.append(ila_ctrl_sig.ila_name)
-                    ila_ctrl_sig.index = 0
-
-        if l_ila_cores:
-            return l_ila_cores
-        else:
-            return None
+        # the ila names map to the respective core, the position in the core's 
+        # signal list is also the index with which a signal will be connected 
+        # to the ila ports
+        d_detected_ila_cores = {}
+        for ila_ctrl_sig in l_signals:
+            try:
+                core = d_detected_ila_cores[ila_ctrl_sig.ila_name]
+                ila_ctrl_sig.index = len(core.signals)
+                core.signals.append(ila_ctrl_sig)
+            except KeyError:
+                ila_ctrl_sig.index = 0
+                core = cls([ila_ctrl_sig], module_name, ila_ctrl_sig.ila_name)
+                d_detected_ila_cores[ila_ctrl_sig.ila_name] = core
+                l_ila_cores.append(core)
+
+        return l_ila_cores
 
     def generate_ip_declaration(self):
         """generate the tcl code lines for declaring the ILA IP in the format 
@@ -352,39 +528,56 @@ f"    .clk                    (ila_ctrl_{self.name}_clk),"]
         l_lines = []
         l_lines.extend([
     "lappend xips [dict create                                   \\",
-    f"    name                    xip_ila_ctrl_{self.module_name}_{self.name} \\",
+    f"    name                    {self.ip_name} \\",
     "    ip_name                 ila                           \\",
     "    ip_vendor               xilinx.com                    \\",
     "    ip_library              ip                            \\",
     "    config [dict create                                     \\"
         ])
 
-        for signal in self.signals:
-            # TODO: add num comparators here, as soon as you know how exactly 
-            # that config field is named
-            l_lines.extend([
-    f"        CONFIG.C_PROBE{signal.index}_WIDTH {{{signal.width}}} \\",
-    f"        CONFIG.C_PROBE{signal.index}_TYPE {{{signal.trigger_type_xilinx_id}}} \\",
-            ])
+        l_lines.extend(self._generate_ip_config_lines(self.config_properties()))
 
-        # write other config
-        # TODO: parameterizable solution for the DATA DEPTH (now hardcoded)
         l_lines.extend([
-    f"        CONFIG.C_NUM_OF_PROBES                  {{{len(self.signals)}}} \\",
-    "        CONFIG.C_DATA_DEPTH                     {{16384}}                  \\",
     "        ]                                                                   \\",
     "    ]"
         ])
 
         return l_lines
 
+    def config_properties(self):
+        """:returns: list of (property, value) tuples with the CONFIG properties 
+        of the ip (values as tcl strings, without the enclosing braces)
+        """
+        l_properties = []
+        for signal in self.signals:
+            # TODO: add num comparators here, as soon as you know how exactly 
+            # that config field is named
+            l_properties.extend([
+                (f"CONFIG.C_PROBE{signal.index}_WIDTH", f"{signal.width}"),
+                (f"CONFIG.C_PROBE{signal.index}_TYPE", f"{signal.trigger_type_xilinx_id}"),
+                ])
+
+        # other config
+        # TODO: parameterizable solution for the DATA DEPTH (now hardcoded)
+        l_properties.extend([
+            ("CONFIG.C_NUM_OF_PROBES", f"{len(self.signals)}"),
+            ("CONFIG.C_DATA_DEPTH", "{16384}"),
+            ])
+        return l_properties
+
 
 class XilinxVioCore(XilinxDebugCore):
 
+    IP_TYPE = "xilinx.com:ip:vio"
+
     def __init__(self, signals, module_name):
         self.signals = signals
         self.module_name = module_name
 
+    @property
+    def ip_name(self):
+        return f"xip_vio_ctrl_{self.module_name}"
+
     def write_json_sig_list(self, file):
         """write a list of vio control signals into a json file, such that it can 
         later easily be picked up vio_ctrl.tcl
@@ -395,29 +588,23 @@ class XilinxVioCore(XilinxDebugCore):
         :file: the full (project-relative) path of the file to be 
         extended/written
         """
+        self.write_json_sig_lists({self.module_name: self}, file)
 
-        files.create_file_path(file)
-
-        # transform the list of VioSignal objects into a list of dictionaries
-        l_vio_ctrl_signals_dicts = [x.__dict__ for x in self.signals]
-
-        # load the existing definitions, update the one for this module and 
-        # write back the definitions
-        vio_ctrl_signals = {}
-        if os.path.isfile(file):
-            with open(file, 'r') as f_in:
-                vio_ctrl_signals = json.load(f_in)
-
-        vio_ctrl_signals[self.module_name] = l_vio_ctrl_signals_dicts
+    @staticmethod
+    def write_json_sig_lists(d_vio_cores, file):
+        """same as write_json_sig_list, but for any number of modules with one 
+        read and one write of the json file (see VioSignalStore)
 
-        with open(file, 'w') as f_out:
-            json.dump(vio_ctrl_signals, f_out, indent=4)
+        :d_vio_cores: dict with module names as keys and XilinxVioCore objects 
+        as values. A value of None removes the module from the signal list.
+        """
+        VioSignalStore(file).update(d_vio_cores)
 
     def generate_ip_instantiation(self, hdl_lang):
         """
         always generates lines of code for the instantiation of ONE core.
         Returns: A list of strings, representing the lines of verilog code for the 
-        vio control core instantiation
+        vio control core instantiation (VHDL code if hdl_lang is "vhdl")
         """
 
         # I know, list plus filter is not necessarily what you should, but these 
@@ -444,31 +631,43 @@ class XilinxVioCore(XilinxDebugCore):
             l_lines.append(");")
 
             return l_lines
+        elif hdl_lang == "vhdl":
+            l_signals = l_signals_in + l_signals_out
+            return self._generate_ip_instantiation_vhdl(
+                    "vio_ctrl_clk",
+                    [(f"probe_{x.direction}{x.index}", x.direction, x.width)
+                     for x in l_signals],
+                    [x.print_instantiation(x.index, hdl_lang) for x in l_signals])
         else:
             raise Exception(f"Invalid language: {hdl_lang}")
 
     @classmethod
-    def from_module(cls, s_module_file_name):
+    def from_module(cls, s_module_file_name, lines=None, preprocessor_context=None):
         """analyse an hdl module for vio-connected signal definitions
+
+        :lines: see XilinxDebugCoreManager.scan_module
+        :preprocessor_context: see XilinxDebugCoreManager.scan_module
         """
-        module_name, hdl_lang = XilinxDebugCoreManager.parse_module_file_name(s_module_file_name)
+        return XilinxDebugCoreManager.scan_module(
+                s_module_file_name, lines, keep_lines=False,
+                preprocessor_context=preprocessor_context).vio_core
 
-        with open(s_module_file_name, 'r') as f_in:
-            l_lines = f_in.readlines()
+    @classmethod
+    def from_signals(cls, l_signals, module_name):
+        """build the vio core from a list of VioSignal objects (in order of 
+        appearance in the module), and assign the probe indices
 
-        l_signals = []
+        :returns: XilinxVioCore, or None if l_signals is empty
+        """
         # counters to hold the indices with which the signals will be connected to 
         # the vio ports -> that's also what the vio_ctrl.tcl will eventually 
         # utilize in order to map vio ports to user signal names and vio-internal 
         # port names.
         counts_vio_ports = {'in': 0, 'out': 0}
-        for line in l_lines:
-            signal = VioSignal.from_str(line, hdl_lang=hdl_lang)
-            if signal:
-                signal.index = counts_vio_ports[signal.direction]
-                # for the 10000th time, where on earth is the += in python?
-                counts_vio_ports[signal.direction] = counts_vio_ports[signal.direction] + 1
-                l_signals.append(signal)
+        for signal in l_signals:
+            signal.index = counts_vio_ports[signal.direction]
+            # for the 10000th time, where on earth is the += in python?
+            counts_vio_ports[signal.direction] = counts_vio_ports[signal.direction] + 1
 
         if l_signals:
             return cls(l_signals, module_name)
@@ -485,33 +684,344 @@ class XilinxVioCore(XilinxDebugCore):
         l_lines.extend([
     "# xilinx ip for top level hardware control vio",
     "lappend xips [dict create                                   \\",
-    f"    name                    xip_vio_ctrl_{self.module_name} \\",
+    f"    name                    {self.ip_name} \\",
     "    ip_name                 vio                           \\",
     "    ip_vendor               xilinx.com                    \\",
     "    ip_library              ip                            \\",
     "    config [dict create                                     \\"
         ])
+        l_lines.extend(self._generate_ip_config_lines(self.config_properties()))
+
+        l_lines.extend([
+    "        ]                                                                   \\",
+    "    ]"
+        ])
+
+        return l_lines
+
+    def config_properties(self):
+        """:returns: list of (property, value) tuples with the CONFIG properties 
+        of the ip (values as tcl strings, without the enclosing braces)
+        """
+        l_properties = []
         # needed to pass the total number of probes to the vio ip config
         count_num_probe = {"in": 0, "out": 0}
 
         for signal in self.signals:
             count_num_probe[signal.direction] = count_num_probe[signal.direction] + 1
-            l_lines.append(
-    f"        CONFIG.C_PROBE_{signal.direction.upper()}{signal.index}_WIDTH {{{signal.width}}} \\")
+            l_properties.append(
+                (f"CONFIG.C_PROBE_{signal.direction.upper()}{signal.index}_WIDTH",
+                 f"{signal.width}"))
             if signal.init:
-                l_lines.append(
-    f"        CONFIG.C_PROBE_{signal.direction.upper()}{signal.index}_INIT_VAL {{0x{signal.init}}} \\")
+                l_properties.append(
+                    (f"CONFIG.C_PROBE_{signal.direction.upper()}{signal.index}_INIT_VAL",
+                     f"0x{signal.init}"))
+
+        # number of probes
+        l_properties.extend([
+            ("CONFIG.C_NUM_PROBE_IN", f"{count_num_probe['in']}"),
+            ("CONFIG.C_NUM_PROBE_OUT", f"{count_num_probe['out']}"),
+            ("CONFIG.C_EN_PROBE_IN_ACTIVITY", "1"),
+            ])
+        return l_properties
 
-        # write number of probes
-        l_lines.extend([
-    f"        CONFIG.C_NUM_PROBE_IN                   {{{count_num_probe['in']}}}         \\",
-    f"        CONFIG.C_NUM_PROBE_OUT                  {{{count_num_probe['out']}}}         \\",
-    "        CONFIG.C_EN_PROBE_IN_ACTIVITY           {1}                         \\",
-    "        ]                                                                   \\",
-    "    ]"
-        ])
 
-        return l_lines
+class VioSignalStore(object):
+    """the vio signal lists of all modules, as read by vio_ctrl.tcl
+
+    Default layout: one json file with the module names as keys and the 
+    lists of vio signal dicts as values. Every update is a read-modify-write of 
+    that file, protected by an exclusive lock on <file>.lock (such that 
+    parallel xip_ctrl runs on different modules don't lose each other's 
+    entries), and the file is replaced atomically and only if the contents 
+    change.
+
+    Sharded layout: one file per module in the directory <file without 
+    .json>.d/, named <module>.json, each of which has the same format as the 
+    single file (just with only one key). Thus merging the dicts of all files in 
+    the directory gives what the single file would hold. An update only touches 
+    the files of the updated modules, no locking required. The sharded layout 
+    is used if the directory exists (or if requested explicitly).
+    """
+
+    def __init__(self, file, sharded=None):
+        """
+        :file: path of the (single) json file
+        :sharded: True/False to select the layout, None to use the sharded 
+        layout if its directory exists
+        """
+        self.file = file
+        self.dir_shards = os.path.splitext(file)[0] + ".d"
+        if sharded is None:
+            sharded = os.path.isdir(self.dir_shards)
+        self.sharded = sharded
+
+    @staticmethod
+    def _signal_dicts(vio_core):
+        # transform the list of VioSignal objects into a list of dictionaries
+        return [x.to_json_dict() for x in vio_core.signals]
+
+    @staticmethod
+    def _write_json(file, vio_ctrl_signals):
+        write_lines_if_changed(file, [json.dumps(vio_ctrl_signals, indent=4)])
+
+    def load(self):
+        """:returns: dict module name -> list of vio signal dicts
+        """
+        vio_ctrl_signals = {}
+        if self.sharded:
+            if os.path.isdir(self.dir_shards):
+                for file_name in sorted(os.listdir(self.dir_shards)):
+                    if file_name.endswith(".json"):
+                        with open(os.path.join(self.dir_shards, file_name), 'r') as f_in:
+                            vio_ctrl_signals.update(json.load(f_in))
+        elif os.path.isfile(self.file):
+            with open(self.file, 'r') as f_in:
+                vio_ctrl_signals = json.load(f_in)
+        return vio_ctrl_signals
+
+    def update(self, d_vio_cores):
+        """update the signal lists of any number of modules in one go
+
+        :d_vio_cores: dict with module names as keys and XilinxVioCore objects 
+        as values. A value of None removes the module.
+        """
+        if self.sharded:
+            os.makedirs(self.dir_shards, exist_ok=True)
+            for module_name, vio_core in d_vio_cores.items():
+                file_shard = os.path.join(self.dir_shards, module_name + ".json")
+                if vio_core:
+                    self._write_json(file_shard,
+                                     {module_name: self._signal_dicts(vio_core)})
+                elif os.path.isfile(file_shard):
+                    os.remove(file_shard)
+            return
+
+        with file_lock(self.file):
+            # load the existing definitions, update the ones for these modules 
+            # and write back the definitions
+            vio_ctrl_signals = self.load()
+            for module_name, vio_core in d_vio_cores.items():
+                if vio_core:
+                    vio_ctrl_signals[module_name] = self._signal_dicts(vio_core)
+                else:
+                    vio_ctrl_signals.pop(module_name, None)
+            self._write_json(self.file, vio_ctrl_signals)
+
+
+class XipsDeclarationManifest(object):
+    """bookkeeping of the debug cores of all modules, from which the one 
+    consolidated xips declaration file (sourced by the Vivado flow) is 
+    generated
+
+    The manifest (json) holds which cores each processed module defines, and 
+    for every core its module, its config hash and its ip declaration lines. 
+    Thus updating the cores of one module doesn't require knowing the cores of 
+    all other modules, and still every core ends up in the declaration file 
+    exactly once. Next to the usual 'set xips'/'lappend xips' declarations, 
+    the declaration file holds the dict xips_config_hash (ip name -> config 
+    hash), which lets the IP generation tell which cores actually changed.
+
+    The config hashes of the cores that have actually been generated are kept 
+    in a second json file (see mark_generated). get_changes compares the two, 
+    such that only new and changed cores need to be regenerated (and removed 
+    ones deleted) by Vivado.
+    """
+
+    def __init__(self, file):
+        self.file = file
+
+    def load(self):
+        """:returns: dict with the keys "modules" (module name -> list of ip 
+        names) and "cores" (ip name -> {"module", "config_hash", 
+        "declaration"})
+        """
+        if os.path.isfile(self.file):
+            with open(self.file, 'r') as f_in:
+                return json.load(f_in)
+        return {"modules": {}, "cores": {}}
+
+    def has_module(self, module_name):
+        return module_name in self.load()["modules"]
+
+    @staticmethod
+    def generate_declaration(d_manifest):
+        """:returns: lines of the consolidated xips declaration file (no line 
+        breaks), empty if there are no cores at all
+        """
+        if not d_manifest["cores"]:
+            return []
+
+        l_lines_out = [
+                "# --- GENERATED CODE --- */",
+                "set xips []",
+                "set xips_config_hash [dict create]",
+                "",
+                ]
+        # (sorted, such that the file only changes if the cores change, not if 
+        # the modules get processed in a different order)
+        for ip_name, d_core in sorted(d_manifest["cores"].items(),
+                                      key=lambda x: (x[1]["module"], x[0])):
+            l_lines_out.extend(d_core["declaration"])
+            l_lines_out.append(
+                    f"dict set xips_config_hash {ip_name} {d_core['config_hash']}")
+            l_lines_out.append("")
+        l_lines_out.append("# ---------------------- */")
+        return l_lines_out
+
+    def update(self, d_module_cores, s_declaration_file_name):
+        """replace the cores of the given modules in the manifest, and rewrite 
+        the declaration file (both only if anything changed)
+
+        :d_module_cores: dict module name -> list of XilinxDebugCore objects 
+        (can be empty, if a module doesn't define any cores (anymore))
+        """
+        with file_lock(self.file):
+            d_manifest = self.load()
+            for module_name, l_cores in d_module_cores.items():
+                for ip_name in d_manifest["modules"].get(module_name, []):
+                    d_manifest["cores"].pop(ip_name, None)
+                d_manifest["modules"][module_name] = [x.ip_name for x in l_cores]
+                for core in l_cores:
+                    d_manifest["cores"][core.ip_name] = {
+                            "module": module_name,
+                            "config_hash": core.config_hash,
+                            "declaration": core.generate_ip_declaration(),
+                            }
+
+            write_lines_if_changed(
+                    self.file, [json.dumps(d_manifest, indent=4, sort_keys=True), "\n"])
+            write_lines_if_changed(
+                    s_declaration_file_name,
+                    [x+'\n' for x in self.generate_declaration(d_manifest)])
+
+    @staticmethod
+    def _load_generated(s_generated_file_name):
+        if os.path.isfile(s_generated_file_name):
+            with open(s_generated_file_name, 'r') as f_in:
+                return json.load(f_in)
+        return {}
+
+    def get_changes(self, s_generated_file_name):
+        """compare the cores in the manifest with the cores that have been 
+        generated last (as recorded by mark_generated)
+
+        :returns: dict with the keys "new", "changed" and "removed", each a 
+        sorted list of ip names
+        """
+        d_config_hash = {ip_name: d_core["config_hash"]
+                         for ip_name, d_core in self.load()["cores"].items()}
+        d_config_hash_generated = self._load_generated(s_generated_file_name)
+        return {
+                "new": sorted(set(d_config_hash) - set(d_config_hash_generated)),
+                "changed": sorted(
+                    x for x in set(d_config_hash) & set(d_config_hash_generated)
+                    if d_config_hash[x] != d_config_hash_generated[x]),
+                "removed": sorted(set(d_config_hash_generated) - set(d_config_hash)),
+                }
+
+    def mark_generated(self, s_generated_file_name, l_ip_names=None):
+        """record the current config hash of the given cores as generated (to 
+        be called once the IP generation of those cores succeeded). Cores that 
+        are not in the manifest anymore are dropped from the record.
+
+        :l_ip_names: ip names of the generated (or deleted) cores, default: all
+        """
+        with file_lock(s_generated_file_name):
+            d_cores = self.load()["cores"]
+            d_config_hash_generated = self._load_generated(s_generated_file_name)
+            if l_ip_names is None:
+                l_ip_names = set(d_cores) | set(d_config_hash_generated)
+            for ip_name in l_ip_names:
+                if ip_name in d_cores:
+                    d_config_hash_generated[ip_name] = d_cores[ip_name]["config_hash"]
+                else:
+                    d_config_hash_generated.pop(ip_name, None)
+            write_lines_if_changed(
+                    s_generated_file_name,
+                    [json.dumps(d_config_hash_generated, indent=4, sort_keys=True), "\n"])
+
+
+class _VhdlArchitectureEnd(object):
+    """line-by-line detection of the end of the (first) architecture in VHDL 
+    code, which is where the debug core instantiations go (the VHDL 
+    counterpart of the 'endmodule' line). match has the signature of 
+    re.Pattern.match, such that scan_module can use either.
+
+    With entity_name, only an architecture of that entity counts.
+
+    Detected are "end architecture [<name>];" and "end <name>;" with the name 
+    of the architecture, not a bare "end;" (which also ends subprogram 
+    bodies).
+    """
+
+    _re_architecture = re.compile(
+            r'[\s]*architecture[\s]+(\w+)[\s]+of[\s]+(\w+)[\s]+is\b', re.I)
+    _re_end = re.compile(
+            r'[\s]*end[\s]+(?:architecture\b[\s]*(\w*)|(\w+))[\s]*;', re.I)
+
+    def __init__(self, entity_name=None):
+        self.entity_name = entity_name.lower() if entity_name else None
+        # name of the architecture (lower case), None before its begin
+        self.name = None
+
+    def match(self, line):
+        if self.name is None:
+            mo = self._re_architecture.match(line)
+            if mo and (self.entity_name is None
+                       or mo.group(2).lower() == self.entity_name):
+                self.name = mo.group(1).lower()
+            return None
+        mo = self._re_end.match(line)
+        if mo and (mo.group(2) is None or mo.group(2).lower() == self.name):
+            return mo
+        return None
+
+
+class DebugCoreScan(object):
+    """result of scanning one HDL module file with 
+    XilinxDebugCoreManager.scan_module: the debug cores that are defined in the 
+    module, plus everything that is needed for rewriting the debug core 
+    instantiations without reading the file again.
+    """
+
+    def __init__(self, module_name, hdl_lang, vio_core, ila_cores,
+                 lines, ranges_keep, idx_endmodule, decl_digest="", num_lines=None):
+        """
+        :vio_core: XilinxVioCore, or None if the module has no vio signals
+        :ila_cores: list of XilinxIlaCore (empty if there are no ila signals)
+        :lines: the lines of the module file (with line breaks), empty if the 
+        scan didn't keep them
+        :ranges_keep: list of (start, stop) line index ranges (stop exclusive) 
+        that survive an instantiation update, which are all lines up to the 
+        first 'endmodule' without the existing debug core instantiations and 
+        generated code blocks
+        :idx_endmodule: index of the first 'endmodule' line in lines (of the 
+        module, see XilinxDebugCoreManager.scan_module), None if there is none. 
+        The lines after it are kept as they are.
+        :decl_digest: content hash over all debug signal declarations of the 
+        module (equal digests mean equal debug cores)
+        :num_lines: number of lines of the module file (default: len(lines))
+        """
+        self.module_name = module_name
+        self.hdl_lang = hdl_lang
+        self.vio_core = vio_core
+        self.ila_cores = ila_cores
+        self.lines = lines
+        self.ranges_keep = ranges_keep
+        self.idx_endmodule = idx_endmodule
+        self.decl_digest = decl_digest
+        self.num_lines = len(lines) if num_lines is None else num_lines
+
+    @property
+    def has_generated_code(self):
+        """True if the module contains anything that an earlier instantiation 
+        update has generated (or anything that looks like that)
+        """
+        num_lines_scanned = self.num_lines if self.idx_endmodule is None \
+                            else self.idx_endmodule
+        num_lines_kept = sum(stop - start for start, stop in self.ranges_keep)
+        return num_lines_kept < num_lines_scanned
 
 
 class XilinxDebugCoreManager(object):
@@ -527,12 +1037,36 @@ class XilinxDebugCoreManager(object):
 
     S_GENERATED_CODE_START = "    /* --- GENERATED CODE --- */"
     S_GENERATED_CODE_END = "    /* ---------------------- */"
-
-    def __init__(self, vio_cores={}, ila_cores={}):
+    # (/* */ comments only exist since VHDL-2008. And lines of dashes are 
+    # common in VHDL comments, thus the end needs some words as well)
+    S_GENERATED_CODE_START_VHDL = "    -- --- GENERATED CODE ---"
+    S_GENERATED_CODE_END_VHDL = "    -- --- END OF GENERATED CODE ---"
+
+    # file names (in the xips declaration directory) of the consolidated 
+    # declaration of all debug cores and of its manifest
+    S_XIPS_DECLARATION_FILE = "xips_debug_cores.tcl"
+    S_XIPS_MANIFEST_FILE = "xips_debug_cores.json"
+    # config hashes of the cores as they were generated last (see 
+    # XipsDeclarationManifest.mark_generated)
+    S_XIPS_GENERATED_FILE = "xips_debug_cores_generated.json"
+
+    # analysis-only scans (see scan_module) of files from this size on go 
+    # through _scan_module_mmap instead of iterating over all lines
+    MMAP_SCAN_MIN_SIZE = 16*1024*1024
+
+    # part of every declaration digest (see scan_module), bump whenever the 
+    # generated declarations or config hashes change for the same signals, 
+    # such that cached modules get processed again
+    DIGEST_VERSION = 2
+
+    def __init__(self, vio_cores={}, ila_cores={}, preprocessor_context=None):
         # vio_cores and ila_cores are dict(XilinxDebugCore). The key is the name 
         # of the module in which the respective core is defined
         self._vio_cores = vio_cores
         self._ila_cores = ila_cores
+        # defines and include directories for scanning the modules (see 
+        # scan_module), None for none
+        self.preprocessor_context = preprocessor_context
 
     # defining vio_cores and ila_cores as properties for convenience: You 
     # sometimes need the dict with the module names, and sometimes just the list 
@@ -544,7 +1078,8 @@ class XilinxDebugCoreManager(object):
 
     @property
     def list_vio_cores(self):
-        return list(self._vio_cores.values())
+        # (modules without vio signals are registered with None)
+        return [x for x in self._vio_cores.values() if x]
 
     @property
     def dict_ila_cores(self):
@@ -566,7 +1101,7 @@ class XilinxDebugCoreManager(object):
             hdl_lang = "systemverilog"
         elif l_fields[1] == "v":
             hdl_lang = "verilog"
-        elif l_fields[1] == "vhd":
+        elif l_fields[1] in ("vhd", "vhdl"):
             hdl_lang = "vhdl"
         else:
             raise Exception(f"Invalid file extension: {l_fields[1]}")
@@ -586,6 +1121,9 @@ class XilinxDebugCoreManager(object):
 "TODO: radices for the VIO cores are not being processed yet",
 "ila_ctrl_<ila_name>_<name>; // trigger_type=<trigger_type> comparators=<num_comparators>",
 "vio_ctrl_<'in'/'out'>_<name>; // radix=<radix> init=<val>",
+"In VHDL, std_logic or std_logic_vector signals, with '--' comments:",
+"signal ila_ctrl_<ila_name>_<name> : std_logic_vector(...); -- trigger_type=<trigger_type> comparators=<num_comparators>",
+"signal vio_ctrl_<'in'/'out'>_<name> : std_logic_vector(...); -- radix=<radix> init=<val>",
 "The debug core names will be as follows:",
 "ILA: xip_ila_ctrl_<module_name>_<ila_name>",
 "VIO: xip_vio_ctrl_<ila_name>",
@@ -596,15 +1134,285 @@ class XilinxDebugCoreManager(object):
 
         return l_output_lines
 
-    def write_xips_declaration(self, s_xip_declaration_file_name):
+    @classmethod
+    def _get_generated_code_markers(cls, hdl_lang):
+        """:returns: (start, end) comment lines around the generated code in 
+        a module file of hdl_lang
+        """
+        if hdl_lang == "vhdl":
+            return cls.S_GENERATED_CODE_START_VHDL, cls.S_GENERATED_CODE_END_VHDL
+        return cls.S_GENERATED_CODE_START, cls.S_GENERATED_CODE_END
+
+    @staticmethod
+    def _get_pattern_inst_debug_core(module_name, hdl_lang="systemverilog"):
+        """pattern to match the first line of an instantiation of any debug 
+        core in module_name (in VHDL: the begin of the block around it, see 
+        XilinxDebugCore._generate_ip_instantiation_vhdl)
+        """
+        if hdl_lang == "vhdl":
+            return re.compile(
+                    r'[\s]*inst_xip_(vio_ctrl_' + module_name + r'|ila_ctrl_'
+                    + module_name + r'_[a-zA-Z0-9]+)[\s]*:[\s]*block\b', re.I)
+        # (TODO: is there any point in being more specific here, in the sense 
+        # that you only match against known cores? It should be enough to just 
+        # match anything that meets the general structure of a debug core 
+        # instantiation, and assume that there is no such structure in the code 
+        # that has not been generated by this module
+        s_pattern_inst_vio = r'[\s]*xip_vio_ctrl_' + module_name + r'[\s]+inst_xip_vio_ctrl_'   \
+            + module_name + r'[\s]*\([\s]*'
+        s_pattern_inst_ila = r'[\s]*xip_ila_ctrl_' + module_name + r'_[a-zA-Z0-9]+'             \
+            + r'[\s]+inst_xip_ila_ctrl_' + module_name + r'_[a-zA-Z0-9]+[\s]*\([\s]*'
+        s_pattern_inst_debug_core = r'(' + s_pattern_inst_vio + '|' + s_pattern_inst_ila + r')'
+        return re.compile(s_pattern_inst_debug_core)
+
+    @classmethod
+    def scan_module(cls, s_module_file_name, lines=None, keep_lines=True,
+                    preprocessor_context=None, module_name=None):
+        """read an HDL module file once and, in the same pass over the lines, 
+        collect the vio and ila signal definitions and the line ranges that 
+        _update_module needs for rewriting the debug core instantiations.
+
+        Only lines that contain 'ila_ctrl_' or 'vio_ctrl_' at all are passed on 
+        to the (expensive) signal patterns, for the by far biggest part of 
+        a module plain substring checks are all that happens.
+
+        The signal definitions are taken from the preprocessed lines (see 
+        hdl_sv_preprocessor): signals in `ifdef branches that are not taken 
+        don't count, the ones in included files do, and macros in the widths 
+        are expanded. The line ranges refer to the lines as they are in the 
+        file. (Lines without a backtick are passed on as they are by the 
+        preprocessor, as long as it's not within a branch that is not taken, 
+        so only the others go through it. VHDL files don't go through it at 
+        all.)
+
+        In VHDL files, the end of the first architecture takes the place of 
+        'endmodule' (see _VhdlArchitectureEnd).
+
+        :s_module_file_name: the module file name (which the module name and 
+        language are derived from)
+        :lines: any iterable of lines of code to scan instead of reading 
+        s_module_file_name
+        :keep_lines: if False, the lines are not stored in the scan result, 
+        thus the file is scanned in constant memory (only for analysing the 
+        module, such a scan can not be passed on to _update_module). Files of 
+        at least MMAP_SCAN_MIN_SIZE are then scanned by _scan_module_mmap.
+        :preprocessor_context: SvPreprocessorContext (defines and include 
+        directories), default: no defines
+        :module_name: name of the module (e.g. as found by the module index) 
+        if it's not the file name, or if the file declares more than one 
+        module. Only that module is scanned then: signals before its 
+        declaration don't count, and the instantiations go before its 
+        'endmodule' (in VHDL: the end of an architecture of that entity).
+        :returns: DebugCoreScan
+        """
+        if lines is None:
+            # (the mmap scan only sees the signal lines, not the module 
+            # declaration)
+            if not keep_lines and module_name is None \
+                    and os.path.getsize(s_module_file_name) >= cls.MMAP_SCAN_MIN_SIZE:
+                scan = cls._scan_module_mmap(s_module_file_name, preprocessor_context)
+                if scan is not None:
+                    return scan
+            with open(s_module_file_name, 'r') as f_in:
+                return cls.scan_module(s_module_file_name, f_in, keep_lines,
+                                       preprocessor_context, module_name)
+
+        module_name_file, hdl_lang = cls.parse_module_file_name(s_module_file_name)
+        # the begin of the module, None if the whole file counts
+        pattern_module_begin = None
+        if module_name is None:
+            module_name = module_name_file
+        elif hdl_lang == "vhdl":
+            pattern_module_begin = re.compile(
+                    r'[\s]*architecture[\s]+\w+[\s]+of[\s]+' + module_name
+                    + r'[\s]+is\b', re.I)
+        else:
+            pattern_module_begin = re.compile(
+                    r'[\s]*(?:macro)?module[\s]+(?:(?:automatic|static)[\s]+)?'
+                    + module_name + r'\b')
+        in_module = pattern_module_begin is None
+        pattern_inst_debug_core = cls._get_pattern_inst_debug_core(module_name, hdl_lang)
+        # (markers in any indentation, see _update_module)
+        s_generated_code_start, s_generated_code_end = \
+                (x.strip() for x in cls._get_generated_code_markers(hdl_lang))
+        # the end of the module, and the end of a debug core instantiation. 
+        # s_endmodule is checked before the (more expensive) pattern, it is 
+        # empty for VHDL because of its case-insensitive keywords
+        if hdl_lang == "vhdl":
+            s_endmodule = ""
+            pattern_endmodule = _VhdlArchitectureEnd(
+                    None if in_module else module_name)
+            pattern_inst_end = re.compile(r'[\s]*end[\s]+block\b', re.I)
+        else:
+            s_endmodule = "endmodule"
+            pattern_endmodule = re.compile(r'[\s]*endmodule[\s]')
+            pattern_inst_end = re.compile(r'[\s]*\)[\s]*;[\s]*')
+        pp_sv = hdl_lang != "vhdl"
+        if preprocessor_context is None:
+            preprocessor_context = SvPreprocessorContext.get_default()
+        preprocessor = preprocessor_context.preprocessor(s_module_file_name)
+        # (see preprocessor.plain)
+        pp_plain = True
+
+        l_lines = []
+        num_lines = 0
+        l_vio_signals = []
+        l_ila_signals = []
+        # every line that defines a debug signal goes into the declaration hash
+        hash_decl = hashlib.sha1(f"{cls.DIGEST_VERSION}:{hdl_lang}".encode())
+        l_ranges_keep = []
+        idx_endmodule = None
+        # start of the current range of lines to keep, None while being inside 
+        # of an instantiation or a generated code block
+        idx_keep_start = 0
+        # (see _update_module for why there are both of these flags)
+        pointer_in_module_inst = False
+        pointer_in_generated_code = False
+
+        for idx, line in enumerate(lines):
+            if keep_lines:
+                l_lines.append(line)
+            num_lines = idx + 1
+            # (what follows the end of the module belongs to other modules)
+            if idx_endmodule is not None:
+                continue
+
+            # SIGNAL DEFINITIONS
+            if pp_plain and "`" not in line:
+                line_pp = line
+            elif pp_sv:
+                line_pp = preprocessor.process_line(line)
+                pp_plain = preprocessor.plain
+            else:
+                line_pp = line
+            if not in_module:
+                if not pattern_module_begin.match(line):
+                    continue
+                in_module = True
+            if "_ctrl_" in line_pp:
+                # (an include makes several lines out of one)
+                for line_decl in line_pp.splitlines():
+                    if "vio_ctrl_" in line_decl:
+                        signal = VioSignal.from_str(line_decl, hdl_lang=hdl_lang)
+                        if signal:
+                            l_vio_signals.append(signal)
+                            hash_decl.update(line_decl.strip().encode())
+                    if "ila_ctrl_" in line_decl:
+                        signal = IlaSignal.from_str(line_decl, hdl_lang)
+                        if signal:
+                            l_ila_signals.append(signal)
+                            hash_decl.update(line_decl.strip().encode())
+
+            # INSTANTIATION OFFSETS
+            if not pointer_in_module_inst:
+                if "xip_" in line and pattern_inst_debug_core.match(line):
+                    pointer_in_module_inst = True
+                elif line.find(s_generated_code_start) != -1:
+                    pointer_in_generated_code = True
+                elif line.find(s_generated_code_end) != -1:
+                    pointer_in_generated_code = False
+                elif s_endmodule in line and pattern_endmodule.match(line):
+                    idx_endmodule = idx
+                elif not pointer_in_generated_code:
+                    if idx_keep_start is None:
+                        idx_keep_start = idx
+                    continue
+                # anything that reaches here is not kept, so close the current 
+                # range of kept lines
+                if idx_keep_start is not None:
+                    if idx_keep_start < idx:
+                        l_ranges_keep.append((idx_keep_start, idx))
+                    idx_keep_start = None
+            else:
+                # match end of module instantiation
+                if pattern_inst_end.match(line):
+                    pointer_in_module_inst = False
+
+        if idx_endmodule is None and idx_keep_start is not None \
+                and idx_keep_start < num_lines:
+            l_ranges_keep.append((idx_keep_start, num_lines))
+
+        return DebugCoreScan(
+                module_name, hdl_lang,
+                XilinxVioCore.from_signals(l_vio_signals, module_name),
+                XilinxIlaCore.from_signals(l_ila_signals, module_name),
+                l_lines, l_ranges_keep, idx_endmodule, hash_decl.hexdigest(),
+                num_lines)
+
+    @classmethod
+    def _scan_module_mmap(cls, s_module_file_name, preprocessor_context=None):
+        """fast path of scan_module for huge files (like post-synthesis 
+        netlists), in which next to no line defines a debug signal: instead of 
+        going through the file line by line, the memory-mapped file is searched 
+        for '_ctrl_' (bytes-level, no decoding), and only the lines around 
+        the hits that belong to 'vio_ctrl_'/'ila_ctrl_' are run through the 
+        regular line scan.
+
+        The result holds the debug cores and the declaration digest, but no line 
+        offsets (as for any scan with keep_lines=False).
+
+        :returns: DebugCoreScan, None if the file has preprocessor directives 
+        that need the file to be scanned line by line (see has_sv_directives)
+        """
+        l_candidate_lines = []
+        with open(s_module_file_name, 'rb') as f_in:
+            with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if has_sv_directives(mm):
+                    return None
+                pos = mm.find(b'_ctrl_')
+                while pos != -1:
+                    if mm[pos-3:pos] in (b'vio', b'ila'):
+                        line_start = mm.rfind(b'\n', 0, pos) + 1
+                        line_end = mm.find(b'\n', pos)
+                        line_end = len(mm) if line_end == -1 else line_end + 1
+                        l_candidate_lines.append(
+                                mm[line_start:line_end].decode(errors="replace"))
+                        # (a line only has to be scanned once)
+                        pos = mm.find(b'_ctrl_', line_end)
+                    else:
+                        pos = mm.find(b'_ctrl_', pos + 1)
+
+        scan = cls.scan_module(s_module_file_name, l_candidate_lines, keep_lines=False,
+                               preprocessor_context=preprocessor_context)
+        # the offsets of the candidate lines don't mean anything for the file
+        scan.ranges_keep = []
+        scan.idx_endmodule = None
+        scan.num_lines = 0
+        return scan
+
+    @staticmethod
+    def _load_digest_cache(file):
+        """the digest cache maps module names to the DebugCoreScan.decl_digest 
+        of the last run that wrote the module's signal json entry and xips 
+        declaration
+        """
+        if file and os.path.isfile(file):
+            with open(file, 'r') as f_in:
+                return json.load(f_in)
+        return {}
+
+    @staticmethod
+    def _write_digest_cache(file, d_cache):
+        files.create_file_path(file)
+        write_lines_if_changed(
+                file, [json.dumps(d_cache, indent=4, sort_keys=True), "\n"])
+
+    def write_xips_declaration(self, s_xip_declaration_file_name, module_names=None):
         """write the xip declaration in the format such that the code 
         manager-generated scripts can add the IPs to the Vivado project
+
+        :module_names: if given, only the cores of these modules are declared 
+        (default: all cores known to this object)
         """
 
         l_lines_out = []
 
+        l_cores = itertools.chain(self.list_vio_cores, self.list_ila_cores)
+        if module_names is not None:
+            l_cores = filter(lambda x: x.module_name in module_names, l_cores)
+
         first_core = True
-        for core in itertools.chain(self.list_vio_cores, self.list_ila_cores):
+        for core in l_cores:
             if first_core:
                 l_lines_out.extend([
                     "# --- GENERATED CODE --- */",
@@ -620,112 +1428,161 @@ class XilinxDebugCoreManager(object):
             "# ---------------------- */",
             ])
 
-        with open(s_xip_declaration_file_name, 'w') as f_out:
-            f_out.writelines([x+'\n' for x in l_lines_out])
+        # (leaving an unchanged file alone keeps its mtime, which is what make 
+        # decides on whether to regenerate IPs)
+        write_lines_if_changed(
+                s_xip_declaration_file_name, [x+'\n' for x in l_lines_out])
 
-    def _parse_module(self, s_module_file_name):
+    def _parse_module(self, s_module_file_name, module_name=None):
         """Searches a given HDL module file for ila and vio definitions, and 
         adds them to self._vio_cores/_ila_cores, or updates those. The method 
         does not write to any files, thus also it is not updating any 
         instantiations in s_module_file_name.
-        """
-        module_name, hdl_lang = XilinxDebugCoreManager.parse_module_file_name(s_module_file_name)
-        self._vio_cores[module_name] = XilinxVioCore.from_module(s_module_file_name)
-        self._ila_cores[module_name] = XilinxIlaCore.from_module(s_module_file_name)
 
-    def _update_module(self, s_module_file_name):
+        :module_name: see scan_module
+        :returns: the DebugCoreScan of the module, which can be handed on to 
+        _update_module in order to not read the file again
+        """
+        scan = self.scan_module(s_module_file_name,
+                                preprocessor_context=self.preprocessor_context,
+                                module_name=module_name)
+        self._vio_cores[scan.module_name] = scan.vio_core
+        self._ila_cores[scan.module_name] = scan.ila_cores
+        return scan
+
+    def _update_module(self, s_module_file_name, scan=None, module_name=None):
         """in a given HDL file, update all present instantiations of debug cores 
         with list_ila_cores and list_vio_cores
         The method does not analyse the module file for cores that are defined 
         (by defining the according signals). The function only exists for 
         logically splitting module analysis from instantiation update.
-        """
-
-        module_name, hdl_lang = self.parse_module_file_name(s_module_file_name)
 
-        # pattern to match the first line of an instantiation of any debug core 
-        # in module_name
-        # (TODO: is there any point in being more specific here, in the sense 
-        # that you only match against known cores? It should be enough to just 
-        # match anything that meets the general structure of a debug core 
-        # instantiation, and assume that there is no such structure in the code 
-        # that has not been generated by this module
-        s_pattern_inst_vio = r'[\s]*xip_vio_ctrl_' + module_name + r'[\s]+inst_xip_vio_ctrl_'   \
-            + module_name + r'[\s]*\([\s]*'
-        s_pattern_inst_ila = r'[\s]*xip_ila_ctrl_' + module_name + r'_[a-zA-Z0-9]+'             \
-            + r'[\s]+inst_xip_ila_ctrl_' + module_name + r'_[a-zA-Z0-9]+[\s]*\([\s]*'
-        s_pattern_inst_debug_core = r'(' + s_pattern_inst_vio + '|' + s_pattern_inst_ila + r')'
-        pattern_inst_debug_core = re.compile(s_pattern_inst_debug_core)
+        :scan: DebugCoreScan of s_module_file_name as returned by 
+        _parse_module. If not given, the file is scanned here (only for the 
+        line offsets, the cores still come from dict_*_cores).
+        :module_name: see scan_module (only if scan is not given)
+        """
 
-        with open(s_module_file_name, 'r') as f_in:
-            l_lines_old = f_in.readlines()
+        if scan is None:
+            scan = self.scan_module(s_module_file_name,
+                                    preprocessor_context=self.preprocessor_context,
+                                    module_name=module_name)
+        module_name, hdl_lang = scan.module_name, scan.hdl_lang
 
         # TODO: when processing the lines of the old file, also remove any 
         # notifictians that code is generated -> globally define those, so that 
         # it's easy to reference
 
-        # just create a new list of lines based on the old list of lines. Nobody 
-        # said that this would be great, elegant, or efficient. Just needs to 
-        # work...
+        # the scan already knows which lines survive: everything up to 
+        # 'endmodule' except for existing debug core instantiations and 
+        # generated code blocks (the latter prevents adding empty lines between 
+        # the debug cores with every call). If there is no 'endmodule', there is 
+        # nothing to insert the instantiations in front of.
         l_lines_new = []
-        # theoretically, pointer_in_module_inst might be obsolete because 
-        # everything that would trigger it should be enclosed in 
-        # pointer_in_generated_code blocks. But it was here before 
-        # pointer_in_generated_code. And also, "theoretically"... If ever 
-        # someone or something removes the generated code notifiers, it's nice 
-        # if that doesn't fully break this function.
-        pointer_in_module_inst = False
-        pointer_in_generated_code = False
-        for line in l_lines_old:
-            if not pointer_in_module_inst:
-                # first match for an existing debug core instantiation, then for 
-                # the end of the module definition
-
-                if pattern_inst_debug_core.match(line):
-                    pointer_in_module_inst = True
-                elif line.find(self.S_GENERATED_CODE_START) != -1:
-                    pointer_in_generated_code = True
-                elif line.find(self.S_GENERATED_CODE_END) != -1:
-                    pointer_in_generated_code = False
+        for idx_start, idx_stop in scan.ranges_keep:
+            l_lines_new.extend(scan.lines[idx_start:idx_stop])
+
+        s_generated_code_start, s_generated_code_end = \
+                self._get_generated_code_markers(hdl_lang)
+        if scan.idx_endmodule is not None:
+            l_cores = list(self.dict_ila_cores.get(module_name) or [])
+            if self.dict_vio_cores.get(module_name):
+                l_cores.append(self.dict_vio_cores[module_name])
+            # (no generated code block at all for a module without cores, such 
+            # that a module that never had any stays as it is)
+            if l_cores:
+                # in VHDL, the generated code goes into the architecture body, 
+                # with the indentation of the code before it
+                s_indent = ""
+                if hdl_lang == "vhdl":
+                    s_indent = self._get_indent_vhdl(l_lines_new)
+                    s_generated_code_start = s_indent + s_generated_code_start.strip()
+                    s_generated_code_end = s_indent + s_generated_code_end.strip()
+                # we have to add the line breaks to the list that we get 
+                # from the function (yes, you could've also made that 
+                # a parameter to the function...)
+                l_lines_new.append(s_generated_code_start + "\n")
+                for core in l_cores:
+                    l_lines_new.extend(
+                        [(s_indent + x if x else x) + "\n"
+                         for x in core.generate_ip_instantiation(hdl_lang)])
+                    l_lines_new.append("\n")
+                # remove the empty line after the last module instantiation
+                l_lines_new.pop()
+                l_lines_new.append(s_generated_code_end + "\n")
+            # add the endmodule line after instantiating the debug cores, and 
+            # whatever comes after it (e.g. further modules)
+            l_lines_new.extend(scan.lines[scan.idx_endmodule:])
+
+        # (atomic, only if anything changed, and in the file's newline style)
+        write_lines_if_changed(s_module_file_name, l_lines_new)
 
-                elif re.match(r'[\s]*endmodule[\s]', line):
-                    # we have to add the line breaks to the list that we get 
-                    # from the function (yes, you could've also made that 
-                    # a parameter to the function...)
-                    l_lines_new.append(self.S_GENERATED_CODE_START + "\n")
-                    for core in self.dict_ila_cores[module_name]:
-                        l_lines_new.extend(
-                            [x+"\n" for x in core.generate_ip_instantiation(hdl_lang)])
-                        l_lines_new.append("\n")
-                    if self.dict_vio_cores[module_name]:
-                        core = self.dict_vio_cores[module_name]
-                        l_lines_new.extend(
-                            [x+"\n" for x in core.generate_ip_instantiation(hdl_lang)])
-                        l_lines_new.append("\n")
-                    # remove the empty line after the last module instantiation
-                    l_lines_new.pop()
-                    l_lines_new.append(self.S_GENERATED_CODE_END + "\n")
-                    # add the endmodule line after instantiating the debug cores
-                    l_lines_new.append(line)
-                    break
-                else:
-                    # checking for pointer_in_generated_code, because that 
-                    # prevents adding empty lines between the debug that will 
-                    # get generated (meaning you would otherwise add an empty 
-                    # line with every call)
-                    if not pointer_in_generated_code:
-                        l_lines_new.append(line)
-            else:
-                # match end of module instantiation
-                if re.match(r'[\s]*\)[\s]*;[\s]*', line):
-                    pointer_in_module_inst = False
-
-        with open(s_module_file_name, 'w') as f_out:
-            f_out.writelines(l_lines_new)
+    @staticmethod
+    def _get_indent_vhdl(l_lines):
+        """:l_lines: the lines of a VHDL file up to the end of an architecture
+        :returns: the indentation of the statements at the end of the 
+        architecture body (of the last line with code, one level deeper if 
+        that's the 'begin' of the body)
+        """
+        for line in reversed(l_lines):
+            s_code = line.split("--", 1)[0]
+            if not s_code.strip():
+                continue
+            s_indent = s_code[:len(s_code) - len(s_code.lstrip())]
+            if s_code.strip().lower() == "begin":
+                s_indent += "    "
+            return s_indent
+        return "    "
+
+    def _update_xips_declaration(self, s_xip_declaration_dir, l_module_names):
+        """register the current cores of the given modules in the manifest, 
+        and update the consolidated xips declaration accordingly (see 
+        XipsDeclarationManifest). Per-module declaration files of these modules 
+        from earlier versions are removed, as they would declare the cores 
+        a second time.
+        """
+        d_module_cores = {}
+        for module_name in l_module_names:
+            l_cores = list(self.dict_ila_cores.get(module_name) or [])
+            if self.dict_vio_cores.get(module_name):
+                l_cores.insert(0, self.dict_vio_cores[module_name])
+            d_module_cores[module_name] = l_cores
+
+        manifest = XipsDeclarationManifest(
+                os.path.join(s_xip_declaration_dir, self.S_XIPS_MANIFEST_FILE))
+        manifest.update(d_module_cores, os.path.join(
+                s_xip_declaration_dir, self.S_XIPS_DECLARATION_FILE))
+
+        for module_name in l_module_names:
+            s_file_legacy = os.path.join(
+                    s_xip_declaration_dir, "xips_debug_cores_" + module_name + ".tcl")
+            if os.path.isfile(s_file_legacy):
+                os.remove(s_file_legacy)
+
+    def get_xips_changes(self, s_xip_declaration_dir="xips"):
+        """:returns: dict with the ip names of the debug cores which are "new", 
+        "changed" or "removed" since they have been generated last (see 
+        mark_xips_generated)
+        """
+        manifest = XipsDeclarationManifest(
+                os.path.join(s_xip_declaration_dir, self.S_XIPS_MANIFEST_FILE))
+        return manifest.get_changes(
+                os.path.join(s_xip_declaration_dir, self.S_XIPS_GENERATED_FILE))
+
+    def mark_xips_generated(self, s_xip_declaration_dir="xips", l_ip_names=None):
+        """record the debug cores l_ip_names (default: all) as generated in their 
+        current configuration
+        """
+        manifest = XipsDeclarationManifest(
+                os.path.join(s_xip_declaration_dir, self.S_XIPS_MANIFEST_FILE))
+        manifest.mark_generated(
+                os.path.join(s_xip_declaration_dir, self.S_XIPS_GENERATED_FILE),
+                l_ip_names)
 
     def process_module(self, s_module_file_name,
                        s_json_file_name_signals="vio_ctrl_signals.json",
-                       s_xip_declaration_dir="xips/xips_debug_cores.tcl"):
+                       s_xip_declaration_dir="xips",
+                       s_cache_file_name=None, module_name=None):
         """update the debug core instantiation in a verilog module:
         - find vio_ctrl signal definitions (see parse_verilog_module)
         - write/update the vio_ctrl signals json file (to be read by 
@@ -734,19 +1591,126 @@ class XilinxDebugCoreManager(object):
           vio_ctrl ip: Scan the module for an existing instantiation, if you find 
           one, remove that. Insert the new instantiation at the very end of the 
           module (that is, right before 'endmodule')
+        - update the module's cores in the consolidated xips declaration 
+          (S_XIPS_DECLARATION_FILE in s_xip_declaration_dir)
+
+        Every output file is only written if its contents actually change.
 
         :s_json_file_name_signals: see XilinxVioCore.write_json_sig_list()
+        :s_cache_file_name: if given, the digest cache file (see 
+        _load_digest_cache). If the module's debug signal declarations did not 
+        change since the last run, the signal json and the xips declaration are 
+        not touched at all.
+        :module_name: name of the module, if it's not the file name (see 
+        scan_module)
         """
 
-        module_name, hdl_lang = self.parse_module_file_name(s_module_file_name)
-        self._parse_module(s_module_file_name)
-
-        self._update_module(s_module_file_name)
-        self.dict_vio_cores[module_name].write_json_sig_list(s_json_file_name_signals)
+        scan = self._parse_module(s_module_file_name, module_name)
+        module_name = scan.module_name
+
+        self._update_module(s_module_file_name, scan)
+
+        manifest = XipsDeclarationManifest(
+                os.path.join(s_xip_declaration_dir, self.S_XIPS_MANIFEST_FILE))
+        d_cache = self._load_digest_cache(s_cache_file_name)
+        if d_cache.get(module_name) == scan.decl_digest \
+                and manifest.has_module(module_name):
+            return
+
+        # (a module without vio signals (anymore) is removed from the signal 
+        # list, see process_modules)
+        XilinxVioCore.write_json_sig_lists(
+                {module_name: self.dict_vio_cores[module_name] or None},
+                s_json_file_name_signals)
+
+        self._update_xips_declaration(s_xip_declaration_dir, [module_name])
+
+        if s_cache_file_name:
+            d_cache[module_name] = scan.decl_digest
+            self._write_digest_cache(s_cache_file_name, d_cache)
+
+    def process_modules(self, l_module_file_names,
+                        s_json_file_name_signals="vio_ctrl_signals.json",
+                        s_xip_declaration_dir="xips", max_workers=None,
+                        s_cache_file_name=None, d_file_modules=None):
+        """process_module for a whole set of modules at once. The module files 
+        are parsed (and their debug core instantiations updated) in parallel in 
+        a process pool, afterwards the vio signal json file and the xips 
+        declaration are updated once for all modules.
+
+        Modules that neither define debug cores nor contain any generated debug 
+        core code are left untouched.
+
+        :max_workers: number of worker processes (default: cpu count)
+        :s_cache_file_name: see process_module
+        :d_file_modules: dict file name -> list of the names of the modules 
+        that the file declares (e.g. from HdlModuleIndex.get_module_names), 
+        each of which is processed on its own. Files that are not in there 
+        are taken for one module named after the file.
+        """
 
-        s_xip_declaration_file_name = os.path.join(
-                s_xip_declaration_dir, "xips_debug_cores_" + module_name + ".tcl")
-        self.write_xips_declaration(s_xip_declaration_file_name)
+        d_file_modules = d_file_modules or {}
+        l_module_names = [d_file_modules.get(x) or [None] for x in l_module_file_names]
+        # (all modules of a file in the same worker, one after the other, as 
+        # each of them rewrites the file)
+        if len(l_module_file_names) > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+                chunksize = max(1, len(l_module_file_names) // (4*(max_workers or os.cpu_count() or 1)))
+                l_results = list(executor.map(
+                        _process_module_instantiations, l_module_file_names,
+                        l_module_names, itertools.repeat(self.preprocessor_context),
+                        chunksize=chunksize))
+        else:
+            l_results = [_process_module_instantiations(x, y, self.preprocessor_context)
+                         for x, y in zip(l_module_file_names, l_module_names)]
+        l_results = [x for l_file_results in l_results for x in l_file_results]
+
+        manifest = XipsDeclarationManifest(
+                os.path.join(s_xip_declaration_dir, self.S_XIPS_MANIFEST_FILE))
+        d_manifest_modules = manifest.load()["modules"]
+        d_cache = self._load_digest_cache(s_cache_file_name)
+        d_vio_cores = {}
+        for module_name, vio_core, ila_cores, processed, decl_digest in l_results:
+            if not processed:
+                continue
+            self._vio_cores[module_name] = vio_core
+            self._ila_cores[module_name] = ila_cores
+
+            if d_cache.get(module_name) == decl_digest \
+                    and module_name in d_manifest_modules:
+                continue
+            d_cache[module_name] = decl_digest
+            d_vio_cores[module_name] = vio_core
+
+        if d_vio_cores:
+            XilinxVioCore.write_json_sig_lists(d_vio_cores, s_json_file_name_signals)
+            self._update_xips_declaration(s_xip_declaration_dir, list(d_vio_cores))
+
+        if s_cache_file_name:
+            self._write_digest_cache(s_cache_file_name, d_cache)
+
+
+def _process_module_instantiations(s_module_file_name, l_module_names=(None,),
+                                   preprocessor_context=None):
+    """process pool worker for XilinxDebugCoreManager.process_modules: parse 
+    the modules of one file and update their debug core instantiations
+
+    :l_module_names: names of the modules in the file (None: the module named 
+    after the file, see scan_module)
+    :returns: list of (module_name, vio_core, ila_cores, processed, 
+    decl_digest), one per module - processed is False if the module was left 
+    untouched
+    """
+    manager = XilinxDebugCoreManager({}, {}, preprocessor_context)
+    l_results = []
+    for module_name in l_module_names:
+        scan = manager._parse_module(s_module_file_name, module_name)
+        processed = bool(scan.vio_core or scan.ila_cores or scan.has_generated_code)
+        if processed:
+            manager._update_module(s_module_file_name, scan)
+        l_results.append((scan.module_name, scan.vio_core, scan.ila_cores,
+                          processed, scan.decl_digest))
+    return l_results
 
 
 #         ##############################
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+# read-only access to the settings of a vivado project (.xpr)
+#
+# Launching vivado just to find out that the project already has the part,
+# board part and top module that the project config asks for costs
+# 30-60 seconds. The .xpr file is plain XML though, so these settings can be
+# read from it directly, without vivado.
+
+import os
+import xml.etree.ElementTree as ET
+
+from .hdl_file_discovery import SKIP_DIRS
+
+# project config key -> (xpr element, Name attribute of the <Option>):
+# "Configuration" options are project-wide, "FileSet" options are the ones of
+# the design sources fileset (sources_1)
+XPR_SETTINGS = {
+        "part": ("Configuration", "Part"),
+        "board_part": ("Configuration", "BoardPart"),
+        "top": ("FileSet", "TopModule"),
+        }
+XPR_FILESET_DESIGN_SOURCES = "sources_1"
+
+
+def find_xpr_file(dir_project="."):
+    """find the vivado project file of the project in dir_project, which is
+    expected in dir_project itself or in one of its direct subdirectories
+
+    :returns: path of the .xpr file (the most recently modified one, if there
+    are several), None if there is none
+    """
+    l_xpr_files = []
+    l_dirs = [dir_project]
+    with os.scandir(dir_project) as it_entries:
+        for entry in it_entries:
+            if entry.name.endswith(".xpr") and entry.is_file():
+                l_xpr_files.append(entry.path)
+            elif entry.is_dir() and entry.name not in SKIP_DIRS \
+                    and not entry.name.startswith("."):
+                l_dirs.append(entry.path)
+    for dir_path in l_dirs[1:]:
+        try:
+            with os.scandir(dir_path) as it_entries:
+                l_xpr_files.extend(
+                        x.path for x in it_entries
+                        if x.name.endswith(".xpr") and x.is_file())
+        except PermissionError:
+            pass
+    if not l_xpr_files:
+        return None
+    return max(l_xpr_files, key=os.path.getmtime)
+
+
+def read_xpr_settings(file):
+    """read part, board_part and top from the vivado project file
+
+    :returns: dict with the keys of XPR_SETTINGS that are set in the project
+    (board_part in the xpr format, e.g. "digilentinc.com:arty-a7-35:part0:1.1")
+    """
+    d_options = {}
+    for key, (element, option) in XPR_SETTINGS.items():
+        d_options[(element, option)] = key
+
+    d_settings = {}
+    # stack of the tags of the elements that are currently open, and the name
+    # of the fileset that is currently open (if any)
+    l_tags = []
+    s_fileset = None
+    # (iterparse, such that parsing stops as soon as everything has been found,
+    # the file sets with all the source files come after the configuration)
+    for event, elem in ET.iterparse(file, events=("start", "end")):
+        if event == "end":
+            l_tags.pop()
+            if elem.tag == "FileSet":
+                s_fileset = None
+            elem.clear()
+            continue
+
+        if elem.tag == "FileSet":
+            s_fileset = elem.get("Name")
+        elif elem.tag == "Option" and l_tags:
+            if l_tags[-1] == "Configuration" and len(l_tags) == 2:
+                key = d_options.get(("Configuration", elem.get("Name")))
+            elif l_tags[-1] == "Config" and s_fileset == XPR_FILESET_DESIGN_SOURCES:
+                key = d_options.get(("FileSet", elem.get("Name")))
+            else:
+                key = None
+            if key:
+                d_settings[key] = elem.get("Val", "")
+                if len(d_settings) == len(XPR_SETTINGS):
+                    break
+        l_tags.append(elem.tag)
+    return d_settings
+
+
+def xpr_setting_matches(key, value_config, value_xpr):
+    """:returns: True if the project config value value_config for key is what
+    the vivado project has set as value_xpr. The project config holds board
+    parts by their board name only (arty-a7-35), the vivado project including
+    vendor, component and version (digilentinc.com:arty-a7-35:part0:1.1).
+    """
+    if value_xpr is None:
+        return False
+    if key == "board_part":
+        l_board_part = value_xpr.split(":")
+        return value_config == value_xpr or \
+            (len(l_board_part) > 1 and value_config.lower() == l_board_part[1].lower())
+    if key == "part":
+        return value_config.lower() == value_xpr.lower()
+    return value_config == value_xpr
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ..hdl_module_index import HdlModuleIndex
+
+
+class TestHdlModuleIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+        self.dir_rtl = os.path.join(self.dir_tmp, "rtl")
+        os.makedirs(self.dir_rtl)
+        self.file_index = os.path.join(self.dir_tmp, "index.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_tmp)
+
+    def write(self, s_file_name, s_code):
+        s_file = os.path.join(self.dir_rtl, s_file_name)
+        with open(s_file, 'w') as f_out:
+            f_out.write(s_code)
+        # (a new mtime for every write, also within the mtime granularity)
+        stat = os.stat(s_file)
+        os.utime(s_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        return s_file
+
+    def refresh(self):
+        # (from the index file, as in a later run)
+        index = HdlModuleIndex(self.file_index, [self.dir_rtl])
+        index.refresh()
+        return index
+
+    def test_modules(self):
+        s_file = self.write("lib.sv", "module a (input x); endmodule\n"
+                                      "module b (output [3:0] y); endmodule\n")
+        index = self.refresh()
+        self.assertEqual(index.get_module_names(s_file), ["a", "b"])
+        self.assertEqual(index.get_file("b"), s_file)
+        self.assertEqual([x.name for x in index.get_interface("b").ports], ["y"])
+        self.assertEqual(self.refresh().get_interface("b").ports[0].width, 4)
+        self.assertIsNone(index.get_file("c"))
+
+    def test_module_in_several_files(self):
+        s_file_a = self.write("a.sv", "module dup (input x); endmodule\n")
+        s_file_b = self.write("b.sv", "module dup (input x); endmodule\n")
+        s_file = self.refresh().get_file("dup")
+        self.assertIn(s_file, (s_file_a, s_file_b))
+
+        # (the other file still declares the module)
+        os.remove(s_file)
+        s_file_other = s_file_b if s_file == s_file_a else s_file_a
+        self.assertEqual(self.refresh().get_file("dup"), s_file_other)
+        self.write(os.path.basename(s_file), "module dup (input x); endmodule\n")
+        self.refresh()
+        self.write(os.path.basename(s_file_other), "module other (input x); endmodule\n")
+        index = self.refresh()
+        self.assertEqual(index.get_file("dup"), s_file)
+        self.assertEqual(index.get_file("other"), s_file_other)
+
+    def test_vhdl_case(self):
+        s_file = self.write("foo.vhd", "entity Foo is port (clk : in bit); end entity;\n")
+        self.write("bar.sv", "module Bar (input x); endmodule\n")
+        index = self.refresh()
+        for module_name in ("Foo", "foo", "FOO"):
+            self.assertEqual(index.get_file(module_name), s_file)
+            self.assertEqual(index.get_interface(module_name).name, "Foo")
+        self.assertEqual(index.get_module_names(s_file), ["Foo"])
+        # (SystemVerilog names are case sensitive)
+        self.assertIsNone(index.get_file("bar"))
+        self.assertIsNotNone(index.get_file("Bar"))
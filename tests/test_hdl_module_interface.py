@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ..hdl_module_interface import HdlModuleInterface
+
+S_SUB_SV = """\
+module sub #(parameter W = 8) (
+    input  logic clk,
+    input  logic [W-1:0] din,
+    output logic [W-1:0] dout
+);
+endmodule
+"""
+
+S_SUB_VHDL = """\
+entity sub is
+    port (
+        clk  : in  std_logic;
+        din  : in  std_logic_vector(7 downto 0);
+        dout : out std_logic_vector(7 downto 0)
+    );
+end entity;
+"""
+
+
+class TestHdlModuleInterface(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_tmp)
+
+    def write(self, s_file_name, s_code):
+        s_file = os.path.join(self.dir_tmp, s_file_name)
+        with open(s_file, 'w') as f_out:
+            f_out.write(s_code)
+        return s_file
+
+    def update(self, s_file_name, s_code, module_interface):
+        s_file = self.write(s_file_name, s_code)
+        HdlModuleInterface.update_instantiations(s_file, {"sub": module_interface})
+        with open(s_file) as f_in:
+            return f_in.read()
+
+    def test_from_sv(self):
+        module_interface = HdlModuleInterface.from_sv(self.write("sub.sv", S_SUB_SV))
+        self.assertEqual(module_interface.name, "sub")
+        self.assertEqual([(x.name, x.width) for x in module_interface.ports],
+                         [("clk", 1), ("din", 8), ("dout", 8)])
+
+    def test_update_instantiations_sv(self):
+        s_code = ("module top;\n"
+                  "sub #(\n    .W (8)\n) inst_sub (\n"
+                  "    .clk (clk),\n    .din (a),\n    .old (x)\n);\n"
+                  "endmodule\n")
+        s_updated = self.update("top.sv", s_code, HdlModuleInterface.from_sv(
+                self.write("sub.sv", S_SUB_SV)))
+        # (connections of the ports that are left are kept)
+        self.assertIn("    .clk (clk),\n    .din (a),\n    .dout ()\n);\n", s_updated)
+        self.assertNotIn(".old", s_updated)
+
+    def test_update_instantiations_sv_matching(self):
+        # (connections of any form, comments and formatting are left alone, 
+        # the file isn't even written)
+        s_code = ("module top;\n"
+                  "sub #(.W (8)) inst_sub (\n"
+                  "    .clk  (clk),\n"
+                  "    // the data\n"
+                  "    .din  ({a[3:0], b[3:0]}),  // concatenation\n"
+                  "    .dout (x[f(1, 2)] + 1)\n"
+                  ");\n"
+                  "sub inst_sub_wildcard (.*);\n"
+                  "endmodule\n")
+        s_file = self.write("top.sv", s_code)
+        os.utime(s_file, ns=(0, 0))
+        self.assertFalse(HdlModuleInterface.update_instantiations(
+                s_file, {"sub": HdlModuleInterface.from_sv(self.write("sub.sv", S_SUB_SV))}))
+        self.assertEqual(os.stat(s_file).st_mtime_ns, 0)
+        with open(s_file) as f_in:
+            self.assertEqual(f_in.read(), s_code)
+
+    def test_update_instantiations_sv_connections(self):
+        s_code = ("module top;\n"
+                  "sub inst_sub (\n"
+                  "    .clk (1'b1), // constant\n"
+                  "    .old ({p, q}), // removed\n"
+                  "    .din ({a, b})\n"
+                  ");\n"
+                  "sub inst_sub_expr (.clk (c), .din (x[f(1, 2)] + 1), .old (y));\n"
+                  "sub inst_sub_wildcard (.*, .old (y));\n"
+                  "endmodule\n")
+        s_updated = self.update("top.sv", s_code, HdlModuleInterface.from_sv(
+                self.write("sub.sv", S_SUB_SV)))
+        self.assertEqual(s_updated, (
+                "module top;\n"
+                "sub inst_sub (\n"
+                "    .clk (1'b1), // constant\n"
+                "    .din ({a, b}),\n"
+                "    .dout ()\n"
+                ");\n"
+                "sub inst_sub_expr (.clk (c), .din (x[f(1, 2)] + 1), .dout ());\n"
+                # (no new connections with '.*')
+                "sub inst_sub_wildcard (.*);\n"
+                "endmodule\n"))
+
+    def test_update_instantiations_vhdl(self):
+        s_code = ("architecture rtl of top is\nbegin\n"
+                  "    u_sub : entity work.sub\n"
+                  "        port map (\n"
+                  "            CLK => clk,\n"
+                  "            old => x,  -- removed\n"
+                  "            din => resize(a, 8)  -- last association\n"
+                  "        );\n"
+                  "    u_sub_open : sub port map (clk => clk, din => open, dout => open);\n"
+                  "end architecture;\n")
+        s_updated = self.update("top.vhd", s_code, HdlModuleInterface.from_vhdl(
+                self.write("sub.vhd", S_SUB_VHDL)))
+        self.assertEqual(s_updated, (
+                "architecture rtl of top is\nbegin\n"
+                "    u_sub : entity work.sub\n"
+                "        port map (\n"
+                "            CLK => clk,\n"
+                "            din => resize(a, 8),  -- last association\n"
+                "            dout => open\n"
+                "        );\n"
+                "    u_sub_open : sub port map (clk => clk, din => open, dout => open);\n"
+                "end architecture;\n"))
+
+    def test_instantiate_with_conn(self):
+        # (only the separator after the last connection is removed)
+        self.assertEqual(HdlModuleInterface.instantiate_with_conn({}), [])
+        self.assertEqual(HdlModuleInterface.instantiate_with_conn_vhdl({}), [])
+        self.assertEqual(HdlModuleInterface.instantiate_with_conn(
+                {"a": "{x, y}", "b": ""}, add_newlines=False),
+                ["    .a ({x, y}),", "    .b ()"])
@@ -0,0 +1,83 @@
+import io
+import unittest
+
+from ..hdl_sv_header_parser import iter_sv_module_headers, parse_sv_port_declaration
+
+S_SOURCE = """\
+// module commented_out (input a);
+/* module also_commented_out (input b); */
+module ansi #(
+    parameter int W = 8,
+    localparam D = W*2
+) (
+    input  logic clk,
+    input  logic [W-1:0] din,   // (comment with ; and ))
+    output logic [D-1:0] dout [2]
+);
+    logic [3:0] not_a_port;
+endmodule
+
+module non_ansi (x, y);
+    input x;
+    output [3:0] y;
+endmodule
+"""
+
+
+class TestSvHeaderParser(unittest.TestCase):
+
+    def test_ansi_header(self):
+        header = next(iter_sv_module_headers(S_SOURCE))
+        self.assertEqual(header.name, "ansi")
+        self.assertEqual(header.parameters, [
+                ("W", "parameter", "int", (), "8"),
+                ("D", "localparam", "", (), "W*2")])
+        self.assertEqual(header.ports, [
+                ("clk", "input", "logic", (), ()),
+                ("din", "input", "logic", ("[W-1:0]",), ()),
+                ("dout", "output", "logic", ("[D-1:0]",), ("[2]",))])
+
+    def test_non_ansi_header(self):
+        l_headers = list(iter_sv_module_headers(S_SOURCE))
+        self.assertEqual([x.name for x in l_headers], ["ansi", "non_ansi"])
+        self.assertEqual(l_headers[1].parameters, [])
+        self.assertEqual(l_headers[1].ports, [
+                ("x", "input", "", (), ()),
+                ("y", "output", "", ("[3:0]",), ())])
+
+    def test_interface_ports(self):
+        header = next(iter_sv_module_headers(
+                "module m (\n"
+                "    output logic [7:0] dout,\n"
+                "    axi_if.master m_axi,\n"
+                "    my_pkg::t_data data_o,\n"
+                "    axi_if.slave s_axi,\n"
+                "    input logic clk\n"
+                ");\nendmodule\n"))
+        # (a type from a package is no interface: the port is a data port with 
+        # the direction of the last data port)
+        self.assertEqual([x[:3] for x in header.ports], [
+                ("dout", "output", "logic"),
+                ("m_axi", "interface", "axi_if.master"),
+                ("data_o", "output", "my_pkg::t_data"),
+                ("s_axi", "interface", "axi_if.slave"),
+                ("clk", "input", "logic")])
+
+    def test_chunked_source(self):
+        # (headers that span chunk borders are parsed the same)
+        def key(header):
+            return header.name, header.parameters, header.ports
+
+        l_expected = [key(x) for x in iter_sv_module_headers(S_SOURCE)]
+        for chunk_size in (1, 7, 64):
+            l_headers = iter_sv_module_headers(io.StringIO(S_SOURCE), chunk_size)
+            self.assertEqual([key(x) for x in l_headers], l_expected)
+
+    def test_no_module(self):
+        self.assertEqual(list(iter_sv_module_headers("package p; endpackage\n")), [])
+
+    def test_port_declaration(self):
+        self.assertEqual(parse_sv_port_declaration("output logic [7:0] a, b;"), [
+                ("a", "output", "logic", ("[7:0]",), ()),
+                ("b", "output", "logic", ("[7:0]",), ())])
+        self.assertEqual(parse_sv_port_declaration("logic [7:0] a;"), [])
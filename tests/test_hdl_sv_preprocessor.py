@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+from ..hdl_sv_preprocessor import SvPreprocessorContext, has_sv_directives
+
+
+def preprocess(source, context=None, file=None):
+    return "".join((context or SvPreprocessorContext()).preprocessor(file).process(source))
+
+
+class TestSvPreprocessor(unittest.TestCase):
+
+    def test_conditionals(self):
+        source = "`ifdef A\nlogic a;\n`elsif B\nlogic b;\n`else\nlogic c;\n`endif\n"
+        # (`ifdef and `endif are left as empty lines, the branches that are 
+        # not taken are gone, including their directives)
+        self.assertEqual(preprocess(source, SvPreprocessorContext(["A"])),
+                         "\nlogic a;\n\n")
+        self.assertEqual(preprocess(source, SvPreprocessorContext({"B": None})),
+                         "\nlogic b;\n\n")
+        self.assertEqual(preprocess(source), "\nlogic c;\n\n")
+
+    def test_macros(self):
+        source = "`define M(x) x+1\nlogic [`W-1:0] a;\nassign a = `M(2);\n"
+        self.assertEqual(preprocess(source, SvPreprocessorContext(["W=4"])),
+                         "\nlogic [4-1:0] a;\nassign a = 2+1;\n")
+
+    def test_include(self):
+        with tempfile.TemporaryDirectory() as dir_tmp:
+            with open(os.path.join(dir_tmp, "defs.svh"), 'w') as f_out:
+                f_out.write("`define W 16\n")
+            s_file = os.path.join(dir_tmp, "top.sv")
+            source = "`include \"defs.svh\"\nlogic [`W-1:0] a;\n"
+            self.assertEqual(preprocess(source, file=s_file).strip(), "logic [16-1:0] a;")
+
+    def test_chunked_source(self):
+        source = "`ifdef A\nlogic a;\n`endif\n`define M(x) \\\n    (x)\nassign b = `M(1);\n"
+        context = SvPreprocessorContext(["A"])
+        s_expected = preprocess(source, context)
+        l_pieces = [source[i:i+3] for i in range(0, len(source), 3)]
+        self.assertEqual(preprocess(l_pieces, context), s_expected)
+
+    def test_has_directives(self):
+        self.assertTrue(has_sv_directives(b"logic a;\n`ifdef A\n"))
+        self.assertFalse(has_sv_directives(b"logic a;\n`W\n"))
@@ -0,0 +1,62 @@
+import io
+import unittest
+
+from ..hdl_vhdl_entity_parser import (
+        iter_vhdl_entities, eval_vhdl_generics, eval_vhdl_const_expr,
+        get_vhdl_width, get_vhdl_range_sv)
+
+S_SOURCE = """\
+library ieee;
+use ieee.std_logic_1164.all; -- entity commented_out is
+ENTITY Foo IS
+    generic (
+        W : integer := 8;  -- width
+        D : natural := W*2
+    );
+    port (
+        clk, rst : in std_logic;
+        din  : in  std_logic_vector(W-1 downto 0);
+        dout : out unsigned(D - 1 downto 0) := (others => '0')
+    );
+end entity Foo;
+
+architecture rtl of foo is
+begin
+end architecture;
+
+entity bar is port (a : std_logic); end bar;
+"""
+
+
+class TestVhdlEntityParser(unittest.TestCase):
+
+    def test_entities(self):
+        l_entities = list(iter_vhdl_entities(S_SOURCE))
+        self.assertEqual([x.name for x in l_entities], ["Foo", "bar"])
+        foo = l_entities[0]
+        self.assertEqual([x[0] for x in foo.generics], ["W", "D"])
+        self.assertEqual([x[:2] for x in foo.ports], [
+                ("clk", "in"), ("rst", "in"), ("din", "in"), ("dout", "out")])
+        self.assertEqual(foo.ports[3][3], "(others => '0')")
+
+    def test_chunked_source(self):
+        def key(entity):
+            return entity.name, entity.generics, entity.ports
+
+        l_expected = [key(x) for x in iter_vhdl_entities(S_SOURCE)]
+        for chunk_size in (1, 7, 64):
+            l_entities = iter_vhdl_entities(io.StringIO(S_SOURCE), chunk_size)
+            self.assertEqual([key(x) for x in l_entities], l_expected)
+
+    def test_widths(self):
+        foo = next(iter_vhdl_entities(S_SOURCE))
+        d_generics = eval_vhdl_generics(foo.generics)
+        # (VHDL identifiers are case insensitive, the names are in lower case)
+        self.assertEqual(d_generics, {"w": 8, "d": 16})
+        d_widths = {x[0]: get_vhdl_width(x[2], d_generics.__getitem__)
+                    for x in foo.ports}
+        self.assertEqual(d_widths, {"clk": 1, "rst": 1, "din": 8, "dout": 16})
+        self.assertEqual(get_vhdl_range_sv(foo.ports[2][2]), "[W-1:0]")
+
+    def test_const_expr(self):
+        self.assertEqual(eval_vhdl_const_expr("2**4 mod 5 + 16#1_0#"), 17)
@@ -0,0 +1,156 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from ..hdl_xilinx_debug_core_manager import XilinxDebugCoreManager
+
+S_MODULE_SV = """\
+module top (input logic clk);
+    logic vio_ctrl_clk;
+    logic [3:0] vio_ctrl_out_a;
+    logic ila_ctrl_x_clk;
+    logic [7:0] ila_ctrl_x_d;
+endmodule
+// (after endmodule)
+"""
+
+S_MODULE_SV_NO_CORES = """\
+module top (input logic clk);
+    logic [3:0] a;
+endmodule
+"""
+
+S_MODULE_VHDL = """\
+library ieee;
+use ieee.std_logic_1164.all;
+
+entity top is
+    port (clk : in std_logic);
+end entity top;
+
+architecture rtl of top is
+    signal vio_ctrl_clk : std_logic;
+    signal vio_ctrl_in_status : std_logic_vector(3 downto 0); -- radix=hex
+begin
+end architecture rtl;
+"""
+
+
+class TestDebugCoreManager(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+        self.file_json = os.path.join(self.dir_tmp, "vio_ctrl_signals.json")
+        self.dir_xips = os.path.join(self.dir_tmp, "xips")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_tmp)
+
+    def write_module(self, s_file_name, s_code):
+        s_file = os.path.join(self.dir_tmp, s_file_name)
+        with open(s_file, 'w') as f_out:
+            f_out.write(s_code)
+        return s_file
+
+    def read(self, s_file):
+        with open(s_file) as f_in:
+            return f_in.read()
+
+    def process_module(self, s_file):
+        XilinxDebugCoreManager().process_module(
+                s_file, self.file_json, self.dir_xips)
+
+    def test_update_idempotent(self):
+        for s_file_name, s_code in (("top.sv", S_MODULE_SV), ("top.vhd", S_MODULE_VHDL)):
+            s_file = self.write_module(s_file_name, s_code)
+            self.process_module(s_file)
+            s_updated = self.read(s_file)
+            self.assertIn("inst_xip_vio_ctrl_top", s_updated)
+            self.process_module(s_file)
+            self.assertEqual(self.read(s_file), s_updated)
+
+    def test_update_sv(self):
+        s_file = self.write_module("top.sv", S_MODULE_SV)
+        self.process_module(s_file)
+        s_updated = self.read(s_file)
+        self.assertIn("xip_ila_ctrl_top_x inst_xip_ila_ctrl_top_x (", s_updated)
+        self.assertIn("    .probe_out0             (vio_ctrl_out_a)\n", s_updated)
+        # (the instantiations go right before endmodule, what follows is kept)
+        self.assertTrue(s_updated.endswith(
+                "    /* ---------------------- */\nendmodule\n// (after endmodule)\n"))
+
+    def test_update_vhdl_indent(self):
+        # (the generated code gets the indentation of the architecture body)
+        s_file = self.write_module("top.vhd", S_MODULE_VHDL.replace(
+                "begin\nend architecture", "begin\n  x <= y;\nend architecture"))
+        self.process_module(s_file)
+        s_updated = self.read(s_file)
+        self.assertIn("  x <= y;\n  -- --- GENERATED CODE ---\n"
+                      "  inst_xip_vio_ctrl_top : block\n", s_updated)
+        self.assertIn("\n  end block;\n  -- --- END OF GENERATED CODE ---\n"
+                      "end architecture rtl;\n", s_updated)
+        self.process_module(s_file)
+        self.assertEqual(self.read(s_file), s_updated)
+
+    def test_update_no_cores(self):
+        s_file = self.write_module("top.sv", S_MODULE_SV_NO_CORES)
+        self.process_module(s_file)
+        self.assertEqual(self.read(s_file), S_MODULE_SV_NO_CORES)
+
+    def test_remove_cores(self):
+        s_file = self.write_module("top.sv", S_MODULE_SV)
+        self.process_module(s_file)
+        self.write_module("top.sv", self.read(s_file).replace("vio_ctrl_", "vio_").replace(
+                "ila_ctrl_", "ila_"))
+        self.process_module(s_file)
+        self.assertNotIn("GENERATED CODE", self.read(s_file))
+
+    def test_process_modules_several_per_file(self):
+        s_code = ("module first (input logic clk);\n"
+                  "    logic vio_ctrl_clk;\n"
+                  "    logic vio_ctrl_out_a;\n"
+                  "endmodule\n"
+                  "\n"
+                  "module second (input logic clk);\n"
+                  "    logic ila_ctrl_y_clk;\n"
+                  "    logic [3:0] ila_ctrl_y_d;\n"
+                  "endmodule\n")
+        s_file = self.write_module("lib.sv", s_code)
+        XilinxDebugCoreManager().process_modules(
+                [s_file], self.file_json, self.dir_xips,
+                d_file_modules={s_file: ["first", "second"]})
+        s_updated = self.read(s_file)
+        # (each module gets the cores of its own signals, named after it)
+        s_first, s_second = s_updated.split("module second")
+        self.assertIn("xip_vio_ctrl_first inst_xip_vio_ctrl_first (", s_first)
+        self.assertNotIn("xip_ila_ctrl", s_first)
+        self.assertIn("xip_ila_ctrl_second_y inst_xip_ila_ctrl_second_y (", s_second)
+        self.assertNotIn("xip_vio_ctrl", s_second)
+        self.assertNotIn("_lib", s_updated)
+        with open(self.file_json) as f_in:
+            self.assertEqual(list(json.load(f_in)), ["first"])
+
+        XilinxDebugCoreManager().process_modules(
+                [s_file], self.file_json, self.dir_xips,
+                d_file_modules={s_file: ["first", "second"]})
+        self.assertEqual(self.read(s_file), s_updated)
+
+    def test_vio_json(self):
+        s_file = self.write_module("top.sv", S_MODULE_SV)
+        self.write_module("other.sv", S_MODULE_SV.replace("top", "other"))
+        self.process_module(s_file)
+        self.process_module(os.path.join(self.dir_tmp, "other.sv"))
+        with open(self.file_json) as f_in:
+            d_signals = json.load(f_in)
+        self.assertEqual(sorted(d_signals), ["other", "top"])
+        self.assertEqual([(x["name"], x["width"], x["direction"]) for x in d_signals["top"]],
+                         [("a", 4, "out")])
+
+        # (a module without vio signals (anymore) is removed from the json)
+        self.write_module("top.sv", S_MODULE_SV_NO_CORES)
+        self.process_module(s_file)
+        with open(self.file_json) as f_in:
+            d_signals = json.load(f_in)
+        self.assertEqual(sorted(d_signals), ["other"])